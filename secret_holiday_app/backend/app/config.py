@@ -40,12 +40,131 @@ class Settings(BaseSettings):
     AMADEUS_API_KEY: str = ""
     AMADEUS_API_SECRET: str = ""
     AMADEUS_BASE_URL: str = "https://test.api.amadeus.com"  # Use production URL when ready
+    AMADEUS_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # Refresh token this long before expiry
+    
+    # Amadeus HTTP connection pool (one long-lived client per process)
+    AMADEUS_HTTP2: bool = True
+    AMADEUS_TIMEOUT_SECONDS: float = 30.0
+    AMADEUS_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    AMADEUS_MAX_CONNECTIONS: int = 20
+    AMADEUS_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    AMADEUS_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    
+    # Amadeus client-side rate limiting (test env allows ~10 requests/second)
+    AMADEUS_RATE_LIMIT_PER_SECOND: float = 10.0
+    AMADEUS_RATE_LIMIT_BURST: int = 10
+    # Per-endpoint budgets as "class:rate/burst", comma-separated
+    AMADEUS_ENDPOINT_RATE_LIMITS: str = "flight-destinations:8/8,flight-offers:2/2,airports:5/5"
+    AMADEUS_QUEUE_MAX_DEPTH: int = 200  # Waiting requests per endpoint before rejecting
+    AMADEUS_QUEUE_MAX_WAIT_SECONDS: float = 10.0
+    
+    # Amadeus request hedging (duplicate slow idempotent GETs, use the first answer)
+    AMADEUS_HEDGE_ENABLED: bool = True
+    AMADEUS_HEDGE_ENDPOINTS: str = "flight-destinations"  # Endpoint classes to hedge
+    AMADEUS_HEDGE_PERCENTILE: float = 0.95  # Hedge calls slower than this percentile of recent calls
+    AMADEUS_HEDGE_MIN_SAMPLES: int = 20  # Recent calls needed before an endpoint is hedged
+    AMADEUS_HEDGE_MIN_DELAY_SECONDS: float = 0.3
+    AMADEUS_HEDGE_MAX_RATE: float = 0.1  # At most 10% of calls hedged (per minute)
+    
+    # Upstream resilience (Amadeus, Postcodes.io)
+    UPSTREAM_RETRY_ATTEMPTS: int = 2  # Retries for transient errors on idempotent calls
+    UPSTREAM_RETRY_BASE_DELAY_SECONDS: float = 0.2
+    UPSTREAM_RETRY_MAX_DELAY_SECONDS: float = 2.0
+    CIRCUIT_FAILURE_RATE: float = 0.5  # Error rate that opens a host's circuit
+    CIRCUIT_MIN_CALLS: int = 10  # Calls in the window before the rate counts
+    CIRCUIT_WINDOW_SECONDS: float = 30.0
+    CIRCUIT_OPEN_SECONDS: float = 15.0  # Fail fast this long before probing
+    CIRCUIT_HALF_OPEN_PROBES: int = 2
+    CIRCUIT_PROBE_TIMEOUT_SECONDS: float = 30.0  # Reclaim a half-open probe slot that never reported
+    
+    # Amadeus response cache (memory LRU + SQLite on disk)
+    AMADEUS_CACHE_ENABLED: bool = True
+    AMADEUS_CACHE_TTL_SECONDS: int = 6 * 60 * 60  # Inspiration prices update ~daily
+    AMADEUS_CACHE_MEMORY_ENTRIES: int = 2000
+    AMADEUS_CACHE_DB_PATH: str = "./cache/amadeus_cache.sqlite3"  # Empty to disable disk tier
+    AMADEUS_CACHE_DB_MAX_ENTRIES: int = 50000
+    
+    # Price observation store (every Flight Inspiration fare, for trends and outage fallbacks)
+    PRICE_HISTORY_ENABLED: bool = True
+    PRICE_HISTORY_DB_PATH: str = "./cache/price_history.sqlite3"
+    PRICE_HISTORY_RETENTION_DAYS: int = 180
+    
+    # Nearest-airport lookup: "local" (offline index, Amadeus as fallback) or "amadeus"
+    AIRPORTS_SOURCE: str = "local"
+    AIRPORTS_DATA_PATH: str = ""  # Empty for the bundled app/data/airports.csv
+    
+    # Destination suggestions
+    SUGGEST_MAX_CONCURRENCY: int = 6  # Amadeus searches in flight per request
+    SUGGEST_CALL_TIMEOUT_SECONDS: float = 8.0  # Per-search timeout in the fan-out
+    SUGGEST_DEADLINE_MS: int = 10000  # Default request latency budget (0 = no deadline)
+    SUGGEST_METRO_SEARCH: bool = True  # Allow requests to opt in to metro_origins (LHR+LGW -> LON in one call)
+    CLIENT_DISCONNECT_POLL_SECONDS: float = 0.5  # How often long requests check the client is still there
+    SUGGEST_GRID_PRUNE_SLACK: float = 0.25  # Price-only date-grid searches cap maxPrice at the k-th best price + 25%
+    
+    # Background cache warmer (keeps popular searches in the Amadeus response cache)
+    CACHE_WARMER_ENABLED: bool = True  # Only runs when AMADEUS_API_KEY is set
+    CACHE_WARMER_ORIGINS: str = "LON,MAN,BHX,BRS,EDI,GLA,NCL,LPL,LBA,EMA,BFS,ABZ"
+    CACHE_WARMER_MONTHS: int = 3  # Next N months (the default suggestion window)
+    CACHE_WARMER_DURATIONS: str = "3,7"  # Trip lengths in nights
+    CACHE_WARMER_INTERVAL_SECONDS: int = 10 * 60  # Time between warming passes
+    CACHE_WARMER_REFRESH_AHEAD_SECONDS: int = 60 * 60  # Refresh entries expiring within this
+    CACHE_WARMER_MAX_CALLS_PER_HOUR: int = 120  # Amadeus quota the warmer may spend
+    CACHE_WARMER_CONCURRENCY: int = 2
+    
+    # Route price calendar (cheapest fare per day for one origin -> destination)
+    PRICE_CALENDAR_CACHE_TTL_SECONDS: int = 6 * 60 * 60
+    PRICE_CALENDAR_CACHE_MEMORY_ENTRIES: int = 5000  # One entry per route and month
+    PRICE_CALENDAR_CACHE_DB_PATH: str = "./cache/price_calendar.sqlite3"  # Empty to disable disk tier
+    PRICE_CALENDAR_CACHE_DB_MAX_ENTRIES: int = 50000
+    PRICE_CALENDAR_MAX_MONTHS: int = 12
+    
+    # Suggestion ranking weights (see app/services/ranking.py; 0 disables a criterion)
+    RANKING_WEIGHT_PRICE: float = 1.0  # Cheaper is better
+    RANKING_WEIGHT_DISTANCE: float = 0.15  # Shorter flight (great-circle from the user) is better
+    RANKING_WEIGHT_POPULATION: float = 0.25  # Bigger destination city is better
+    RANKING_WEIGHT_ORIGIN_DISTANCE: float = 0.1  # Closer departure airport is better
+    
+    # Search sessions (re-rank a finished search without repeating upstream calls)
+    SEARCH_SESSION_TTL_SECONDS: int = 30 * 60  # Sliding; extended on each use
+    SEARCH_SESSION_MAX_ENTRIES: int = 1000  # Per process, least recently used evicted
+    
+    # Bookable flight offers (detail view), prefetched for the top suggestions
+    OFFER_PREFETCH_TOP_N: int = 3  # 0 disables prefetching
+    OFFER_PREFETCH_CONCURRENCY: int = 2  # Prefetch offer searches in flight per process
+    OFFER_MAX_RESULTS: int = 10  # Offers per destination
     
     @property
     def allowed_origins_list(self) -> list[str]:
         """Parse comma-separated origins into a list."""
         return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
     
+    @property
+    def amadeus_hedge_endpoints(self) -> set[str]:
+        """Parse comma-separated hedged endpoint classes into a set."""
+        return {name.strip() for name in self.AMADEUS_HEDGE_ENDPOINTS.split(",") if name.strip()}
+    
+    @property
+    def cache_warmer_origins_list(self) -> list[str]:
+        """Parse comma-separated warmer origins into a list."""
+        return [code.strip().upper() for code in self.CACHE_WARMER_ORIGINS.split(",") if code.strip()]
+    
+    @property
+    def cache_warmer_durations_list(self) -> list[int]:
+        """Parse comma-separated warmer trip lengths into a list."""
+        return [int(nights) for nights in self.CACHE_WARMER_DURATIONS.split(",") if nights.strip()]
+    
+    @property
+    def amadeus_endpoint_rate_limits(self) -> dict[str, tuple[float, float]]:
+        """Parse "class:rate/burst" pairs into {class: (rate, burst)}."""
+        limits = {}
+        for item in self.AMADEUS_ENDPOINT_RATE_LIMITS.split(","):
+            if not item.strip():
+                continue
+            name, _, budget = item.partition(":")
+            rate, _, burst = budget.partition("/")
+            limits[name.strip()] = (float(rate), float(burst or rate))
+        return limits
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -11,6 +11,10 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.routers import upload, admin, photos, suggestions
+from app.services.amadeus import get_amadeus_service
+from app.services.cache_warmer import get_cache_warmer
+from app.services.destination_index import get_destination_index
+from app.services.price_calendar import get_price_calendar_cache
 
 
 @asynccontextmanager
@@ -25,9 +29,20 @@ async def lifespan(app: FastAPI):
     print(f"🚀 Starting Secret Holiday Backend")
     print(f"   Debug mode: {settings.DEBUG}")
     print(f"   S3 Bucket: {settings.AWS_S3_BUCKET}")
+    destinations = get_destination_index()
+    print(f"   Destination index: {len(destinations)} codes")
+    amadeus = get_amadeus_service()
+    await amadeus.start()
+    warmer = get_cache_warmer()
+    if settings.CACHE_WARMER_ENABLED and settings.AMADEUS_API_KEY:
+        warmer.start()
+        print(f"   Cache warmer: {len(settings.cache_warmer_origins_list)} origins every {settings.CACHE_WARMER_INTERVAL_SECONDS}s")
     yield
     # Shutdown
     print("👋 Shutting down...")
+    await warmer.stop()
+    await amadeus.close()
+    get_price_calendar_cache().close()
 
 
 app = FastAPI(
@@ -9,6 +9,12 @@ from typing import Optional
 from pydantic import BaseModel, Field
 
 
+# Most destinations returned in one response; larger max_results are paged.
+# max_results itself goes up to 500 (it was 100 before cursor paging) on
+# purpose: ranking more is cheap, and only a page is built per response.
+MAX_UNPAGED_RESULTS = 100
+
+
 class TravelDateType(str, Enum):
     """Type of travel date specification."""
     SPECIFIC = "specific"  # Exact date range
@@ -16,6 +22,12 @@ class TravelDateType(str, Enum):
     FLEXIBLE = "flexible"  # Multiple months
 
 
+class DateGrid(str, Enum):
+    """Granularity of a date-grid search."""
+    DAY = "day"    # Cheapest fare for every departure day
+    WEEK = "week"  # Cheapest fare for every departure week
+
+
 class TravelDates(BaseModel):
     """Travel date specification."""
     type: TravelDateType
@@ -28,6 +40,14 @@ class TravelDates(BaseModel):
     preferred_months: Optional[list[str]] = None
 
 
+class RankingWeights(BaseModel):
+    """Relative weight of each ranking criterion (server defaults for any left unset)."""
+    price: Optional[float] = Field(None, ge=0, le=10, description="Cheaper is better")
+    distance: Optional[float] = Field(None, ge=0, le=10, description="Shorter flight is better")
+    population: Optional[float] = Field(None, ge=0, le=10, description="Bigger destination city is better")
+    origin_distance: Optional[float] = Field(None, ge=0, le=10, description="Closer departure airport is better")
+
+
 class SuggestionRequest(BaseModel):
     """Request for destination suggestions."""
     starting_location: str = Field(
@@ -62,13 +82,59 @@ class SuggestionRequest(BaseModel):
     max_results: int = Field(
         default=30,
         ge=1,
+        le=500,
+        description=(
+            "Maximum destinations to rank (all returned at once, or paged with page_size; "
+            f"above {MAX_UNPAGED_RESULTS}, pages of {MAX_UNPAGED_RESULTS} unless page_size is set)"
+        )
+    )
+    page_size: Optional[int] = Field(
+        default=None,
+        ge=1,
         le=100,
-        description="Maximum destinations to return"
+        description="Return only the first page_size destinations plus next_cursor for the rest"
     )
     non_stop_only: bool = Field(
         default=False,
         description="Only return non-stop flights"
     )
+    date_grid: Optional[DateGrid] = Field(
+        default=None,
+        description=(
+            "Search every departure day (or week) in the travel window instead of "
+            "probing the first of each month; one search per origin and month"
+        )
+    )
+    deadline_ms: Optional[int] = Field(
+        default=None,
+        ge=500,
+        le=60000,
+        description="Latency budget in ms; outstanding searches are dropped and partial results returned when it expires (server default if unset)"
+    )
+    include_debug: bool = Field(
+        default=False,
+        description="Include per-stage timings and upstream call counts in the response"
+    )
+    ranking: Optional[RankingWeights] = Field(
+        default=None,
+        description="Ranking weights; omit to rank with the server defaults"
+    )
+    metro_origins: bool = Field(
+        default=False,
+        description=(
+            "Search nearby airports sharing a city code (LHR+LGW -> LON) in one call; "
+            "best_origin may then be the city code"
+        )
+    )
+    split_metro_origins: bool = Field(
+        default=False,
+        description="With metro_origins, re-search metro origins (e.g. LON) per airport so best_origin is always an airport code; costs extra upstream calls"
+    )
+    
+    @property
+    def effective_page_size(self) -> int:
+        """Destinations in the first response: page_size, else all up to MAX_UNPAGED_RESULTS."""
+        return self.page_size or min(self.max_results, MAX_UNPAGED_RESULTS)
     
     class Config:
         json_schema_extra = {
@@ -90,6 +156,10 @@ class OriginAirport(BaseModel):
     iata_code: str
     name: str
     distance_km: Optional[float] = None
+    city_code: Optional[str] = Field(
+        None,
+        description="Metropolitan city code (e.g. LON for LHR)"
+    )
 
 
 class DestinationSuggestion(BaseModel):
@@ -112,7 +182,7 @@ class DestinationSuggestion(BaseModel):
     )
     best_origin: str = Field(
         ...,
-        description="Best origin airport for this destination"
+        description="Best origin airport for this destination (a metro code such as LON only when the request set metro_origins)"
     )
     price_per_person: float = Field(
         ...,
@@ -135,13 +205,47 @@ class DestinationSuggestion(BaseModel):
         default_factory=list,
         description="Why this destination is suggested"
     )
+    score: Optional[float] = Field(
+        None,
+        description="Ranking score (0-1, higher is better) relative to the other candidates"
+    )
     
-    # Optional enrichment data (can be added later)
+    # Enrichment data (coordinates come from the destination index)
     image_url: Optional[str] = None
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
 
+class IncompleteSearch(BaseModel):
+    """An origin/date search that did not complete."""
+    origin: str
+    departure_date: Optional[str] = None
+    duration: Optional[str] = None
+    reason: str = Field(
+        ...,
+        description="deadline, timeout, rate_limited, unavailable or error"
+    )
+
+
+class PipelineStageTiming(BaseModel):
+    """Wall time and upstream calls for one suggestion pipeline stage."""
+    name: str
+    wall_ms: float
+    upstream_calls: int = 0
+
+
+class SuggestionDebug(BaseModel):
+    """Diagnostics for a suggestion request (returned when include_debug is set)."""
+    stages: list[PipelineStageTiming] = Field(default_factory=list)
+    total_ms: float
+    upstream_calls: int = 0
+    upstream_calls_by_service: dict[str, int] = Field(default_factory=dict)
+    searches: int = Field(
+        0,
+        description="Origin/date searches planned"
+    )
+
+
 class SuggestionResponse(BaseModel):
     """Response containing destination suggestions."""
     origins_used: list[OriginAirport] = Field(
@@ -154,15 +258,269 @@ class SuggestionResponse(BaseModel):
     )
     destinations: list[DestinationSuggestion] = Field(
         ...,
-        description="Suggested destinations sorted by price"
+        description="Suggested destinations, best ranked first"
     )
     total_found: int = Field(
         ...,
         description="Total destinations found before limiting"
     )
+    partial: bool = Field(
+        False,
+        description="True if some searches did not complete (see incomplete_searches)"
+    )
+    incomplete_searches: list[IncompleteSearch] = Field(default_factory=list)
+    session_id: Optional[str] = Field(
+        None,
+        description="Search session to re-rank via /sessions/{session_id}/rerank without searching again"
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor for /sessions/{session_id}/results when page_size was set and more results remain"
+    )
+    debug: Optional[SuggestionDebug] = None
+
+
+class RerankRequest(BaseModel):
+    """New parameters for re-ranking a stored search session (unset fields keep the original)."""
+    budget_per_person: Optional[int] = Field(
+        None,
+        gt=0,
+        description="Maximum budget per person in GBP; may not exceed the original search's budget"
+    )
+    travelers: Optional[int] = Field(None, ge=1, le=20)
+    max_results: Optional[int] = Field(None, ge=1, le=500)
+    page_size: Optional[int] = Field(None, ge=1, le=100)
+    ranking: Optional[RankingWeights] = None
+
+
+class SuggestionPage(BaseModel):
+    """One page of a search session's ranked destinations."""
+    session_id: str
+    destinations: list[DestinationSuggestion]
+    total_ranked: int = Field(
+        ...,
+        description="Destinations in the ranking across all pages"
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor for the next page (None on the last page)"
+    )
+
+
+class FlightOffersResponse(BaseModel):
+    """Bookable flight offers for one destination of a search session."""
+    session_id: str
+    destination_code: str
+    origin: str
+    departure_date: str
+    return_date: Optional[str] = None
+    adults: int
+    offers: list[dict] = Field(
+        default_factory=list,
+        description="Amadeus flight-offer objects, cheapest first"
+    )
+    prefetched: bool = Field(
+        default=False,
+        description="True if the offers were fetched in the background before being requested"
+    )
+
+
+class StreamFrameType(str, Enum):
+    """Type of frame in a streamed suggestion response."""
+    ORIGINS = "origins"          # Origins searched, sent first
+    DESTINATION = "destination"  # New destination or improved best price
+    SUMMARY = "summary"          # Final frame once every search has finished
+
+
+class SuggestionStreamFrame(BaseModel):
+    """One frame of a streamed suggestion response (NDJSON line or SSE event)."""
+    type: StreamFrameType
+    # ORIGINS
+    origins_used: Optional[list[OriginAirport]] = None
+    search_criteria: Optional[dict] = None
+    # DESTINATION
+    destination: Optional[DestinationSuggestion] = None
+    # SUMMARY
+    total_found: Optional[int] = None
+    ranking: Optional[list[str]] = Field(
+        None,
+        description="Destination codes of the top results, best ranked first"
+    )
+    partial: Optional[bool] = None
+    incomplete_searches: Optional[list[IncompleteSearch]] = None
+    session_id: Optional[str] = None
+    debug: Optional[SuggestionDebug] = None
 
 
 class SuggestionError(BaseModel):
     """Error response."""
     error: str
     detail: Optional[str] = None
+
+
+class BatchSuggestionRequest(BaseModel):
+    """Several suggestion requests answered together (e.g. one per group member or trip length)."""
+    requests: list[SuggestionRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=10,
+    )
+
+
+class BatchSuggestionResult(BaseModel):
+    """Outcome of one request in a batch: a response, or the error it would have returned."""
+    status_code: int = 200
+    response: Optional[SuggestionResponse] = None
+    error: Optional[SuggestionError] = None
+
+
+class BatchSuggestionResponse(BaseModel):
+    """Results of a batch, in request order."""
+    results: list[BatchSuggestionResult]
+    searches_requested: int = Field(
+        0,
+        description="Origin/date searches the requests needed in total"
+    )
+    searches_run: int = Field(
+        0,
+        description="Distinct searches actually run after de-duplication"
+    )
+    upstream_calls: int = 0
+
+
+class GroupObjective(str, Enum):
+    """How group destinations are ranked."""
+    TOTAL = "total"        # Lowest combined cost for the whole group
+    WORST = "worst"        # Lowest price for the member paying the most
+    FAIRNESS = "fairness"  # Lowest average price plus the gap between the highest and lowest payer
+
+
+class GroupMember(BaseModel):
+    """One member of a group search."""
+    name: Optional[str] = None
+    starting_location: str = Field(
+        ...,
+        description="UK postcode or city name",
+        examples=["EN7 6TB", "Manchester"]
+    )
+
+
+class GroupSuggestionRequest(BaseModel):
+    """Request for destinations every group member can reach from their own home."""
+    members: list[GroupMember] = Field(
+        ...,
+        min_length=2,
+        max_length=20,
+    )
+    travel_dates: TravelDates
+    budget_per_person: int = Field(
+        ...,
+        gt=0,
+        description="Maximum budget per member in GBP"
+    )
+    trip_length_nights: int = Field(
+        default=3,
+        ge=1,
+        le=14,
+        description="Trip duration in nights"
+    )
+    max_origins: int = Field(
+        default=3,
+        ge=1,
+        le=6,
+        description="Maximum origin airports to search per member"
+    )
+    objective: GroupObjective = GroupObjective.TOTAL
+    max_results: int = Field(
+        default=20,
+        ge=1,
+        le=100,
+        description="Maximum destinations to return"
+    )
+    deadline_ms: Optional[int] = Field(
+        default=None,
+        ge=500,
+        le=60000,
+        description="Latency budget in ms (server default if unset)"
+    )
+
+
+class MemberFare(BaseModel):
+    """A member's cheapest way to a group destination."""
+    member: int = Field(
+        ...,
+        description="Index of the member in the request"
+    )
+    origin: str
+    price: float
+    departure_date: Optional[str] = None
+    return_date: Optional[str] = None
+
+
+class GroupDestination(BaseModel):
+    """A destination every member can reach within budget."""
+    destination_code: str
+    destination_name: Optional[str] = None
+    country: Optional[str] = None
+    country_code: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    total_price: float = Field(
+        ...,
+        description="Combined price for the whole group"
+    )
+    worst_price: float = Field(
+        ...,
+        description="Price for the member paying the most"
+    )
+    price_spread: float = Field(
+        ...,
+        description="Gap between the highest and lowest member price"
+    )
+    fares: list[MemberFare]
+    currency: str = "GBP"
+
+
+class GroupMemberOrigins(BaseModel):
+    """Origin airports searched for one member."""
+    member: int
+    starting_location: str
+    origins_used: list[OriginAirport]
+
+
+class GroupSuggestionResponse(BaseModel):
+    """Destinations ranked for a group."""
+    objective: GroupObjective
+    members: list[GroupMemberOrigins]
+    destinations: list[GroupDestination] = Field(
+        ...,
+        description="Destinations reachable by every member, best first"
+    )
+    total_found: int = Field(
+        ...,
+        description="Destinations reachable by every member within budget"
+    )
+    partial: bool = False
+    incomplete_searches: list[IncompleteSearch] = Field(default_factory=list)
+
+
+class PriceCalendarResponse(BaseModel):
+    """
+    Cheapest fare per departure day for one route, in columnar form.
+    
+    dates[i] is the departure date of prices[i]; days without a fare
+    are left out.
+    """
+    origin: str
+    destination: str
+    duration: int = Field(..., description="Trip length in nights")
+    currency: str = "GBP"
+    dates: list[str] = Field(default_factory=list, description="Departure dates (YYYY-MM-DD), ascending")
+    prices: list[float] = Field(default_factory=list, description="Cheapest price per person for each date")
+    return_dates: list[Optional[str]] = Field(default_factory=list, description="Return date for each fare")
+    cheapest_date: Optional[str] = None
+    partial: bool = Field(
+        default=False,
+        description="True if some months could not be searched (see incomplete_searches)"
+    )
+    incomplete_searches: list[IncompleteSearch] = Field(default_factory=list)
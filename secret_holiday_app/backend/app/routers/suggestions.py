@@ -9,221 +9,43 @@ Provides AI-powered destination suggestions based on:
 """
 
 import logging
-from calendar import monthrange
-from collections import defaultdict
-from datetime import date, timedelta
+from contextlib import aclosing
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from app.models.suggestions import (
-    DestinationSuggestion,
-    OriginAirport,
+    BatchSuggestionRequest,
+    BatchSuggestionResponse,
+    FlightOffersResponse,
+    GroupSuggestionRequest,
+    GroupSuggestionResponse,
+    PriceCalendarResponse,
+    RerankRequest,
+    SuggestionPage,
     SuggestionRequest,
     SuggestionResponse,
-    TravelDateType,
+    SuggestionStreamFrame,
 )
 from app.services.amadeus import AmadeusService, get_amadeus_service
 from app.services.auth import FirebaseUser, get_current_user
-from app.services.geocoding import geocode_uk_location
+from app.services.disconnect import run_until_disconnected
+from app.services.flight_offers import get_flight_offer_service
+from app.services.group_planner import GroupPlanner
+from app.services.price_calendar import PriceCalendarService
+from app.services.search_sessions import SearchSession, decode_cursor, get_session_store
+from app.services.suggestion_pipeline import (
+    SuggestionPipeline,
+    rerank_session,
+    run_batch,
+    session_page,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# IATA code to city/country mapping for enrichment
-# This covers common European destinations
-DESTINATION_INFO = {
-    # Spain
-    "BCN": ("Barcelona", "Spain", "ES"),
-    "MAD": ("Madrid", "Spain", "ES"),
-    "AGP": ("Malaga", "Spain", "ES"),
-    "ALC": ("Alicante", "Spain", "ES"),
-    "PMI": ("Palma de Mallorca", "Spain", "ES"),
-    "IBZ": ("Ibiza", "Spain", "ES"),
-    "VLC": ("Valencia", "Spain", "ES"),
-    "SVQ": ("Seville", "Spain", "ES"),
-    "BIO": ("Bilbao", "Spain", "ES"),
-    "TFS": ("Tenerife South", "Spain", "ES"),
-    "LPA": ("Gran Canaria", "Spain", "ES"),
-    "ACE": ("Lanzarote", "Spain", "ES"),
-    "FUE": ("Fuerteventura", "Spain", "ES"),
-    
-    # France
-    "CDG": ("Paris", "France", "FR"),
-    "ORY": ("Paris Orly", "France", "FR"),
-    "NCE": ("Nice", "France", "FR"),
-    "LYS": ("Lyon", "France", "FR"),
-    "MRS": ("Marseille", "France", "FR"),
-    "TLS": ("Toulouse", "France", "FR"),
-    "BOD": ("Bordeaux", "France", "FR"),
-    
-    # Italy
-    "FCO": ("Rome", "Italy", "IT"),
-    "MXP": ("Milan Malpensa", "Italy", "IT"),
-    "LIN": ("Milan Linate", "Italy", "IT"),
-    "VCE": ("Venice", "Italy", "IT"),
-    "NAP": ("Naples", "Italy", "IT"),
-    "FLR": ("Florence", "Italy", "IT"),
-    "PSA": ("Pisa", "Italy", "IT"),
-    "BLQ": ("Bologna", "Italy", "IT"),
-    "CTA": ("Catania", "Italy", "IT"),
-    "PMO": ("Palermo", "Italy", "IT"),
-    
-    # Germany
-    "FRA": ("Frankfurt", "Germany", "DE"),
-    "MUC": ("Munich", "Germany", "DE"),
-    "BER": ("Berlin", "Germany", "DE"),
-    "DUS": ("Dusseldorf", "Germany", "DE"),
-    "HAM": ("Hamburg", "Germany", "DE"),
-    "CGN": ("Cologne", "Germany", "DE"),
-    "STR": ("Stuttgart", "Germany", "DE"),
-    
-    # Netherlands
-    "AMS": ("Amsterdam", "Netherlands", "NL"),
-    "RTM": ("Rotterdam", "Netherlands", "NL"),
-    "EIN": ("Eindhoven", "Netherlands", "NL"),
-    
-    # Belgium
-    "BRU": ("Brussels", "Belgium", "BE"),
-    "CRL": ("Brussels Charleroi", "Belgium", "BE"),
-    
-    # Portugal
-    "LIS": ("Lisbon", "Portugal", "PT"),
-    "OPO": ("Porto", "Portugal", "PT"),
-    "FAO": ("Faro", "Portugal", "PT"),
-    "FNC": ("Funchal", "Portugal", "PT"),
-    
-    # Greece
-    "ATH": ("Athens", "Greece", "GR"),
-    "SKG": ("Thessaloniki", "Greece", "GR"),
-    "HER": ("Heraklion", "Greece", "GR"),
-    "RHO": ("Rhodes", "Greece", "GR"),
-    "CFU": ("Corfu", "Greece", "GR"),
-    "JTR": ("Santorini", "Greece", "GR"),
-    "JMK": ("Mykonos", "Greece", "GR"),
-    
-    # Croatia
-    "DBV": ("Dubrovnik", "Croatia", "HR"),
-    "SPU": ("Split", "Croatia", "HR"),
-    "ZAG": ("Zagreb", "Croatia", "HR"),
-    
-    # Czech Republic
-    "PRG": ("Prague", "Czech Republic", "CZ"),
-    
-    # Poland
-    "WAW": ("Warsaw", "Poland", "PL"),
-    "KRK": ("Krakow", "Poland", "PL"),
-    "GDN": ("Gdansk", "Poland", "PL"),
-    
-    # Hungary
-    "BUD": ("Budapest", "Hungary", "HU"),
-    
-    # Austria
-    "VIE": ("Vienna", "Austria", "AT"),
-    "SZG": ("Salzburg", "Austria", "AT"),
-    
-    # Switzerland
-    "ZRH": ("Zurich", "Switzerland", "CH"),
-    "GVA": ("Geneva", "Switzerland", "CH"),
-    
-    # Ireland
-    "DUB": ("Dublin", "Ireland", "IE"),
-    "SNN": ("Shannon", "Ireland", "IE"),
-    "ORK": ("Cork", "Ireland", "IE"),
-    
-    # Scandinavia
-    "CPH": ("Copenhagen", "Denmark", "DK"),
-    "OSL": ("Oslo", "Norway", "NO"),
-    "ARN": ("Stockholm", "Sweden", "SE"),
-    "HEL": ("Helsinki", "Finland", "FI"),
-    "KEF": ("Reykjavik", "Iceland", "IS"),
-    
-    # Baltic
-    "TLL": ("Tallinn", "Estonia", "EE"),
-    "RIX": ("Riga", "Latvia", "LV"),
-    "VNO": ("Vilnius", "Lithuania", "LT"),
-    
-    # Turkey
-    "IST": ("Istanbul", "Turkey", "TR"),
-    "SAW": ("Istanbul Sabiha", "Turkey", "TR"),
-    "AYT": ("Antalya", "Turkey", "TR"),
-    "DLM": ("Dalaman", "Turkey", "TR"),
-    "BJV": ("Bodrum", "Turkey", "TR"),
-    
-    # Cyprus
-    "LCA": ("Larnaca", "Cyprus", "CY"),
-    "PFO": ("Paphos", "Cyprus", "CY"),
-    
-    # Malta
-    "MLA": ("Malta", "Malta", "MT"),
-    
-    # Morocco
-    "RAK": ("Marrakech", "Morocco", "MA"),
-    "CMN": ("Casablanca", "Morocco", "MA"),
-    
-    # Other
-    "GIB": ("Gibraltar", "Gibraltar", "GI"),
-    "TGD": ("Podgorica", "Montenegro", "ME"),
-    "TIV": ("Tivat", "Montenegro", "ME"),
-}
-
-
-def get_destination_info(iata_code: str) -> tuple[str | None, str | None, str | None]:
-    """Get city name, country, and country code for an IATA code."""
-    return DESTINATION_INFO.get(iata_code.upper(), (None, None, None))
-
-
-def build_date_params(request: SuggestionRequest) -> list[dict]:
-    """
-    Convert travel date specification into Amadeus API parameters.
-    
-    Returns a list of date parameter dicts to search.
-    """
-    params_list = []
-    travel = request.travel_dates
-    duration = str(request.trip_length_nights)
-    
-    if travel.type == TravelDateType.SPECIFIC:
-        # Specific date range
-        if travel.start_date and travel.end_date:
-            params_list.append({
-                "departureDate": travel.start_date.isoformat(),
-                "duration": duration,
-            })
-    
-    elif travel.type == TravelDateType.MONTH:
-        # Whole month - Amadeus needs yyyy-MM-dd format, use first day of month
-        if travel.month:
-            # Convert "2026-03" to "2026-03-01"
-            departure_date = f"{travel.month}-01"
-            params_list.append({
-                "departureDate": departure_date,
-                "duration": duration,
-            })
-    
-    elif travel.type == TravelDateType.FLEXIBLE:
-        # Multiple months - use first day of each month
-        if travel.preferred_months:
-            for month in travel.preferred_months[:3]:  # Limit to 3 months
-                departure_date = f"{month}-01"
-                params_list.append({
-                    "departureDate": departure_date,
-                    "duration": duration,
-                })
-    
-    # Default: next 3 months if nothing specified
-    if not params_list:
-        today = date.today()
-        for i in range(1, 4):
-            month = (today.month + i - 1) % 12 + 1
-            year = today.year + ((today.month + i - 1) // 12)
-            params_list.append({
-                "departureDate": f"{year}-{month:02d}-01",
-                "duration": duration,
-            })
-    
-    return params_list
-
 
 @router.post(
     "/suggest",
@@ -233,152 +55,284 @@ def build_date_params(request: SuggestionRequest) -> list[dict]:
 )
 async def suggest_destinations(
     request: SuggestionRequest,
+    http_request: Request,
     user: FirebaseUser = Depends(get_current_user),
     amadeus: AmadeusService = Depends(get_amadeus_service),
 ) -> SuggestionResponse:
     """
     Get destination suggestions under budget.
     
-    Flow:
+    Flow (see SuggestionPipeline):
     1. Geocode starting location (postcode/city)
     2. Find nearby airports
     3. Search flight destinations from each airport
-    4. Merge and rank by price
-    5. Return top results
+    4. Merge and rank (price, distance, city size, origin distance)
+    5. Return top results (or the first page_size of them plus next_cursor),
+       and a session_id for /sessions/{session_id}/rerank, /results and /offers
+    
+    Flight offers for the top destinations are then prefetched in the background.
+    If the client disconnects first, the search is cancelled.
     """
     logger.info(f"Suggestion request from user {user.uid}: {request.starting_location}")
     
-    # Step 1: Geocode the starting location
-    location = await geocode_uk_location(request.starting_location)
-    if not location:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Could not find location: {request.starting_location}. Please enter a valid UK postcode or city name."
-        )
-    
-    logger.info(f"Geocoded {request.starting_location} to {location.latitude}, {location.longitude}")
+    pipeline = SuggestionPipeline(request, amadeus, owner=user.uid)
+    response = await run_until_disconnected(http_request, pipeline.run())
+    get_flight_offer_service().prefetch(pipeline.session, amadeus)
+    return response
+
+
+@router.post(
+    "/suggest/batch",
+    response_model=BatchSuggestionResponse,
+    summary="Get destination suggestions for several requests",
+    description=(
+        "Run up to 10 suggestion requests at once (e.g. one per group member's home "
+        "location or per trip length), sharing geocoding, airport lookups and flight searches"
+    ),
+)
+async def batch_suggest_destinations(
+    batch: BatchSuggestionRequest,
+    http_request: Request,
+    user: FirebaseUser = Depends(get_current_user),
+    amadeus: AmadeusService = Depends(get_amadeus_service),
+) -> BatchSuggestionResponse:
+    """
+    Get destination suggestions for several requests in one call.
     
-    # Step 2: Find nearby airports
-    airports = await amadeus.get_nearest_airports(
-        latitude=location.latitude,
-        longitude=location.longitude,
-        radius=150,  # 150km radius
-        max_results=request.max_origins,
+    Each result is either the /suggest response for that request or the
+    error it would have returned; one failing request doesn't fail the batch.
+    """
+    logger.info(
+        f"Batch suggestion request from user {user.uid}: "
+        f"{[r.starting_location for r in batch.requests]}"
     )
     
-    if not airports:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No airports found near {request.starting_location}"
-        )
+    return await run_until_disconnected(http_request, run_batch(batch.requests, amadeus, owner=user.uid))
+
+
+@router.post(
+    "/suggest/group",
+    response_model=GroupSuggestionResponse,
+    summary="Get destinations for a group",
+    description=(
+        "Search from every member's home airports and rank the destinations they can all "
+        "reach within budget by total group cost, worst individual cost or fairness"
+    ),
+)
+async def group_suggest_destinations(
+    request: GroupSuggestionRequest,
+    http_request: Request,
+    user: FirebaseUser = Depends(get_current_user),
+    amadeus: AmadeusService = Depends(get_amadeus_service),
+) -> GroupSuggestionResponse:
+    """
+    Get destinations every group member can reach.
     
-    origins_used = [
-        OriginAirport(
-            iata_code=a["iataCode"],
-            name=a.get("name", a["iataCode"]),
-            distance_km=a.get("distance", {}).get("value"),
-        )
-        for a in airports
-    ]
+    Returns 400/404 if any member's location can't be resolved, since
+    the group can't be planned without them.
+    """
+    logger.info(
+        f"Group suggestion request from user {user.uid}: {len(request.members)} members, "
+        f"objective {request.objective.value}"
+    )
     
-    logger.info(f"Found {len(origins_used)} airports: {[o.iata_code for o in origins_used]}")
+    return await run_until_disconnected(http_request, GroupPlanner(request, amadeus).run())
+
+
+@router.post(
+    "/sessions/{session_id}/rerank",
+    response_model=SuggestionResponse,
+    summary="Re-rank a previous search",
+    description=(
+        "Re-filter, re-price and re-rank the destinations found by an earlier /suggest "
+        "call under a new budget, number of travelers, max_results or ranking weights, "
+        "without searching again"
+    ),
+)
+async def rerank_suggestions(
+    session_id: str,
+    changes: RerankRequest,
+    user: FirebaseUser = Depends(get_current_user),
+) -> SuggestionResponse:
+    """
+    Re-rank a stored search session from memory.
     
-    # Step 3: Build date parameters
-    date_params_list = build_date_params(request)
+    Returns 404 if the session has expired (run /suggest again) and 409
+    if the new budget is above the original search's.
+    """
+    session = get_user_session(session_id, user)
     
-    # Step 4: Search destinations from each airport
-    # Collect all results, keeping best price per destination
-    destination_prices: dict[str, dict] = defaultdict(lambda: {
-        "price": float("inf"),
-        "origin": None,
-        "departure_date": None,
-        "return_date": None,
-    })
+    logger.info(f"Re-ranking session {session_id} for user {user.uid}: {changes.model_dump(exclude_none=True)}")
+    return rerank_session(session, changes)
+
+
+@router.get(
+    "/sessions/{session_id}/results",
+    response_model=SuggestionPage,
+    summary="Page through a previous search",
+    description="Get the next page of a search session's ranked destinations using next_cursor",
+)
+async def get_session_results(
+    session_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (omit for the first page)"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size (defaults to the search's page_size)"),
+    user: FirebaseUser = Depends(get_current_user),
+) -> SuggestionPage:
+    """
+    Get one page of a search session's current ranking.
     
-    for origin in origins_used:
-        for date_params in date_params_list:
-            try:
-                results = await amadeus.get_flight_destinations(
-                    origin=origin.iata_code,
-                    departure_date=date_params.get("departureDate"),
-                    duration=date_params.get("duration"),
-                    max_price=request.budget_per_person,
-                    view_by="DESTINATION",
-                )
-                
-                for dest in results:
-                    dest_code = dest.get("destination")
-                    if not dest_code:
-                        continue
-                    
-                    price = float(dest.get("price", {}).get("total", float("inf")))
-                    
-                    # Keep the cheapest option for each destination
-                    if price < destination_prices[dest_code]["price"]:
-                        destination_prices[dest_code] = {
-                            "price": price,
-                            "origin": origin.iata_code,
-                            "departure_date": dest.get("departureDate"),
-                            "return_date": dest.get("returnDate"),
-                        }
-                        
-            except Exception as e:
-                logger.warning(f"Search failed for {origin.iata_code}: {e}")
-                continue
+    Returns 404 if the session has expired, 400 for a malformed cursor
+    and 409 if the session was re-ranked after the cursor was issued.
+    """
+    session = get_user_session(session_id, user)
+    
+    offset = 0
+    if cursor:
+        try:
+            version, offset = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if version != session.ranking_version:
+            raise HTTPException(
+                status_code=409,
+                detail="Results were re-ranked since this cursor was issued. Please start from the first page."
+            )
+    
+    page_size = limit or session.ranked_request.page_size or 10
+    destinations, next_cursor = session_page(session, offset, page_size)
+    
+    return SuggestionPage(
+        session_id=session.session_id,
+        destinations=destinations,
+        total_ranked=len(session.ranked_codes),
+        next_cursor=next_cursor,
+    )
+
+
+@router.get(
+    "/calendar",
+    response_model=PriceCalendarResponse,
+    summary="Cheapest fare per day for a route",
+    description="Per-day cheapest-price calendar for an origin -> destination pair over a month range",
+)
+async def get_price_calendar(
+    http_request: Request,
+    origin: str = Query(..., min_length=3, max_length=3, description="Origin IATA airport or city code"),
+    destination: str = Query(..., min_length=3, max_length=3, description="Destination IATA code"),
+    start_month: str = Query(..., pattern=r"^\d{4}-\d{2}$", description="First month (YYYY-MM)"),
+    end_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Last month (defaults to start_month)"),
+    duration: int = Query(3, ge=1, le=14, description="Trip length in nights"),
+    user: FirebaseUser = Depends(get_current_user),
+    amadeus: AmadeusService = Depends(get_amadeus_service),
+) -> PriceCalendarResponse:
+    """
+    Get a route's price calendar.
     
-    # Step 5: Build and sort results
-    suggestions: list[DestinationSuggestion] = []
+    One Flight Inspiration search per month (viewBy=DATE); months already
+    in the calendar cache cost no upstream call. Returns 400 for an
+    invalid month range.
+    """
+    logger.info(f"Price calendar for user {user.uid}: {origin}->{destination} {start_month}..{end_month or start_month}")
+    
+    try:
+        return await run_until_disconnected(
+            http_request,
+            PriceCalendarService(amadeus).get_calendar(
+                origin, destination, start_month, end_month or start_month, duration
+            ),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get(
+    "/sessions/{session_id}/offers/{destination_code}",
+    response_model=FlightOffersResponse,
+    summary="Bookable flight offers for a suggested destination",
+    description="Flight offers on the dates and from the origin of the destination's cheapest fare in a search session",
+)
+async def get_session_offers(
+    session_id: str,
+    destination_code: str,
+    user: FirebaseUser = Depends(get_current_user),
+    amadeus: AmadeusService = Depends(get_amadeus_service),
+) -> FlightOffersResponse:
+    """
+    Get flight offers for one destination of a search session.
     
-    for dest_code, data in destination_prices.items():
-        if data["price"] == float("inf"):
-            continue
-        
-        city_name, country, country_code = get_destination_info(dest_code)
-        
-        # Build reasons
-        reasons = []
-        if data["price"] <= request.budget_per_person * 0.5:
-            reasons.append("Great value - well under budget")
-        elif data["price"] <= request.budget_per_person * 0.75:
-            reasons.append("Good value")
-        else:
-            reasons.append("Within budget")
-        
-        suggestions.append(DestinationSuggestion(
-            destination_code=dest_code,
-            destination_name=city_name,
-            country=country,
-            country_code=country_code,
-            best_origin=data["origin"],
-            price_per_person=data["price"],
-            total_price=data["price"] * request.travelers,
-            departure_date=data["departure_date"],
-            return_date=data["return_date"],
-            reasons=reasons,
-        ))
+    The top destinations of a /suggest response are prefetched, so these
+    usually return without waiting on Amadeus. Returns 404 if the session
+    has expired or has no fare for the destination.
+    """
+    session = get_user_session(session_id, user)
+    return await get_flight_offer_service().get_offers(session, destination_code, amadeus)
+
+
+def get_user_session(session_id: str, user: FirebaseUser) -> SearchSession:
+    """Look up the user's search session, or raise 404 if it has expired."""
+    session = get_session_store().get(session_id, owner=user.uid)
+    if not session:
+        raise HTTPException(
+            status_code=404,
+            detail="Search session not found or expired. Please search again."
+        )
+    return session
+
+
+@router.post(
+    "/suggest/stream",
+    response_model=SuggestionStreamFrame,
+    summary="Stream destination suggestions",
+    description=(
+        "Same search as /suggest, streamed as newline-delimited JSON frames "
+        "(or Server-Sent Events with Accept: text/event-stream)"
+    ),
+)
+async def stream_suggest_destinations(
+    request: SuggestionRequest,
+    http_request: Request,
+    user: FirebaseUser = Depends(get_current_user),
+    amadeus: AmadeusService = Depends(get_amadeus_service),
+) -> StreamingResponse:
+    """
+    Stream destination suggestions as each Amadeus search completes.
     
-    # Sort by price (ascending)
-    suggestions.sort(key=lambda s: s.price_per_person)
+    Frames (one JSON object per line):
+    1. origins - origins_used and search_criteria, sent immediately
+    2. destination - a new destination, or a better price for one already sent
+    3. summary - total_found, the final ranking (destination codes, best first)
+       and the session_id
+    """
+    logger.info(f"Streaming suggestion request from user {user.uid}: {request.starting_location}")
+    
+    # Resolve origins before streaming so location errors are normal HTTP errors
+    pipeline = SuggestionPipeline(request, amadeus, owner=user.uid)
+    await pipeline.resolve_origins()
     
-    total_found = len(suggestions)
-    suggestions = suggestions[:request.max_results]
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
     
-    logger.info(f"Found {total_found} destinations, returning top {len(suggestions)}")
+    async def frames() -> AsyncIterator[str]:
+        # Starlette cancels this generator when the client disconnects;
+        # aclosing makes the pipeline cancel its searches right away
+        async with aclosing(pipeline.stream()) as stream:
+            async for frame in stream:
+                yield format_stream_frame(frame, use_sse)
     
-    return SuggestionResponse(
-        origins_used=origins_used,
-        search_criteria={
-            "starting_location": request.starting_location,
-            "budget_per_person": request.budget_per_person,
-            "travelers": request.travelers,
-            "trip_length_nights": request.trip_length_nights,
-            "travel_dates": request.travel_dates.model_dump(),
-        },
-        destinations=suggestions,
-        total_found=total_found,
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+def format_stream_frame(frame: SuggestionStreamFrame, use_sse: bool) -> str:
+    """Serialize a frame as an NDJSON line or an SSE event."""
+    payload = frame.model_dump_json(exclude_none=True)
+    if use_sse:
+        return f"event: {frame.type.value}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
 @router.post(
     "/test",
     response_model=SuggestionResponse,
@@ -395,131 +349,13 @@ async def test_suggest_destinations(
     """
     logger.info(f"TEST suggestion request: {request.starting_location}")
     
-    # Step 1: Geocode the starting location
-    location = await geocode_uk_location(request.starting_location)
-    if not location:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Could not find location: {request.starting_location}. Please enter a valid UK postcode or city name."
-        )
+    pipeline = SuggestionPipeline(request, amadeus)
+    response = await pipeline.run()
     
-    logger.info(f"Geocoded {request.starting_location} to {location.latitude}, {location.longitude}")
-    
-    # Step 2: Find nearby airports
-    airports = await amadeus.get_nearest_airports(
-        latitude=location.latitude,
-        longitude=location.longitude,
-        radius=150,
-        max_results=request.max_origins,
-    )
-    
-    if not airports:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No airports found near {request.starting_location}"
-        )
-    
-    origins_used = [
-        OriginAirport(
-            iata_code=a["iataCode"],
-            name=a.get("name", a["iataCode"]),
-            distance_km=a.get("distance", {}).get("value"),
+    for outcome in pipeline.outcomes:
+        logger.info(
+            f"Got {len(outcome.results)} results from {outcome.key.origin} "
+            f"{outcome.key.departure_date} in {outcome.elapsed_ms:.0f}ms"
         )
-        for a in airports
-    ]
-    
-    logger.info(f"Found {len(origins_used)} airports: {[o.iata_code for o in origins_used]}")
-    
-    # Step 3: Build date parameters
-    date_params_list = build_date_params(request)
-    
-    # Step 4: Search destinations from each airport
-    destination_prices: dict[str, dict] = defaultdict(lambda: {
-        "price": float("inf"),
-        "origin": None,
-        "departure_date": None,
-        "return_date": None,
-    })
     
-    for origin in origins_used:
-        for date_params in date_params_list:
-            try:
-                logger.info(f"Searching from {origin.iata_code} with params: {date_params}")
-                results = await amadeus.get_flight_destinations(
-                    origin=origin.iata_code,
-                    departure_date=date_params.get("departureDate"),
-                    duration=date_params.get("duration"),
-                    max_price=request.budget_per_person,
-                    view_by="DESTINATION",
-                )
-                
-                logger.info(f"Got {len(results)} results from {origin.iata_code}")
-                
-                for dest in results:
-                    dest_code = dest.get("destination")
-                    if not dest_code:
-                        continue
-                    
-                    price = float(dest.get("price", {}).get("total", float("inf")))
-                    
-                    if price < destination_prices[dest_code]["price"]:
-                        destination_prices[dest_code] = {
-                            "price": price,
-                            "origin": origin.iata_code,
-                            "departure_date": dest.get("departureDate"),
-                            "return_date": dest.get("returnDate"),
-                        }
-                        
-            except Exception as e:
-                logger.warning(f"Search failed for {origin.iata_code}: {e}")
-                continue
-    
-    # Step 5: Build and sort results
-    suggestions: list[DestinationSuggestion] = []
-    
-    for dest_code, data in destination_prices.items():
-        if data["price"] == float("inf"):
-            continue
-        
-        city_name, country, country_code = get_destination_info(dest_code)
-        
-        reasons = []
-        if data["price"] <= request.budget_per_person * 0.5:
-            reasons.append("Great value - well under budget")
-        elif data["price"] <= request.budget_per_person * 0.75:
-            reasons.append("Good value")
-        else:
-            reasons.append("Within budget")
-        
-        suggestions.append(DestinationSuggestion(
-            destination_code=dest_code,
-            destination_name=city_name,
-            country=country,
-            country_code=country_code,
-            best_origin=data["origin"],
-            price_per_person=data["price"],
-            total_price=data["price"] * request.travelers,
-            departure_date=data["departure_date"],
-            return_date=data["return_date"],
-            reasons=reasons,
-        ))
-    
-    suggestions.sort(key=lambda s: s.price_per_person)
-    
-    total_found = len(suggestions)
-    suggestions = suggestions[:request.max_results]
-    
-    logger.info(f"TEST: Found {total_found} destinations, returning top {len(suggestions)}")
-    
-    return SuggestionResponse(
-        origins_used=origins_used,
-        search_criteria={
-            "starting_location": request.starting_location,
-            "budget_per_person": request.budget_per_person,
-            "travelers": request.travelers,
-            "trip_length_nights": request.trip_length_nights,
-            "travel_dates": request.travel_dates.model_dump(),
-        },
-        destinations=suggestions,
-        total_found=total_found,
-    )
+    return response
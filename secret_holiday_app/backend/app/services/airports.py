@@ -0,0 +1,199 @@
+"""
+Offline Airport Index
+
+Answers "which airports are near this location?" from a local dataset
+(app/data/airports.csv) instead of calling the Amadeus Airport Nearest
+Relevant API. UK and Irish airport locations almost never change, so
+the dataset is loaded once and kept in an in-memory grid index.
+
+Results use the same dict shape as Amadeus /v1/reference-data/locations/airports,
+so callers can use either source interchangeably.
+
+To refresh the dataset from Amadeus, run: python scripts/refresh_airports.py
+
+Usage:
+    index = get_airport_index()
+    airports = index.nearest(51.5074, -0.1278, radius_km=150, max_results=4)
+"""
+
+import csv
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AIRPORTS_PATH = Path(__file__).resolve().parent.parent / "data" / "airports.csv"
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+@dataclass(frozen=True)
+class Airport:
+    """An airport in the local dataset."""
+    iata: str
+    name: str
+    city: str
+    city_code: str  # Metropolitan/city IATA code (e.g. LON for LHR)
+    country_code: str
+    latitude: float
+    longitude: float
+    passengers_m: float = 0.0  # Annual passengers (millions), used for relevance
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in km."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def relevance_score(passengers_m: float, distance_km: float) -> float:
+    """
+    Rank nearby airports like Amadeus "relevance": busy airports win,
+    but the score falls off quickly with distance.
+    """
+    return (passengers_m + 0.1) / (1 + distance_km / 50) ** 2
+
+
+class AirportIndex:
+    """
+    Grid spatial index over airports.
+    
+    Airports are bucketed into cells of `cell_degrees` × `cell_degrees`;
+    a radius query only visits the cells overlapping its bounding box.
+    """
+    
+    def __init__(self, airports: list[Airport], cell_degrees: float = 1.0):
+        self.cell_degrees = cell_degrees
+        self._by_iata = {a.iata: a for a in airports}
+        self._cells: dict[tuple[int, int], list[Airport]] = defaultdict(list)
+        for airport in airports:
+            self._cells[self._cell(airport.latitude, airport.longitude)].append(airport)
+    
+    @classmethod
+    def from_csv(cls, path: Path | str = DEFAULT_AIRPORTS_PATH) -> "AirportIndex":
+        """Load an index from an airports CSV file."""
+        airports = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                airports.append(Airport(
+                    iata=row["iata"],
+                    name=row["name"],
+                    city=row["city"],
+                    city_code=row["city_code"] or row["iata"],
+                    country_code=row["country_code"],
+                    latitude=float(row["latitude"]),
+                    longitude=float(row["longitude"]),
+                    passengers_m=float(row["passengers_m"] or 0),
+                ))
+        
+        logger.info(f"Loaded {len(airports)} airports from {path}")
+        return cls(airports)
+    
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        """Grid cell containing a point."""
+        return (
+            math.floor(latitude / self.cell_degrees),
+            math.floor(longitude / self.cell_degrees),
+        )
+    
+    def get(self, iata_code: str) -> Optional[Airport]:
+        """Look up an airport by IATA code."""
+        return self._by_iata.get(iata_code.upper())
+    
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+    ) -> list[tuple[Airport, float]]:
+        """
+        Find airports within a radius.
+        
+        Returns:
+            List of (airport, distance_km), unordered
+        """
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        lon_span = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+        
+        min_cell = self._cell(latitude - lat_span, longitude - lon_span)
+        max_cell = self._cell(latitude + lat_span, longitude + lon_span)
+        
+        matches = []
+        for lat_cell in range(min_cell[0], max_cell[0] + 1):
+            for lon_cell in range(min_cell[1], max_cell[1] + 1):
+                for airport in self._cells.get((lat_cell, lon_cell), ()):
+                    distance = haversine_km(latitude, longitude, airport.latitude, airport.longitude)
+                    if distance <= radius_km:
+                        matches.append((airport, distance))
+        return matches
+    
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 100,
+        max_results: int = 5,
+    ) -> list[dict]:
+        """
+        Find the most relevant airports near a location.
+        
+        Args:
+            latitude: Location latitude
+            longitude: Location longitude
+            radius_km: Search radius in km
+            max_results: Maximum airports to return
+            
+        Returns:
+            Airport dicts in the Amadeus airports API shape (iataCode, name,
+            address, geoCode, distance, relevance), most relevant first
+        """
+        scored = [
+            (relevance_score(airport.passengers_m, distance), airport, distance)
+            for airport, distance in self.within(latitude, longitude, radius_km)
+        ]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        
+        return [
+            {
+                "type": "location",
+                "subType": "AIRPORT",
+                "name": airport.name,
+                "iataCode": airport.iata,
+                "geoCode": {
+                    "latitude": airport.latitude,
+                    "longitude": airport.longitude,
+                },
+                "address": {
+                    "cityName": airport.city,
+                    "cityCode": airport.city_code,
+                    "countryCode": airport.country_code,
+                },
+                "distance": {
+                    "value": round(distance),
+                    "unit": "KM",
+                },
+                "relevance": round(score, 5),
+            }
+            for score, airport, distance in scored[:max_results]
+        ]
+    
+    def __len__(self) -> int:
+        return len(self._by_iata)
+
+
+@lru_cache
+def get_airport_index() -> AirportIndex:
+    """Get the airport index, loading it on first use."""
+    return AirportIndex.from_csv(settings.AIRPORTS_DATA_PATH or DEFAULT_AIRPORTS_PATH)
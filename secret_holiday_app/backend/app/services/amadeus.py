@@ -8,31 +8,108 @@ Handles authentication and API calls to Amadeus for:
 """
 
 import asyncio
+import json
 import logging
-from datetime import datetime, timedelta
+import time
 from typing import Optional
+from urllib.parse import urlparse
 
 import httpx
 
 from app.config import settings
+from app.services.amadeus_auth import AmadeusTokenManager
+from app.services.cache import CacheEntry, TieredCache
+from app.services.hedging import HedgeBudget, LatencyTracker, hedged
+from app.services.price_history import PriceHistoryStore
+from app.services.rate_limit import Priority, RateLimitExceeded, RequestScheduler
+from app.services.resilience import (
+    CircuitOpenError,
+    backoff_delay,
+    get_circuit_breaker,
+    is_retryable_status,
+)
+from app.services.singleflight import SingleFlight
+from app.services.upstream_metrics import record_upstream_call
 
 logger = logging.getLogger(__name__)
 
+# Rate limit bucket for each Amadeus endpoint
+ENDPOINT_CLASSES = {
+    "/v1/shopping/flight-destinations": "flight-destinations",
+    "/v2/shopping/flight-offers": "flight-offers",
+    "/v1/reference-data/locations/airports": "airports",
+}
+
+
+class AmadeusError(Exception):
+    """Amadeus returned an error response."""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AmadeusRateLimitError(AmadeusError):
+    """Amadeus throttled us (HTTP 429)."""
+    pass
+
 
 class AmadeusService:
     """
     Amadeus API client with OAuth token caching.
     
-    Tokens are valid for ~30 minutes, so we cache and reuse them.
+    Tokens are valid for ~30 minutes, so we cache and reuse them and
+    refresh them in the background before they expire.
+    Flight Inspiration responses are cached too (see get_flight_destinations),
+    and every fare fetched is recorded in the price history store.
+    
+    All calls share one pooled HTTP/2 client so connections (and their
+    TLS handshakes) are reused. Call start()/close() from the app lifespan.
+    
+    Calls are paced by a client-side rate limiter with per-endpoint budgets;
+    when it is saturated, requests queue by priority. A circuit breaker
+    fails calls fast while Amadeus is degraded, and transient errors are
+    retried with jittered backoff. Slow GETs to hedged endpoints are
+    duplicated after a tracked latency percentile (see hedging).
     """
     
     _instance: Optional["AmadeusService"] = None
     
     def __init__(self):
-        self._access_token: Optional[str] = None
-        self._token_expires_at: Optional[datetime] = None
-        self._lock = asyncio.Lock()
+        self._tokens = AmadeusTokenManager(
+            self._fetch_token,
+            refresh_margin=settings.AMADEUS_TOKEN_REFRESH_MARGIN_SECONDS,
+        )
+        self._in_flight = SingleFlight()
+        self._scheduler = RequestScheduler(
+            global_rate=settings.AMADEUS_RATE_LIMIT_PER_SECOND,
+            global_burst=settings.AMADEUS_RATE_LIMIT_BURST,
+            endpoint_limits=settings.amadeus_endpoint_rate_limits,
+            max_queue=settings.AMADEUS_QUEUE_MAX_DEPTH,
+            max_wait=settings.AMADEUS_QUEUE_MAX_WAIT_SECONDS,
+        )
         self.base_url = settings.AMADEUS_BASE_URL
+        self._breaker = get_circuit_breaker(urlparse(self.base_url).netloc)
+        self._latency = LatencyTracker(
+            percentile=settings.AMADEUS_HEDGE_PERCENTILE,
+            min_samples=settings.AMADEUS_HEDGE_MIN_SAMPLES,
+            min_delay=settings.AMADEUS_HEDGE_MIN_DELAY_SECONDS,
+        )
+        self._hedge_budget = HedgeBudget(settings.AMADEUS_HEDGE_MAX_RATE)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: Optional[TieredCache] = None
+        if settings.AMADEUS_CACHE_ENABLED:
+            self._cache = TieredCache(
+                memory_entries=settings.AMADEUS_CACHE_MEMORY_ENTRIES,
+                db_path=settings.AMADEUS_CACHE_DB_PATH or None,
+                db_max_entries=settings.AMADEUS_CACHE_DB_MAX_ENTRIES,
+            )
+        self.history: Optional[PriceHistoryStore] = None
+        if settings.PRICE_HISTORY_ENABLED and settings.PRICE_HISTORY_DB_PATH:
+            self.history = PriceHistoryStore(
+                settings.PRICE_HISTORY_DB_PATH,
+                retention_days=settings.PRICE_HISTORY_RETENTION_DAYS,
+            )
         
     @classmethod
     def get_instance(cls) -> "AmadeusService":
@@ -41,56 +118,84 @@ class AmadeusService:
             cls._instance = cls()
         return cls._instance
     
+    async def start(self) -> None:
+        """Open the pooled HTTP client and start token refresh (app startup)."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+            logger.info(
+                f"Amadeus HTTP client opened (http2={settings.AMADEUS_HTTP2}, "
+                f"max_connections={settings.AMADEUS_MAX_CONNECTIONS})"
+            )
+        if settings.AMADEUS_API_KEY:
+            self._tokens.start()
+    
+    async def close(self) -> None:
+        """Stop token refresh and close the HTTP client and cache (app shutdown)."""
+        await self._tokens.stop()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._cache is not None:
+            self._cache.close()
+        if self.history is not None:
+            await self.history.close()
+    
+    @staticmethod
+    def _create_client() -> httpx.AsyncClient:
+        """Create the long-lived HTTP client with connection pooling."""
+        return httpx.AsyncClient(
+            http2=settings.AMADEUS_HTTP2,
+            timeout=httpx.Timeout(
+                settings.AMADEUS_TIMEOUT_SECONDS,
+                connect=settings.AMADEUS_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.AMADEUS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AMADEUS_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.AMADEUS_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use if start() wasn't called."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+    
     async def _get_token(self) -> str:
+        """Get a valid access token (only waits if none is cached)."""
+        return await self._tokens.get_token()
+    
+    async def _fetch_token(self) -> tuple[str, int]:
         """
-        Get a valid access token, refreshing if needed.
+        Get a new OAuth token from Amadeus.
         
-        Uses double-checked locking to avoid race conditions.
+        Returns:
+            Tuple of (access token, expires_in seconds)
         """
-        # Quick check without lock
-        if self._is_token_valid():
-            return self._access_token  # type: ignore
-        
-        async with self._lock:
-            # Re-check after acquiring lock
-            if self._is_token_valid():
-                return self._access_token  # type: ignore
-            
-            # Token expired or missing, get a new one
-            await self._refresh_token()
-            return self._access_token  # type: ignore
-    
-    def _is_token_valid(self) -> bool:
-        """Check if current token is still valid (with 60s buffer)."""
-        if not self._access_token or not self._token_expires_at:
-            return False
-        return datetime.now() < self._token_expires_at - timedelta(seconds=60)
-    
-    async def _refresh_token(self) -> None:
-        """Get a new OAuth token from Amadeus."""
         logger.info("Refreshing Amadeus OAuth token...")
+        record_upstream_call("amadeus_auth")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/v1/security/oauth2/token",
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": settings.AMADEUS_API_KEY,
-                    "client_secret": settings.AMADEUS_API_SECRET,
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to get Amadeus token: {response.text}")
-                raise Exception(f"Amadeus auth failed: {response.status_code}")
-            
-            data = response.json()
-            self._access_token = data["access_token"]
-            expires_in = data.get("expires_in", 1799)  # Default ~30 mins
-            self._token_expires_at = datetime.now() + timedelta(seconds=expires_in)
-            
-            logger.info(f"Amadeus token refreshed, expires in {expires_in}s")
+        response = await self.client.post(
+            f"{self.base_url}/v1/security/oauth2/token",
+            data={
+                "grant_type": "client_credentials",
+                "client_id": settings.AMADEUS_API_KEY,
+                "client_secret": settings.AMADEUS_API_SECRET,
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"Failed to get Amadeus token: {response.text}")
+            raise Exception(f"Amadeus auth failed: {response.status_code}")
+        
+        data = response.json()
+        expires_in = data.get("expires_in", 1799)  # Default ~30 mins
+        
+        logger.info(f"Amadeus token refreshed, expires in {expires_in}s")
+        return data["access_token"], expires_in
     
     async def _request(
         self,
@@ -98,40 +203,149 @@ class AmadeusService:
         endpoint: str,
         params: Optional[dict] = None,
         json_data: Optional[dict] = None,
+        priority: Priority = Priority.INTERACTIVE,
     ) -> dict:
         """
         Make an authenticated request to Amadeus API.
         
+        Concurrent identical GET requests (same endpoint and params) are
+        coalesced into one upstream call whose parsed result is shared,
+        so callers must not mutate the returned dict.
+        
         Args:
             method: HTTP method (GET, POST, etc.)
             endpoint: API endpoint (e.g., /v1/shopping/flight-destinations)
             params: Query parameters
             json_data: JSON body for POST requests
+            priority: Rate limiter priority when the quota is saturated
             
         Returns:
             Response JSON as dict
+            
+        Raises:
+            AmadeusRateLimitError: If Amadeus throttled the request (429)
+            RateLimitExceeded: If the client-side rate limit queue is full
+            CircuitOpenError: If Amadeus is marked unavailable
+            AmadeusError: For any other error response
+        """
+        if method.upper() != "GET":
+            return await self._send(method, endpoint, params, json_data, priority)
+        
+        key = self._request_key(method, endpoint, params, json_data)
+        return await self._in_flight.do(
+            key,
+            lambda: self._send(method, endpoint, params, json_data, priority),
+        )
+    
+    @staticmethod
+    def _request_key(
+        method: str,
+        endpoint: str,
+        params: Optional[dict],
+        json_data: Optional[dict],
+    ) -> tuple:
+        """Normalize a request into a hashable identity for coalescing."""
+        normalized_params = tuple(sorted(
+            (name, str(value)) for name, value in (params or {}).items()
+        ))
+        body = json.dumps(json_data, sort_keys=True) if json_data else None
+        return (method.upper(), endpoint, normalized_params, body)
+    
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[dict] = None,
+        json_data: Optional[dict] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> dict:
+        """
+        Send an authenticated request.
+        
+        Retries once with a fresh token on 401. Idempotent GETs are also
+        retried on 5xx, 429 and connection errors with jittered backoff,
+        up to UPSTREAM_RETRY_ATTEMPTS times.
         """
         token = await self._get_token()
+        retries_left = settings.UPSTREAM_RETRY_ATTEMPTS if method.upper() == "GET" else 0
+        attempt = 0
+        token_refreshed = False
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.request(
-                method=method,
-                url=f"{self.base_url}{endpoint}",
-                params=params,
-                json=json_data,
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Accept": "application/json",
-                },
-            )
+        while True:
+            try:
+                response = await self._send_once(method, endpoint, params, json_data, token, priority)
+            except httpx.TransportError as e:
+                if attempt >= retries_left:
+                    raise AmadeusError(f"Amadeus request failed: {e!r}") from e
+                delay = backoff_delay(attempt)
+                logger.warning(f"Amadeus request error on {endpoint} ({e!r}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
             
-            if response.status_code == 401:
-                # Token might have expired, try once more
+            if response.status_code == 401 and not token_refreshed:
+                # Token might have expired or been revoked - refresh (shared
+                # with any other request that saw the same 401) and try once more
                 logger.warning("Amadeus returned 401, refreshing token...")
-                await self._refresh_token()
-                token = self._access_token
-                
-                response = await client.request(
+                token = await self._tokens.refresh(stale_token=token)
+                token_refreshed = True
+                continue
+            
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self._scheduler.pause(retry_after, ENDPOINT_CLASSES.get(endpoint, "default"))
+                if attempt >= retries_left:
+                    logger.warning(f"Amadeus rate limited {endpoint}, giving up")
+                    raise AmadeusRateLimitError(f"Amadeus rate limited: {endpoint}", status_code=429)
+            
+            if is_retryable_status(response.status_code) and attempt < retries_left:
+                delay = backoff_delay(attempt)
+                logger.warning(
+                    f"Amadeus returned {response.status_code} for {endpoint}, retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            
+            break
+        
+        if response.status_code != 200:
+            logger.error(f"Amadeus API error: {response.status_code} - {response.text}")
+            raise AmadeusError(f"Amadeus API error: {response.status_code}", response.status_code)
+        
+        return response.json()
+    
+    async def _send_once(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[dict],
+        json_data: Optional[dict],
+        token: str,
+        priority: Priority,
+    ) -> httpx.Response:
+        """
+        Wait for a rate limit slot, then send one HTTP request.
+        
+        The result is reported to the Amadeus circuit breaker: 5xx and
+        connection errors count as failures. A half-open probe that ends
+        any other way (cancelled, or an error before a response) gives its
+        probe slot back without a verdict.
+        
+        GETs to hedged endpoints that haven't answered by the endpoint's
+        latency percentile are sent a second time (within the hedge rate
+        cap and the rate limiter) and the first non-5xx answer is used.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open (fails fast, nothing sent)
+        """
+        endpoint_class = ENDPOINT_CLASSES.get(endpoint, "default")
+        await self._scheduler.acquire(endpoint_class, priority)
+        
+        async def send() -> httpx.Response:
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(
                     method=method,
                     url=f"{self.base_url}{endpoint}",
                     params=params,
@@ -141,12 +355,50 @@ class AmadeusService:
                         "Accept": "application/json",
                     },
                 )
-            
-            if response.status_code != 200:
-                logger.error(f"Amadeus API error: {response.status_code} - {response.text}")
-                raise Exception(f"Amadeus API error: {response.status_code}")
-            
-            return response.json()
+            except asyncio.CancelledError:
+                # A cancelled call (e.g. a losing hedge) took at least this long
+                self._latency.record(endpoint_class, time.perf_counter() - start)
+                raise
+            if response.status_code < 500:
+                self._latency.record(endpoint_class, time.perf_counter() - start)
+            return response
+        
+        async def before_hedge() -> None:
+            await self._scheduler.acquire(endpoint_class, priority)
+            record_upstream_call("amadeus")
+        
+        delay = None
+        if (
+            settings.AMADEUS_HEDGE_ENABLED
+            and method.upper() == "GET"
+            and endpoint_class in settings.amadeus_hedge_endpoints
+        ):
+            self._hedge_budget.record_call()
+            delay = self._latency.hedge_delay(endpoint_class)
+        
+        probe = self._breaker.before_call()
+        record_upstream_call("amadeus")
+        try:
+            response = await hedged(
+                send,
+                delay,
+                self._hedge_budget.try_acquire,
+                before_hedge,
+                is_success=lambda r: r.status_code < 500,
+            )
+        except httpx.TransportError:
+            self._breaker.record_failure()
+            raise
+        except BaseException:
+            if probe:
+                self._breaker.release_probe()
+            raise
+        
+        if response.status_code >= 500:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+        return response
     
     async def get_nearest_airports(
         self,
@@ -154,6 +406,7 @@ class AmadeusService:
         longitude: float,
         radius: int = 100,
         max_results: int = 5,
+        priority: Priority = Priority.INTERACTIVE,
     ) -> list[dict]:
         """
         Find airports near a location.
@@ -163,6 +416,7 @@ class AmadeusService:
             longitude: Location longitude
             radius: Search radius in km (default 100)
             max_results: Maximum airports to return
+            priority: Rate limiter priority
             
         Returns:
             List of airport dicts with iataCode, name, distance, etc.
@@ -178,6 +432,7 @@ class AmadeusService:
                     "page[limit]": max_results,
                     "sort": "relevance",
                 },
+                priority=priority,
             )
             return result.get("data", [])
         except Exception as e:
@@ -192,6 +447,9 @@ class AmadeusService:
         duration: Optional[str] = None,
         max_price: Optional[int] = None,
         view_by: str = "DATE",
+        priority: Priority = Priority.INTERACTIVE,
+        refresh: bool = False,
+        store: bool = True,
     ) -> list[dict]:
         """
         Get flight destination suggestions from an origin.
@@ -199,6 +457,10 @@ class AmadeusService:
         This uses the Flight Inspiration Search API which returns
         destinations sorted by price.
         
+        Responses are cached per origin/departureDate/duration/viewBy.
+        A cached response fetched with a higher (or no) max_price also
+        answers lower-budget queries by filtering locally.
+        
         Args:
             origin: IATA airport/city code (e.g., "LON", "LTN")
             departure_date: Date or date range (e.g., "2025-06" for whole month)
@@ -206,9 +468,18 @@ class AmadeusService:
             duration: Trip duration (e.g., "1" for 1 night, "1,2,3" for range)
             max_price: Maximum price in the currency of the origin
             view_by: "DATE", "DURATION", "WEEK", or "DESTINATION"
+            priority: Rate limiter priority
+            refresh: Skip the cache read and replace the cached response
+            store: False to not cache the response (e.g. a fetch pruned
+                below the caller's real budget)
             
         Returns:
             List of destination dicts with destination, price, departureDate, etc.
+            
+        Raises:
+            AmadeusRateLimitError, RateLimitExceeded, CircuitOpenError: When
+                throttled or unavailable, so the caller can tell "no results"
+                apart from "not searched"
         """
         params = {
             "origin": origin,
@@ -223,16 +494,70 @@ class AmadeusService:
         if max_price:
             params["maxPrice"] = max_price
         
+        cache_key = self._destinations_cache_key(params)
+        if self._cache is not None and not refresh:
+            entry = await self._cache.get(cache_key)
+            if entry is not None:
+                cached = filter_by_max_price(entry.value, max_price)
+                if cached is not None:
+                    logger.debug(f"Flight destinations cache hit: {cache_key}")
+                    return cached
+        
         try:
             result = await self._request(
                 "GET",
                 "/v1/shopping/flight-destinations",
                 params=params,
+                priority=priority,
             )
-            return result.get("data", [])
+        except (AmadeusRateLimitError, RateLimitExceeded, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Failed to get flight destinations: {e}")
             return []
+        
+        data = result.get("data", [])
+        if self.history is not None:
+            self.history.record(origin, data, view_by=view_by)
+        if self._cache is not None and store:
+            await self._cache.set(
+                cache_key,
+                {"max_price": max_price or None, "data": data},
+                ttl=settings.AMADEUS_CACHE_TTL_SECONDS,
+            )
+        return data
+    
+    async def cached_flight_destinations(
+        self,
+        origin: str,
+        departure_date: Optional[str] = None,
+        one_way: bool = False,
+        duration: Optional[str] = None,
+        view_by: str = "DATE",
+    ) -> Optional[CacheEntry]:
+        """
+        Get the cached response for a flight-destinations query, if any.
+        
+        The entry's value is {"max_price": ..., "data": [...]}; max_price
+        is None when the response was fetched without a price cap.
+        """
+        if self._cache is None:
+            return None
+        
+        params = {"origin": origin, "oneWay": str(one_way).lower(), "viewBy": view_by}
+        if departure_date:
+            params["departureDate"] = departure_date
+        if duration:
+            params["duration"] = duration
+        return await self._cache.get(self._destinations_cache_key(params))
+    
+    @staticmethod
+    def _destinations_cache_key(params: dict) -> str:
+        """Build the cache key for a flight-destinations query (ignores maxPrice)."""
+        return "flight-destinations|" + "|".join(
+            f"{name}={params.get(name, '')}"
+            for name in ("origin", "departureDate", "duration", "viewBy", "oneWay")
+        )
     
     async def get_flight_offers(
         self,
@@ -244,6 +569,7 @@ class AmadeusService:
         max_results: int = 10,
         max_price: Optional[int] = None,
         currency: str = "GBP",
+        priority: Priority = Priority.INTERACTIVE,
     ) -> list[dict]:
         """
         Search for actual bookable flight offers.
@@ -260,9 +586,15 @@ class AmadeusService:
             max_results: Maximum offers to return
             max_price: Maximum total price
             currency: Currency code (default GBP)
+            priority: Rate limiter priority
             
         Returns:
             List of flight offer dicts
+            
+        Raises:
+            AmadeusRateLimitError, RateLimitExceeded, CircuitOpenError: When
+                throttled or unavailable, so the caller can tell "no offers"
+                apart from "not searched"
         """
         params = {
             "originLocationCode": origin,
@@ -283,13 +615,54 @@ class AmadeusService:
                 "GET",
                 "/v2/shopping/flight-offers",
                 params=params,
+                priority=priority,
             )
             return result.get("data", [])
+        except (AmadeusRateLimitError, RateLimitExceeded, CircuitOpenError):
+            raise
         except Exception as e:
             logger.error(f"Failed to get flight offers: {e}")
             return []
 
 
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Parse a Retry-After header given in seconds (dates fall back to default)."""
+    try:
+        return max(0.0, float(value)) if value else default
+    except ValueError:
+        return default
+
+
+def filter_by_max_price(cached: dict, max_price: Optional[int]) -> Optional[list[dict]]:
+    """
+    Answer a query from a cached flight-destinations response.
+    
+    Args:
+        cached: Cached value with the max_price it was fetched with and its data
+        max_price: Budget of the new query (None for no limit)
+        
+    Returns:
+        Matching data items, or None if the cached response can't answer
+        the query (it was fetched with a lower budget)
+    """
+    cached_max = cached.get("max_price")
+    if cached_max is not None and (not max_price or max_price > cached_max):
+        return None
+    
+    if not max_price or max_price == cached_max:
+        return cached["data"]
+    
+    results = []
+    for item in cached["data"]:
+        try:
+            price = float(item.get("price", {}).get("total"))
+        except (TypeError, ValueError):
+            continue
+        if price <= max_price:
+            results.append(item)
+    return results
+
+
 # Convenience function for dependency injection
 def get_amadeus_service() -> AmadeusService:
     """Get the Amadeus service singleton."""
@@ -0,0 +1,127 @@
+"""
+Amadeus OAuth Token Manager
+
+Keeps an Amadeus access token valid without making requests wait:
+- A background task refreshes the token well before it expires
+- Every refresh (background, on-demand or after a 401) goes through one
+  in-flight call, so a revoked token triggers a single refresh rather
+  than one per concurrent request
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Fetches a new token, returning (access_token, expires_in_seconds)
+TokenFetcher = Callable[[], Awaitable[tuple[str, int]]]
+
+
+class AmadeusTokenManager:
+    """
+    Caches an OAuth token and refreshes it ahead of expiry.
+    
+    Args:
+        fetch: Coroutine function that requests a new token
+        refresh_margin: Seconds before expiry at which the background
+            task refreshes the token
+        expiry_buffer: Seconds before expiry after which the token is no
+            longer handed out (requests then wait for a refresh)
+    """
+    
+    RETRY_DELAY_SECONDS = 10.0
+    # Cap on the wait before refreshing a token that lives no longer than refresh_margin
+    MIN_REFRESH_INTERVAL_SECONDS = 30.0
+    
+    def __init__(
+        self,
+        fetch: TokenFetcher,
+        refresh_margin: float = 300.0,
+        expiry_buffer: float = 60.0,
+    ):
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.expiry_buffer = expiry_buffer
+        self._token: Optional[str] = None
+        self._expires_at: float = 0.0  # time.monotonic() timestamp
+        self._in_flight = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+    
+    def is_valid(self) -> bool:
+        """Check if the current token can still be used (with buffer)."""
+        return (
+            self._token is not None
+            and time.monotonic() < self._expires_at - self.expiry_buffer
+        )
+    
+    async def get_token(self) -> str:
+        """Get a valid token, waiting for a refresh only if there isn't one."""
+        if self.is_valid():
+            return self._token  # type: ignore
+        return await self.refresh()
+    
+    async def refresh(self, stale_token: Optional[str] = None) -> str:
+        """
+        Refresh the token, joining a refresh that is already in flight.
+        
+        Args:
+            stale_token: Token that was just rejected (e.g. by a 401). If the
+                current token is already a different, valid one, it is
+                returned without refreshing again.
+        
+        Returns:
+            The new access token
+        """
+        if stale_token is not None and self._token != stale_token and self.is_valid():
+            return self._token  # type: ignore
+        return await self._in_flight.do("token", self._do_refresh)
+    
+    async def _do_refresh(self) -> str:
+        """Fetch a new token and store it."""
+        token, expires_in = await self._fetch()
+        self._token = token
+        self._expires_at = time.monotonic() + expires_in
+        return token
+    
+    def start(self) -> None:
+        """Start the background refresh task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self) -> None:
+        """Stop the background refresh task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _refresh_loop(self) -> None:
+        """
+        Refresh the token `refresh_margin` seconds before it expires.
+        
+        A token that lives no longer than the margin is refreshed halfway
+        through its life (at most MIN_REFRESH_INTERVAL_SECONDS in), rather
+        than back to back.
+        """
+        while True:
+            delay = 0.0
+            if self._token is not None:
+                remaining = self._expires_at - time.monotonic()
+                delay = max(remaining - self.refresh_margin, min(self.MIN_REFRESH_INTERVAL_SECONDS, remaining / 2))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Background Amadeus token refresh failed: {e}")
+                await asyncio.sleep(self.RETRY_DELAY_SECONDS)
@@ -0,0 +1,284 @@
+"""
+Response Cache
+
+Two-tier TTL cache used to avoid repeating upstream API calls:
+- An in-memory LRU for hot entries (per process)
+- A local SQLite file that survives restarts and is shared by workers
+
+Values must be JSON-serializable.
+
+Usage:
+    cache = TieredCache(memory_entries=1000, db_path="./cache/api.sqlite3")
+    entry = await cache.get("some-key")
+    await cache.set("some-key", {"data": [...]}, ttl=3600)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """A cached value and its absolute expiry time (epoch seconds)."""
+    value: Any
+    expires_at: float
+    
+    @property
+    def ttl_remaining(self) -> float:
+        """Seconds until this entry expires (negative if already expired)."""
+        return self.expires_at - time.time()
+    
+    def is_expired(self) -> bool:
+        """Check if the entry has passed its expiry time."""
+        return self.ttl_remaining <= 0
+
+
+class LRUCache:
+    """
+    In-memory LRU cache with per-entry TTL.
+    
+    Least recently used entries are evicted once max_entries is reached.
+    
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+        on_remove: Called with (key, entry) when an entry expires, is
+            evicted or is deleted
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        on_remove: Optional[Callable[[str, CacheEntry], None]] = None,
+    ):
+        self.max_entries = max_entries
+        self.on_remove = on_remove
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+    
+    def _removed(self, key: str, entry: CacheEntry) -> None:
+        if self.on_remove is not None:
+            self.on_remove(key, entry)
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get a live entry, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        if entry.is_expired():
+            del self._entries[key]
+            self._removed(key, entry)
+            return None
+        
+        self._entries.move_to_end(key)
+        return entry
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry, evicting the least recently used if full."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._removed(*self._entries.popitem(last=False))
+    
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._removed(key, entry)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCache:
+    """
+    On-disk cache tier backed by a single SQLite table.
+    
+    Expired rows are ignored on read and purged on write. When the table
+    grows past max_entries, the least recently accessed rows are evicted.
+    Methods are blocking - call them from a worker thread.
+    """
+    
+    # Check the size limit every N writes rather than on every write
+    EVICTION_CHECK_INTERVAL = 100
+    
+    def __init__(self, path: str, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes_since_check = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and create the table on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get a live entry, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        
+        return CacheEntry(value=json.loads(row[0]), expires_at=row[1])
+    
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry, evicting old rows if the table is full."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(entry.value), entry.expires_at, now),
+            )
+            
+            self._writes_since_check += 1
+            if self._writes_since_check >= self.EVICTION_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict(conn, now)
+            
+            conn.commit()
+    
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            conn.commit()
+    
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Purge expired rows, then trim to max_entries by last access."""
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            logger.info(f"Evicted {excess} entries from {self.path}")
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional SQLite tier.
+    
+    Reads check memory first, then disk (promoting disk hits into memory).
+    Writes go to both tiers. Disk I/O runs in a worker thread so it never
+    blocks the event loop. Disk errors are logged and treated as misses.
+    """
+    
+    def __init__(
+        self,
+        memory_entries: int = 1000,
+        db_path: Optional[str] = None,
+        db_max_entries: int = 50000,
+    ):
+        self.memory = LRUCache(memory_entries)
+        self.disk = SqliteCache(db_path, db_max_entries) if db_path else None
+    
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """Get a live entry from memory or disk, or None on a miss."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        
+        if self.disk is None:
+            return None
+        
+        try:
+            entry = await asyncio.to_thread(self.disk.get, key)
+        except Exception as e:
+            logger.warning(f"Disk cache read failed: {e}")
+            return None
+        
+        if entry is not None:
+            self.memory.set(key, entry)
+        return entry
+    
+    async def set(self, key: str, value: Any, ttl: float) -> CacheEntry:
+        """
+        Store a value in both tiers.
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Time to live in seconds
+            
+        Returns:
+            The stored CacheEntry
+        """
+        entry = CacheEntry(value=value, expires_at=time.time() + ttl)
+        self.memory.set(key, entry)
+        
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, entry)
+            except Exception as e:
+                logger.warning(f"Disk cache write failed: {e}")
+        
+        return entry
+    
+    async def delete(self, key: str) -> None:
+        """Remove a key from both tiers."""
+        self.memory.delete(key)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.delete, key)
+            except Exception as e:
+                logger.warning(f"Disk cache delete failed: {e}")
+    
+    def close(self) -> None:
+        """Close the disk tier."""
+        if self.disk is not None:
+            self.disk.close()
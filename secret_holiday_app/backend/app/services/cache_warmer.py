@@ -0,0 +1,198 @@
+"""
+Background Cache Warmer
+
+Keeps the Amadeus flight-destinations cache warm for the searches most
+users make: a hot set of origins (CACHE_WARMER_ORIGINS) × the next few
+months × common trip lengths, searched exactly as the suggestion
+pipeline searches them (first of the month, viewBy=DESTINATION, no price
+cap, so the cached response answers any budget).
+
+Every CACHE_WARMER_INTERVAL_SECONDS the warmer looks up each hot key in
+the cache and refreshes the ones that are missing, were fetched with a
+price cap, or expire within CACHE_WARMER_REFRESH_AHEAD_SECONDS - soonest
+expiry first - so user requests find a live entry instead of waiting on
+Amadeus. Refreshes run at Priority.BACKGROUND, behind user traffic, and
+never spend more than CACHE_WARMER_MAX_CALLS_PER_HOUR calls.
+
+Usage:
+    warmer = get_cache_warmer()
+    warmer.start()       # app startup
+    await warmer.stop()  # app shutdown
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+from app.services.amadeus import AmadeusService, get_amadeus_service
+from app.services.flight_search import SearchKey
+from app.services.rate_limit import Priority
+from app.services.suggestion_pipeline import upcoming_months
+
+logger = logging.getLogger(__name__)
+
+
+def hot_search_keys(
+    origins: Optional[list[str]] = None,
+    months: Optional[int] = None,
+    durations: Optional[list[int]] = None,
+) -> list[SearchKey]:
+    """
+    The searches to keep warm: origins × upcoming months × trip lengths.
+    
+    Defaults come from the CACHE_WARMER_* settings. Months roll over, so
+    this is rebuilt on every pass.
+    """
+    origins = origins or settings.cache_warmer_origins_list
+    durations = durations or settings.cache_warmer_durations_list
+    return [
+        SearchKey(origin=origin, departure_date=f"{year}-{month:02d}-01", duration=str(nights))
+        for year, month in upcoming_months(months or settings.CACHE_WARMER_MONTHS)
+        for origin in origins
+        for nights in durations
+    ]
+
+
+class CallBudget:
+    """Sliding one-hour window of upstream calls spent."""
+    
+    WINDOW_SECONDS = 3600.0
+    
+    def __init__(self, max_calls_per_hour: int):
+        self.max_calls = max_calls_per_hour
+        self._spent: deque[float] = deque()
+    
+    def available(self) -> int:
+        """Calls that can still be made in the current window."""
+        cutoff = time.monotonic() - self.WINDOW_SECONDS
+        while self._spent and self._spent[0] < cutoff:
+            self._spent.popleft()
+        return max(0, self.max_calls - len(self._spent))
+    
+    def spend(self) -> None:
+        """Record one call."""
+        self._spent.append(time.monotonic())
+
+
+class CacheWarmer:
+    """Periodically refreshes hot flight-destinations searches ahead of expiry."""
+    
+    def __init__(
+        self,
+        amadeus: AmadeusService,
+        interval: Optional[float] = None,
+        refresh_ahead: Optional[float] = None,
+        max_calls_per_hour: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.amadeus = amadeus
+        self.interval = interval or settings.CACHE_WARMER_INTERVAL_SECONDS
+        self.refresh_ahead = refresh_ahead or settings.CACHE_WARMER_REFRESH_AHEAD_SECONDS
+        self.budget = CallBudget(max_calls_per_hour or settings.CACHE_WARMER_MAX_CALLS_PER_HOUR)
+        self.concurrency = concurrency or settings.CACHE_WARMER_CONCURRENCY
+        self._task: Optional[asyncio.Task] = None
+    
+    async def due_keys(self, keys: list[SearchKey]) -> list[SearchKey]:
+        """
+        Hot keys that need refreshing, soonest expiry first.
+        
+        A key is due if it is not cached, was cached with a price cap, or
+        expires within refresh_ahead seconds.
+        """
+        due: list[tuple[float, SearchKey]] = []
+        for key in keys:
+            entry = await self.amadeus.cached_flight_destinations(
+                origin=key.origin,
+                departure_date=key.departure_date,
+                duration=key.duration,
+                view_by="DESTINATION",
+            )
+            if entry is None or entry.value.get("max_price") is not None:
+                due.append((float("-inf"), key))
+            elif entry.ttl_remaining < self.refresh_ahead:
+                due.append((entry.ttl_remaining, key))
+        
+        due.sort(key=lambda item: item[0])
+        return [key for _, key in due]
+    
+    async def _refresh(self, key: SearchKey, semaphore: asyncio.Semaphore) -> bool:
+        """Refetch one search into the cache; False if it failed."""
+        async with semaphore:
+            self.budget.spend()
+            try:
+                await self.amadeus.get_flight_destinations(
+                    origin=key.origin,
+                    departure_date=key.departure_date,
+                    duration=key.duration,
+                    view_by="DESTINATION",
+                    priority=Priority.BACKGROUND,
+                    refresh=True,
+                )
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Cache warm failed for {key}: {e}")
+                return False
+    
+    async def warm_once(self) -> int:
+        """
+        Run one warming pass.
+        
+        Returns:
+            Number of searches refreshed
+        """
+        keys = hot_search_keys()
+        due = await self.due_keys(keys)
+        available = self.budget.available()
+        selected = due[:available]
+        
+        if not selected:
+            logger.debug(f"Cache warmer: {len(keys)} hot keys, none due")
+            return 0
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._refresh(key, semaphore) for key in selected))
+        refreshed = sum(results)
+        
+        logger.info(
+            f"Cache warmer: refreshed {refreshed}/{len(selected)} of {len(due)} due "
+            f"({len(keys)} hot keys, {self.budget.available()} calls left this hour)"
+        )
+        return refreshed
+    
+    def start(self) -> None:
+        """Start the background warming task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._warm_loop())
+    
+    async def stop(self) -> None:
+        """Stop the background warming task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _warm_loop(self) -> None:
+        """Warm the cache every `interval` seconds."""
+        while True:
+            try:
+                await self.warm_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache warming pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+@lru_cache
+def get_cache_warmer() -> CacheWarmer:
+    """Get the process-wide cache warmer."""
+    return CacheWarmer(get_amadeus_service())
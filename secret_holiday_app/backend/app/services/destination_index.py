@@ -0,0 +1,155 @@
+"""
+Destination Enrichment Index
+
+Maps any destination IATA code (airport or metro city code) to its city,
+country, coordinates and nearest population centre, so suggestions can
+be enriched without a hand-maintained table.
+
+The index is generated by scripts/build_destination_index.py from a
+reference airports file joined with assets/data/europe_destinations_ext.json.gz,
+and stored column-oriented in app/data/destination_index.json.gz. It is
+loaded once into flat arrays (about 8,000 codes in well under 1 MB);
+lookups are a dict hit plus a few array reads.
+
+Usage:
+    index = get_destination_index()
+    info = index.get("BCN")  # DestinationInfo(city="Barcelona", ...)
+"""
+
+import gzip
+import json
+import logging
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent.parent / "data" / "destination_index.json.gz"
+
+INDEX_VERSION = 1
+
+COORDINATE_SCALE = 1e5  # Coordinates are stored as integers (~1 m precision)
+
+
+@dataclass(frozen=True)
+class DestinationInfo:
+    """Enrichment data for one destination code."""
+    code: str
+    city: str
+    country: Optional[str]
+    country_code: Optional[str]
+    latitude: float
+    longitude: float
+    population_centre: Optional[str] = None  # Largest nearby place in the places dataset
+    population: int = 0  # Population of the population centre
+    centre_distance_km: int = 0
+
+
+class DestinationIndex:
+    """
+    Array-backed lookup table of destination codes.
+    
+    Each column is a flat array indexed by row; `_rows` maps a code to
+    its row. Strings stay in lists, country names are stored once per
+    country.
+    """
+    
+    def __init__(self, data: dict):
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported destination index version: {data.get('version')}")
+        
+        codes = data["codes"]
+        self._codes = [codes[i:i + 3] for i in range(0, len(codes), 3)]
+        self._rows = {code: row for row, code in enumerate(self._codes)}
+        
+        self._countries: list[str] = data["countries"]
+        self._country_names: list[str] = data["country_names"]
+        self._city: list[str] = data["city"]
+        self._centre: list[str] = data["centre"]
+        
+        self._country = array("H", data["country"])
+        self._lat = array("i", data["lat"])
+        self._lon = array("i", data["lon"])
+        self._population = array("L", data["centre_population"])
+        self._centre_distance = array("H", data["centre_distance_km"])
+    
+    @classmethod
+    def load(cls, path: Path | str = DEFAULT_INDEX_PATH) -> "DestinationIndex":
+        """Load an index written by scripts/build_destination_index.py."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            index = cls(json.load(f))
+        
+        logger.info(f"Loaded destination index with {len(index)} codes from {path}")
+        return index
+    
+    def row(self, code: str) -> Optional[int]:
+        """Row number for a code (None if unknown)."""
+        return self._rows.get(code.upper())
+    
+    def get(self, code: str) -> Optional[DestinationInfo]:
+        """
+        Look up a destination code.
+        
+        Args:
+            code: IATA airport or metro city code
+        
+        Returns:
+            DestinationInfo, or None if the code is not in the index
+        """
+        row = self.row(code)
+        if row is None:
+            return None
+        
+        country = self._country[row]
+        return DestinationInfo(
+            code=self._codes[row],
+            city=self._city[row],
+            country=self._country_names[country] or None,
+            country_code=self._countries[country] or None,
+            latitude=self._lat[row] / COORDINATE_SCALE,
+            longitude=self._lon[row] / COORDINATE_SCALE,
+            population_centre=self._centre[row] or None,
+            population=self._population[row],
+            centre_distance_km=self._centre_distance[row],
+        )
+    
+    def rows(self, codes: list[str]) -> list[int]:
+        """Row numbers for many codes (-1 for unknown codes)."""
+        return list(map(self._rows.get, codes, repeat(-1)))
+    
+    @property
+    def columns(self) -> dict[str, array]:
+        """
+        The raw numeric columns, for vectorized use (e.g. numpy.frombuffer).
+        
+        lat/lon are scaled by COORDINATE_SCALE; population is the
+        population centre's population.
+        """
+        return {
+            "lat": self._lat,
+            "lon": self._lon,
+            "population": self._population,
+        }
+    
+    def coordinates(self, code: str) -> Optional[tuple[float, float]]:
+        """(latitude, longitude) for a code, without building a DestinationInfo."""
+        row = self.row(code)
+        if row is None:
+            return None
+        return self._lat[row] / COORDINATE_SCALE, self._lon[row] / COORDINATE_SCALE
+    
+    def __contains__(self, code: str) -> bool:
+        return code.upper() in self._rows
+    
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+@lru_cache
+def get_destination_index() -> DestinationIndex:
+    """Get the destination index, loading it on first use."""
+    return DestinationIndex.load()
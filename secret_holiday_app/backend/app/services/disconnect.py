@@ -0,0 +1,73 @@
+"""
+Client Disconnect Handling
+
+Starlette keeps running a (non-streaming) endpoint after its client has
+gone away, so a user leaving the results screen mid-search would still
+pay for every Amadeus call. run_until_disconnected runs the work as a
+task and polls the connection; when the client disconnects the task is
+cancelled, which cancels the outstanding upstream work under it:
+- the search fan-out cancels its in-flight searches
+- coalesced calls (SingleFlight) are only cancelled when no other
+  request is still waiting on them
+- requests queued in the rate limiter give up their place
+
+Streaming endpoints don't need this: Starlette cancels the response
+generator itself on disconnect.
+
+Usage:
+    response = await run_until_disconnected(http_request, pipeline.run())
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Non-standard "client closed request" status (nginx); never seen by the client
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def run_until_disconnected(
+    http_request: Request,
+    work: Awaitable[T],
+    poll_interval: Optional[float] = None,
+) -> T:
+    """
+    Await work, cancelling it if the client disconnects first.
+    
+    Args:
+        http_request: The incoming request to watch
+        work: Coroutine or task to run
+        poll_interval: Seconds between connection checks
+            (defaults to CLIENT_DISCONNECT_POLL_SECONDS)
+    
+    Returns:
+        The work's result
+    
+    Raises:
+        HTTPException: 499 if the client disconnected
+    """
+    poll_interval = poll_interval or settings.CLIENT_DISCONNECT_POLL_SECONDS
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected from {http_request.url.path}, cancelling upstream work")
+                task.cancel()
+                # Let the work's cleanup (cancelling its own tasks) finish
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,193 @@
+"""
+Flight Offers for Search Sessions
+
+Bookable flight offers (/v2/shopping/flight-offers) for a destination
+of a search session, on the dates and from the origin of its cheapest
+inspiration fare.
+
+Offer searches are expensive and slow, so once /suggest returns the
+top OFFER_PREFETCH_TOP_N destinations are fetched in the background at
+Priority.PREFETCH (behind any user-facing call) and kept on the search
+session. Opening one of those destinations then returns - or joins -
+the prefetched search instead of starting a new one.
+
+At most OFFER_PREFETCH_CONCURRENCY prefetches run per process; when
+they are all busy, further prefetches are skipped rather than queued,
+and those destinations are fetched when opened. A session's searches
+are cancelled when the session expires or is evicted.
+
+Usage:
+    offers = get_flight_offer_service()
+    offers.prefetch(session, amadeus)
+    response = await offers.get_offers(session, "BCN", amadeus)
+"""
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.models.suggestions import FlightOffersResponse
+from app.services.amadeus import AmadeusRateLimitError, AmadeusService
+from app.services.rate_limit import Priority, RateLimitExceeded
+from app.services.resilience import CircuitOpenError
+from app.services.search_sessions import SearchSession
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_TASK_PREFIX = "offer-prefetch:"
+
+
+class FlightOfferService:
+    """Fetches and prefetches flight offers, cached per search session."""
+    
+    def __init__(self, top_n: Optional[int] = None, concurrency: Optional[int] = None):
+        self.top_n = settings.OFFER_PREFETCH_TOP_N if top_n is None else top_n
+        self.concurrency = concurrency or settings.OFFER_PREFETCH_CONCURRENCY
+        self._prefetching: set[asyncio.Task] = set()
+    
+    @staticmethod
+    def _adults(session: SearchSession) -> int:
+        """Travelers for the session's current ranking."""
+        return (session.ranked_request or session.request).travelers
+    
+    async def _fetch(
+        self,
+        amadeus: AmadeusService,
+        entry: dict,
+        destination: str,
+        adults: int,
+        priority: Priority,
+    ) -> list[dict]:
+        """Run one offer search for a session's price entry."""
+        return await amadeus.get_flight_offers(
+            origin=entry["origin"],
+            destination=destination,
+            departure_date=entry["departure_date"],
+            return_date=entry.get("return_date"),
+            adults=adults,
+            max_results=settings.OFFER_MAX_RESULTS,
+            priority=priority,
+        )
+    
+    @staticmethod
+    def _consume_error(task: asyncio.Task) -> None:
+        """Retrieve a failed search's error, so an unopened prefetch doesn't log "exception never retrieved"."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Flight offer search {task.get_name()} failed: {task.exception()!r}")
+    
+    def _task(
+        self,
+        session: SearchSession,
+        destination: str,
+        amadeus: AmadeusService,
+        prefetch: bool = False,
+    ) -> asyncio.Task:
+        """
+        The session's offer search for a destination, starting one if needed.
+        
+        A search that failed is started again.
+        """
+        adults = self._adults(session)
+        key = (destination, adults)
+        task = session.offers.get(key)
+        if task is not None and not (task.done() and (task.cancelled() or task.exception())):
+            return task
+        
+        entry = session.destination_prices[destination]
+        if prefetch:
+            task = asyncio.create_task(
+                self._fetch(amadeus, entry, destination, adults, Priority.PREFETCH),
+                name=f"{PREFETCH_TASK_PREFIX}{destination}",
+            )
+            self._prefetching.add(task)
+            task.add_done_callback(self._prefetching.discard)
+        else:
+            task = asyncio.create_task(
+                self._fetch(amadeus, entry, destination, adults, Priority.INTERACTIVE)
+            )
+        task.add_done_callback(self._consume_error)
+        session.offers[key] = task
+        return task
+    
+    def prefetch(self, session: SearchSession, amadeus: AmadeusService) -> list[str]:
+        """
+        Start background offer searches for the session's top destinations.
+        
+        Destinations beyond the free prefetch slots are skipped.
+        
+        Returns:
+            Destination codes being prefetched
+        """
+        candidates = [
+            code for code in session.ranked_codes[:self.top_n]
+            if session.destination_prices[code].get("departure_date")
+        ]
+        codes = candidates[:max(0, self.concurrency - len(self._prefetching))]
+        for code in codes:
+            self._task(session, code, amadeus, prefetch=True)
+        
+        if len(codes) < len(candidates):
+            logger.info(
+                f"Prefetch slots busy, skipping {len(candidates) - len(codes)} flight offer "
+                f"prefetches for session {session.session_id}"
+            )
+        if codes:
+            logger.info(f"Prefetching flight offers for session {session.session_id}: {codes}")
+        return codes
+    
+    async def get_offers(
+        self,
+        session: SearchSession,
+        destination: str,
+        amadeus: AmadeusService,
+    ) -> FlightOffersResponse:
+        """
+        Get flight offers for one of the session's destinations.
+        
+        Raises:
+            HTTPException: 404 if the destination is not in the session,
+                429 if rate limited, 503 if Amadeus is unavailable
+        """
+        destination = destination.upper()
+        entry = session.destination_prices.get(destination)
+        if entry is None or not entry.get("departure_date"):
+            raise HTTPException(
+                status_code=404,
+                detail=f"No fare for {destination} in this search"
+            )
+        
+        task = self._task(session, destination, amadeus)
+        prefetched = task.get_name().startswith(PREFETCH_TASK_PREFIX)
+        try:
+            # Shielded: a client giving up must not cancel the search for the session
+            offers = await asyncio.shield(task)
+        except (AmadeusRateLimitError, RateLimitExceeded):
+            raise HTTPException(status_code=429, detail="Flight offer search is rate limited, try again shortly")
+        except CircuitOpenError:
+            raise HTTPException(status_code=503, detail="Flight offer search is temporarily unavailable")
+        
+        logger.info(
+            f"Flight offers {entry['origin']}->{destination} for session {session.session_id}: "
+            f"{len(offers)} offers{' (prefetched)' if prefetched else ''}"
+        )
+        
+        return FlightOffersResponse(
+            session_id=session.session_id,
+            destination_code=destination,
+            origin=entry["origin"],
+            departure_date=entry["departure_date"],
+            return_date=entry.get("return_date"),
+            adults=self._adults(session),
+            offers=offers,
+            prefetched=prefetched,
+        )
+
+
+@lru_cache
+def get_flight_offer_service() -> FlightOfferService:
+    """Get the process-wide flight offer service."""
+    return FlightOfferService()
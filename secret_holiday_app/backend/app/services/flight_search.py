@@ -0,0 +1,350 @@
+"""
+Flight Search Fan-out
+
+Runs Amadeus Flight Inspiration searches for every origin × date
+combination concurrently (with a bounded number in flight) and merges
+the results into a cheapest-per-destination price table as each search
+completes.
+
+SharedSearchFanout runs each distinct search once for several
+consumers (e.g. the pipelines of a batch request).
+
+Usage:
+    fanout = SearchFanout(amadeus)
+    table, outcomes = await fanout.run(keys, max_price=200)
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional, Union
+
+from app.config import settings
+from app.services.amadeus import AmadeusRateLimitError, AmadeusService
+from app.services.rate_limit import RateLimitExceeded
+from app.services.resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# A fixed max price, or a function returning the cap to use when a search starts
+MaxPrice = Union[Optional[int], Callable[[], Optional[int]]]
+
+
+@dataclass(frozen=True)
+class SearchKey:
+    """A single origin/date combination to search."""
+    origin: str
+    departure_date: Optional[str] = None
+    duration: Optional[str] = None
+
+
+@dataclass
+class SearchOutcome:
+    """Result of one search in the fan-out."""
+    key: SearchKey
+    results: list[dict] = field(default_factory=list)
+    error: Optional[str] = None  # "deadline", "timeout", "rate_limited", "unavailable" or the exception message
+    elapsed_ms: float = 0.0
+    
+    @property
+    def ok(self) -> bool:
+        """True if the search completed without error."""
+        return self.error is None
+
+
+class PriceTable:
+    """
+    Cheapest price found so far for each destination.
+    
+    Entries are dicts with price, origin, departure_date and return_date,
+    the same shape the suggestion ranking code consumes.
+    """
+    
+    def __init__(self):
+        self.prices: dict[str, dict] = {}
+    
+    def merge(
+        self,
+        origin: str,
+        results: list[dict],
+        refines: Optional[str] = None,
+    ) -> list[str]:
+        """
+        Merge Flight Inspiration results from one origin into the table.
+        
+        Args:
+            origin: Origin IATA code the results were searched from
+            results: Raw flight-destinations data items
+            refines: Metro code these airport-level results split out; entries
+                whose origin is the metro code are replaced at an equal price
+        
+        Returns:
+            Destination codes whose best price or origin improved
+        """
+        improved = []
+        
+        for dest in results:
+            dest_code = dest.get("destination")
+            if not dest_code:
+                continue
+            
+            try:
+                price = float(dest.get("price", {}).get("total"))
+            except (TypeError, ValueError):
+                continue
+            
+            current = self.prices.get(dest_code)
+            if (
+                current is None
+                or price < current["price"]
+                or (refines and current["origin"] == refines and price <= current["price"])
+            ):
+                self.prices[dest_code] = {
+                    "price": price,
+                    "origin": origin,
+                    "departure_date": dest.get("departureDate"),
+                    "return_date": dest.get("returnDate"),
+                }
+                improved.append(dest_code)
+        
+        # Date-grid results list a destination once per date
+        return list(dict.fromkeys(improved))
+    
+    def kth_price(self, k: int) -> Optional[float]:
+        """The k-th lowest price in the table (None if fewer than k destinations)."""
+        if k <= 0 or len(self.prices) < k:
+            return None
+        return heapq.nsmallest(k, (entry["price"] for entry in self.prices.values()))[-1]
+    
+    def __len__(self) -> int:
+        return len(self.prices)
+
+
+class SearchFanout:
+    """
+    Bounded-concurrency fan-out of flight-destination searches.
+    
+    At most `max_concurrency` searches are in flight at once, and each
+    one is abandoned after `call_timeout` seconds so a single slow origin
+    cannot hold up the whole suggestion.
+    """
+    
+    def __init__(
+        self,
+        amadeus: AmadeusService,
+        max_concurrency: Optional[int] = None,
+        call_timeout: Optional[float] = None,
+    ):
+        self.amadeus = amadeus
+        self.max_concurrency = max_concurrency or settings.SUGGEST_MAX_CONCURRENCY
+        self.call_timeout = call_timeout or settings.SUGGEST_CALL_TIMEOUT_SECONDS
+    
+    async def _search(
+        self,
+        key: SearchKey,
+        semaphore: asyncio.Semaphore,
+        max_price: MaxPrice,
+        view_by: str,
+        budget: Optional[int] = None,
+    ) -> SearchOutcome:
+        """Run one search under the concurrency limit and timeout."""
+        async with semaphore:
+            start = time.perf_counter()
+            cap = max_price() if callable(max_price) else max_price
+            try:
+                results = await asyncio.wait_for(
+                    self.amadeus.get_flight_destinations(
+                        origin=key.origin,
+                        departure_date=key.departure_date,
+                        duration=key.duration,
+                        max_price=cap,
+                        view_by=view_by,
+                        store=budget is None or cap is None or cap >= budget,
+                    ),
+                    timeout=self.call_timeout,
+                )
+                outcome = SearchOutcome(key=key, results=results)
+            except asyncio.TimeoutError:
+                logger.warning(f"Search timed out for {key.origin} {key.departure_date}")
+                outcome = SearchOutcome(key=key, error="timeout")
+            except (AmadeusRateLimitError, RateLimitExceeded) as e:
+                logger.warning(f"Search rate limited for {key.origin} {key.departure_date}: {e}")
+                outcome = SearchOutcome(key=key, error="rate_limited")
+            except CircuitOpenError as e:
+                logger.warning(f"Search skipped for {key.origin} {key.departure_date}: {e}")
+                outcome = SearchOutcome(key=key, error="unavailable")
+            except Exception as e:
+                logger.warning(f"Search failed for {key.origin} {key.departure_date}: {e}")
+                outcome = SearchOutcome(key=key, error=str(e))
+            
+            outcome.elapsed_ms = (time.perf_counter() - start) * 1000
+            return outcome
+    
+    def _start_search(
+        self,
+        key: SearchKey,
+        semaphore: asyncio.Semaphore,
+        max_price: MaxPrice,
+        view_by: str,
+        budget: Optional[int] = None,
+    ) -> asyncio.Task:
+        """Start one search as a task."""
+        return asyncio.create_task(self._search(key, semaphore, max_price, view_by, budget))
+    
+    async def _abandon(self, tasks: list[asyncio.Task]) -> None:
+        """Cancel searches nobody is waiting for any more."""
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def iter_outcomes(
+        self,
+        keys: list[SearchKey],
+        max_price: MaxPrice = None,
+        view_by: str = "DESTINATION",
+        deadline: Optional[float] = None,
+        budget: Optional[int] = None,
+    ) -> AsyncIterator[SearchOutcome]:
+        """
+        Run all searches and yield each outcome as soon as it completes.
+        
+        Exactly one outcome is yielded per key. If the deadline expires,
+        searches still running are cancelled and yielded with
+        error="deadline". Searches still running when the iterator is
+        closed early are cancelled.
+        
+        Args:
+            keys: Origin/date combinations to search
+            max_price: Maximum price per person passed to Amadeus, or a
+                function called as each search starts (to tighten the cap
+                as results come in)
+            view_by: Amadeus viewBy parameter
+            deadline: Seconds from now after which outstanding searches
+                are abandoned (None for no deadline)
+            budget: The caller's real price limit when max_price prunes
+                below it; searches capped under it are not cached, since
+                they aren't full answers for the budget
+        
+        Yields:
+            SearchOutcome in completion order
+        """
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + deadline if deadline is not None else None
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = {
+            self._start_search(key, semaphore, max_price, view_by, budget): key
+            for key in dict.fromkeys(keys)
+        }
+        pending = set(tasks)
+        
+        try:
+            while pending:
+                timeout = None
+                if expires_at is not None:
+                    timeout = max(0.0, expires_at - loop.time())
+                
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                
+                if not done:
+                    # Deadline expired - report the rest as incomplete
+                    logger.warning(f"Search deadline expired with {len(pending)} searches outstanding")
+                    await self._abandon(list(pending))
+                    for task in pending:
+                        yield SearchOutcome(key=tasks[task], error="deadline")
+                    pending = set()
+                    break
+                
+                for task in done:
+                    yield task.result()
+        finally:
+            await self._abandon([t for t in tasks if not t.done()])
+    
+    async def run(
+        self,
+        keys: list[SearchKey],
+        max_price: MaxPrice = None,
+        view_by: str = "DESTINATION",
+        deadline: Optional[float] = None,
+    ) -> tuple[PriceTable, list[SearchOutcome]]:
+        """
+        Run all searches and merge them into a price table.
+        
+        Args:
+            keys: Origin/date combinations to search
+            max_price: Maximum price per person passed to Amadeus
+            view_by: Amadeus viewBy parameter
+            deadline: Seconds from now after which outstanding searches
+                are abandoned (None for no deadline)
+        
+        Returns:
+            Tuple of (merged price table, outcomes in completion order)
+        """
+        table = PriceTable()
+        outcomes = []
+        
+        async for outcome in self.iter_outcomes(keys, max_price, view_by, deadline):
+            table.merge(outcome.key.origin, outcome.results)
+            outcomes.append(outcome)
+        
+        return table, outcomes
+
+
+class SharedSearchFanout(SearchFanout):
+    """
+    Fan-out shared by several consumers that runs each distinct search once.
+    
+    Every search uses the same max_price (the highest any consumer needs),
+    so results are identical for all consumers; each one filters them to
+    its own budget. A consumer that stops waiting (deadline or early
+    close) leaves the search running for the others. Call close() when
+    every consumer is done.
+    """
+    
+    def __init__(
+        self,
+        amadeus: AmadeusService,
+        max_price: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        call_timeout: Optional[float] = None,
+    ):
+        super().__init__(amadeus, max_concurrency, call_timeout)
+        self.max_price = max_price
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks: dict[tuple[SearchKey, str], asyncio.Task] = {}
+        self.requested = 0  # Searches asked for by all consumers
+    
+    def _start_search(
+        self,
+        key: SearchKey,
+        semaphore: asyncio.Semaphore,
+        max_price: MaxPrice,
+        view_by: str,
+        budget: Optional[int] = None,
+    ) -> asyncio.Task:
+        """Join the running search for this key, or start it at the shared max_price."""
+        self.requested += 1
+        task = self._tasks.get((key, view_by))
+        if task is None:
+            task = super()._start_search(key, self._semaphore, self.max_price, view_by)
+            self._tasks[(key, view_by)] = task
+        return task
+    
+    async def _abandon(self, tasks: list[asyncio.Task]) -> None:
+        """Leave shared searches running; close() cancels them."""
+    
+    @property
+    def searches_run(self) -> int:
+        """Distinct searches started."""
+        return len(self._tasks)
+    
+    async def close(self) -> None:
+        """Cancel any searches still running."""
+        await super()._abandon([t for t in self._tasks.values() if not t.done()])
@@ -6,6 +6,7 @@ Resolves UK postcodes and city names to coordinates using:
 - A built-in mapping for major UK cities
 """
 
+import asyncio
 import logging
 import re
 from dataclasses import dataclass
@@ -13,8 +14,19 @@ from typing import Optional
 
 import httpx
 
+from app.config import settings
+from app.services.resilience import (
+    CircuitOpenError,
+    backoff_delay,
+    get_circuit_breaker,
+    is_retryable_status,
+)
+from app.services.upstream_metrics import record_upstream_call
+
 logger = logging.getLogger(__name__)
 
+POSTCODES_IO_HOST = "api.postcodes.io"
+
 
 @dataclass
 class GeoLocation:
@@ -109,6 +121,10 @@ class GeocodingService:
         """
         Geocode a UK postcode using Postcodes.io.
         
+        Transient errors (5xx, 429, connection failures) are retried with
+        jittered backoff. While Postcodes.io is failing, its circuit
+        breaker makes this return None immediately.
+        
         Args:
             postcode: UK postcode (any format)
             
@@ -116,12 +132,47 @@ class GeocodingService:
             GeoLocation if found, None otherwise
         """
         normalized = GeocodingService.normalize_postcode(postcode)
+        breaker = get_circuit_breaker(POSTCODES_IO_HOST)
         
         async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(
-                    f"https://api.postcodes.io/postcodes/{normalized.replace(' ', '%20')}"
-                )
+            for attempt in range(settings.UPSTREAM_RETRY_ATTEMPTS + 1):
+                try:
+                    probe = breaker.before_call()
+                except CircuitOpenError as e:
+                    logger.error(f"Postcodes.io unavailable: {e}")
+                    return None
+                
+                try:
+                    record_upstream_call("postcodes_io")
+                    response = await client.get(
+                        f"https://{POSTCODES_IO_HOST}/postcodes/{normalized.replace(' ', '%20')}"
+                    )
+                except httpx.TransportError as e:
+                    breaker.record_failure()
+                    logger.warning(f"Postcodes.io error: {e!r}")
+                    if attempt < settings.UPSTREAM_RETRY_ATTEMPTS:
+                        await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                except asyncio.CancelledError:
+                    if probe:
+                        breaker.release_probe()
+                    raise
+                except Exception as e:
+                    if probe:
+                        breaker.release_probe()
+                    logger.error(f"Postcodes.io error: {e}")
+                    return None
+                
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                
+                if is_retryable_status(response.status_code):
+                    logger.warning(f"Postcodes.io returned {response.status_code}")
+                    if attempt < settings.UPSTREAM_RETRY_ATTEMPTS:
+                        await asyncio.sleep(backoff_delay(attempt))
+                    continue
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -136,10 +187,9 @@ class GeocodingService:
                 
                 logger.warning(f"Postcode not found: {normalized}")
                 return None
-                
-            except Exception as e:
-                logger.error(f"Postcodes.io error: {e}")
-                return None
+        
+        logger.error(f"Postcodes.io failed after {settings.UPSTREAM_RETRY_ATTEMPTS + 1} attempts")
+        return None
     
     @staticmethod
     def geocode_city(city_name: str) -> Optional[GeoLocation]:
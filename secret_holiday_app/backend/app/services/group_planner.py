@@ -0,0 +1,258 @@
+"""
+Group Meeting-Point Optimizer
+
+Finds destinations every member of a group can reach from their own
+home. Each member gets a suggestion pipeline (geocode, nearby airports,
+flight searches); all of them share one OriginLookups and one
+SharedSearchFanout, so members living near each other pay for their
+common airports and searches once.
+
+The members' fares are then joined into a members × (destination,
+departure date) price matrix - the group travels together, so fares
+only combine on the same dates - with NaN where a member has no fare,
+and aggregated with NumPy:
+- total    - sum of member prices
+- worst    - highest member price
+- fairness - average member price plus the gap between the highest and
+             lowest payer, so an even split beats a cheap-but-lopsided one
+
+Only dates every member can fly within budget count; each destination
+is ranked by its best such date.
+
+Usage:
+    planner = GroupPlanner(request, amadeus)
+    response = await planner.run()
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Hashable
+
+import numpy as np
+
+from app.models.suggestions import (
+    GroupDestination,
+    GroupMemberOrigins,
+    GroupObjective,
+    GroupSuggestionRequest,
+    GroupSuggestionResponse,
+    MemberFare,
+    SuggestionRequest,
+)
+from app.services.amadeus import AmadeusService
+from app.services.destination_index import get_destination_index
+from app.services.flight_search import PriceTable, SharedSearchFanout
+from app.services.ranking import top_k
+from app.services.suggestion_pipeline import OriginLookups, SuggestionPipeline
+
+logger = logging.getLogger(__name__)
+
+
+def member_fares(pipeline: SuggestionPipeline) -> dict[tuple[str, str], dict]:
+    """
+    A member's cheapest fare per (destination, searched departure date).
+    
+    Every member searches the same departure dates, so these keys line
+    up across members.
+    """
+    tables: dict[str, PriceTable] = defaultdict(PriceTable)
+    for outcome in pipeline.outcomes:
+        tables[outcome.key.departure_date].merge(outcome.key.origin, outcome.results)
+    
+    return {
+        (code, departure_date): entry
+        for departure_date, table in tables.items()
+        for code, entry in table.prices.items()
+    }
+
+
+def build_price_matrix(price_tables: list[dict[Hashable, dict]]) -> tuple[list[Hashable], np.ndarray]:
+    """
+    Join per-member price tables into a members × columns matrix.
+    
+    Args:
+        price_tables: Fares for each member, keyed by column (e.g.
+            destination code or (destination, date))
+    
+    Returns:
+        Tuple of (column keys, price matrix with NaN where a member has
+        no fare)
+    """
+    columns: dict[Hashable, int] = {}
+    for prices in price_tables:
+        for code in prices:
+            columns.setdefault(code, len(columns))
+    
+    matrix = np.full((len(price_tables), len(columns)), np.nan)
+    for member, prices in enumerate(price_tables):
+        if not prices:
+            continue
+        cols = np.fromiter((columns[code] for code in prices), dtype=np.intp, count=len(prices))
+        matrix[member, cols] = np.fromiter(
+            (entry["price"] for entry in prices.values()), dtype=float, count=len(prices)
+        )
+    
+    return list(columns), matrix
+
+
+def group_costs(matrix: np.ndarray, objective: GroupObjective) -> dict[str, np.ndarray]:
+    """
+    Aggregate a complete price matrix (no NaN) per destination.
+    
+    Returns:
+        Dict of total, worst, spread and cost (the objective to minimise),
+        one value per destination column
+    """
+    total = matrix.sum(axis=0)
+    worst = matrix.max(axis=0)
+    spread = worst - matrix.min(axis=0)
+    
+    if objective == GroupObjective.WORST:
+        cost = worst
+    elif objective == GroupObjective.FAIRNESS:
+        cost = total / matrix.shape[0] + spread
+    else:
+        cost = total
+    
+    return {"total": total, "worst": worst, "spread": spread, "cost": cost}
+
+
+class GroupPlanner:
+    """Runs one search per group member and ranks the destinations they share."""
+    
+    def __init__(self, request: GroupSuggestionRequest, amadeus: AmadeusService):
+        self.request = request
+        self.amadeus = amadeus
+        self.fanout = SharedSearchFanout(amadeus, max_price=request.budget_per_person)
+        self.lookups = OriginLookups(amadeus)
+        self.pipelines = [
+            SuggestionPipeline(
+                self._member_request(member.starting_location),
+                amadeus,
+                fanout=self.fanout,
+                lookups=self.lookups,
+            )
+            for member in request.members
+        ]
+    
+    def _member_request(self, starting_location: str) -> SuggestionRequest:
+        """The single-member search for one group member."""
+        request = self.request
+        return SuggestionRequest(
+            starting_location=starting_location,
+            travel_dates=request.travel_dates,
+            budget_per_person=request.budget_per_person,
+            trip_length_nights=request.trip_length_nights,
+            max_origins=request.max_origins,
+            deadline_ms=request.deadline_ms,
+        )
+    
+    async def _search_member(self, pipeline: SuggestionPipeline) -> None:
+        """Resolve one member's origins and run their searches."""
+        await pipeline.resolve_origins()
+        pipeline.plan_searches()
+        await pipeline.search()
+    
+    async def search(self) -> None:
+        """
+        Search for every member concurrently.
+        
+        If one member fails, the other members' searches are cancelled
+        (and their cleanup awaited) before the error is raised, so no
+        upstream calls run on after the request has failed.
+        
+        Raises:
+            HTTPException: The first member error (e.g. unknown location)
+        """
+        tasks = [asyncio.create_task(self._search_member(p)) for p in self.pipelines]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.fanout.close()
+    
+    def rank(self) -> tuple[list[GroupDestination], int]:
+        """
+        Join the members' fares and rank the destinations they share.
+        
+        Returns:
+            Tuple of (top max_results destinations, destinations every member can reach)
+        """
+        fares = [member_fares(p) for p in self.pipelines]
+        columns, matrix = build_price_matrix(fares)
+        
+        # NaN (no fare for a member) compares False, so this also drops partial columns
+        shared = np.flatnonzero((matrix <= self.request.budget_per_person).all(axis=0))
+        costs = group_costs(matrix[:, shared], self.request.objective)
+        
+        # Keep each destination's cheapest date: sort by cost, take the first per destination
+        destination_ids: dict[str, int] = {}
+        column_destination = np.fromiter(
+            (destination_ids.setdefault(columns[c][0], len(destination_ids)) for c in shared),
+            dtype=np.intp,
+            count=len(shared),
+        )
+        by_cost = np.argsort(costs["cost"], kind="stable")
+        _, first = np.unique(column_destination[by_cost], return_index=True)
+        best = by_cost[first]
+        order = best[top_k(-costs["cost"][best], self.request.max_results)]
+        
+        index = get_destination_index()
+        destinations = []
+        for i in order:
+            column = columns[shared[i]]
+            code = column[0]
+            info = index.get(code)
+            destinations.append(GroupDestination(
+                destination_code=code,
+                destination_name=info.city if info else None,
+                country=info.country if info else None,
+                country_code=info.country_code if info else None,
+                latitude=info.latitude if info else None,
+                longitude=info.longitude if info else None,
+                total_price=float(costs["total"][i]),
+                worst_price=float(costs["worst"][i]),
+                price_spread=float(costs["spread"][i]),
+                fares=[
+                    MemberFare(
+                        member=member,
+                        origin=member_table[column]["origin"],
+                        price=member_table[column]["price"],
+                        departure_date=member_table[column]["departure_date"],
+                        return_date=member_table[column]["return_date"],
+                    )
+                    for member, member_table in enumerate(fares)
+                ],
+            ))
+        
+        return destinations, len(best)
+    
+    async def run(self) -> GroupSuggestionResponse:
+        """Search for every member and build the group response."""
+        await self.search()
+        destinations, total_found = self.rank()
+        incomplete = [s for p in self.pipelines for s in p.incomplete_searches()]
+        
+        logger.info(
+            f"Group of {len(self.pipelines)}: {total_found} shared destinations, "
+            f"{self.fanout.searches_run} searches for {self.fanout.requested} requested"
+        )
+        
+        return GroupSuggestionResponse(
+            objective=self.request.objective,
+            members=[
+                GroupMemberOrigins(
+                    member=member,
+                    starting_location=pipeline.request.starting_location,
+                    origins_used=pipeline.origins_used,
+                )
+                for member, pipeline in enumerate(self.pipelines)
+            ],
+            destinations=destinations,
+            total_found=total_found,
+            partial=bool(incomplete),
+            incomplete_searches=incomplete,
+        )
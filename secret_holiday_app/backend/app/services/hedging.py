@@ -0,0 +1,182 @@
+"""
+Request Hedging
+
+Cuts tail latency on idempotent upstream calls: if a call hasn't
+answered by a tracked latency percentile (e.g. p95 of recent calls to
+the same endpoint), a duplicate is sent and whichever answers first
+with a usable result (e.g. not a 5xx) is used; the other is cancelled.
+
+- LatencyTracker: recent latencies per endpoint and their percentiles.
+  No hedging happens for an endpoint until it has enough samples.
+- HedgeBudget: caps hedges to a fraction of calls over a sliding
+  window, so a slow upstream can't double the quota spent.
+- hedged: runs a call with a hedge after a delay.
+
+Usage:
+    delay = tracker.hedge_delay("flight-destinations")
+    response = await hedged(send, delay, budget.try_acquire, is_success=lambda r: r.status_code < 500)
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _HedgeSkipped(Exception):
+    """The hedge was never sent because before_hedge failed."""
+    pass
+
+
+class LatencyTracker:
+    """
+    Recent call latencies per endpoint.
+    
+    Args:
+        percentile: Percentile (0-1) the hedge delay is taken from
+        min_samples: Samples needed before an endpoint is hedged
+        max_samples: Recent samples kept per endpoint
+        min_delay: Floor on the hedge delay (seconds)
+    """
+    
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        max_samples: int = 200,
+        min_delay: float = 0.0,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._samples: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=max_samples))
+    
+    def record(self, name: str, seconds: float) -> None:
+        """Record one call's latency."""
+        self._samples[name].append(seconds)
+    
+    def quantile(self, name: str, q: float) -> Optional[float]:
+        """The q-quantile (0-1) of recent latencies (None without enough samples)."""
+        samples = self._samples.get(name)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+    
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Seconds to wait before hedging a call (None to not hedge)."""
+        value = self.quantile(name, self.percentile)
+        if value is None:
+            return None
+        return max(value, self.min_delay)
+
+
+class HedgeBudget:
+    """
+    Allows at most max_rate hedges per call over a sliding window.
+    
+    Args:
+        max_rate: Maximum hedges as a fraction of calls (e.g. 0.1)
+        window_seconds: Length of the sliding window
+    """
+    
+    def __init__(self, max_rate: float, window_seconds: float = 60.0):
+        self.max_rate = max_rate
+        self.window_seconds = window_seconds
+        self._calls: deque[float] = deque()
+        self._hedges: deque[float] = deque()
+    
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        for events in (self._calls, self._hedges):
+            while events and events[0] < cutoff:
+                events.popleft()
+    
+    def record_call(self) -> None:
+        """Count a call that could be hedged."""
+        self._calls.append(time.monotonic())
+    
+    def try_acquire(self) -> bool:
+        """Take a hedge if the rate allows it."""
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._hedges) + 1 > self.max_rate * len(self._calls):
+            return False
+        self._hedges.append(now)
+        return True
+
+
+async def hedged(
+    send: Callable[[], Awaitable[T]],
+    delay: Optional[float],
+    allow_hedge: Callable[[], bool],
+    before_hedge: Optional[Callable[[], Awaitable[None]]] = None,
+    is_success: Optional[Callable[[T], bool]] = None,
+) -> T:
+    """
+    Run a call, sending a duplicate if it hasn't answered after `delay`.
+    
+    The first successful result wins and the other call is cancelled. If
+    one call fails (raises, or returns a result is_success rejects) while
+    the other is still running, the other is awaited. If both fail, the
+    first unsuccessful result is returned, or the primary's error raised
+    if neither returned. A hedge whose before_hedge failed was never
+    sent, so it counts as no hedge rather than as a failed call.
+    
+    Args:
+        send: Starts one call
+        delay: Seconds before hedging (None to never hedge)
+        allow_hedge: Checked when the delay passes (e.g. HedgeBudget.try_acquire)
+        before_hedge: Awaited before the duplicate is sent (e.g. to take a
+            rate limit slot); if it raises, only the primary is used
+        is_success: Whether a returned result counts as a win (default: any)
+    
+    Returns:
+        The winning call's result
+    """
+    primary = asyncio.ensure_future(send())
+    if delay is None:
+        return await primary
+    
+    async def send_hedge() -> T:
+        if before_hedge is not None:
+            try:
+                await before_hedge()
+            except Exception as e:
+                raise _HedgeSkipped(str(e)) from e
+        logger.debug(f"Hedging call after {delay:.2f}s")
+        return await send()
+    
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not allow_hedge():
+            return await primary
+        
+        # The hedge races the primary from here, including any wait in before_hedge
+        tasks.add(asyncio.ensure_future(send_hedge()))
+        failed: list[asyncio.Future] = []
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if isinstance(task.exception(), _HedgeSkipped):
+                    logger.debug(f"Hedge not sent: {task.exception()}")
+                    continue
+                if task.exception() is None and (is_success is None or is_success(task.result())):
+                    return task.result()
+                failed.append(task)
+        
+        returned = [task for task in failed if task.exception() is None]
+        if returned:
+            return returned[0].result()
+        # Neither returned, so the primary raised; its error is the one that describes the upstream
+        raise primary.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,108 @@
+"""
+Origin Planner
+
+Collapses nearby origin airports that share a metropolitan city code
+into a single search. For a London user the nearest airports are often
+LHR, LGW, STN and LTN; Amadeus Flight Inspiration accepts the city code
+LON, which covers all of them in one call instead of four.
+
+Metro searches are opt-in per request (metro_origins), because they make
+best_origin a city code rather than an airport.
+
+A metro search only reports the city code as the origin, so the
+pipeline splits a metro back into its airports when the request asks
+for an exact best_origin, or when the provider returned nothing for
+the city code.
+
+Usage:
+    plan = plan_origins(origins_used)
+    for code in plan.search_codes:
+        ...
+    plan.airports_for("LON")  # ["LHR", "LGW", "STN", "LTN"]
+"""
+
+from dataclasses import dataclass
+
+from app.models.suggestions import OriginAirport
+
+
+@dataclass(frozen=True)
+class OriginGroup:
+    """One origin search: a single airport, or a metro code covering several."""
+    search_code: str
+    airports: tuple[str, ...]
+    
+    @property
+    def is_metro(self) -> bool:
+        """True if this search covers more than one airport."""
+        return len(self.airports) > 1
+
+
+class OriginPlan:
+    """The origin searches to run for a set of nearby airports."""
+    
+    def __init__(self, groups: list[OriginGroup]):
+        self.groups = groups
+        self._by_code = {group.search_code: group for group in groups}
+    
+    @property
+    def search_codes(self) -> list[str]:
+        """Origin codes to search, in order of the first airport in each group."""
+        return [group.search_code for group in self.groups]
+    
+    def is_metro(self, search_code: str) -> bool:
+        """True if the code is a metro search covering several airports."""
+        group = self._by_code.get(search_code)
+        return group is not None and group.is_metro
+    
+    def airports_for(self, search_code: str) -> list[str]:
+        """Airport codes covered by a search code."""
+        group = self._by_code.get(search_code)
+        return list(group.airports) if group else [search_code]
+
+
+def plan_origins(origins: list[OriginAirport], use_metro: bool = True) -> OriginPlan:
+    """
+    Group origin airports by metro city code.
+    
+    A city code is only used when at least two of the origins share it.
+    A lone LHR is still searched as LHR, because LON would also bring in
+    airports that were not picked as origins.
+    
+    The city code must also differ from every member's own code. Some
+    reference data files secondary airports under the main airport's
+    code (PIK under GLA, BHD under BFS); searching that code would only
+    search the main airport, so those airports are searched one by one.
+    
+    Args:
+        origins: Nearby origin airports, most relevant first
+        use_metro: False to search every airport individually
+    
+    Returns:
+        OriginPlan with one group per search
+    """
+    members: dict[str, list[str]] = {}
+    if use_metro:
+        for origin in origins:
+            if origin.city_code:
+                members.setdefault(origin.city_code, []).append(origin.iata_code)
+    metro_codes = {
+        code for code, airports in members.items()
+        if len(airports) > 1 and code not in airports
+    }
+    
+    groups = []
+    planned: set[str] = set()
+    for origin in origins:
+        if origin.city_code in metro_codes:
+            if origin.city_code not in planned:
+                planned.add(origin.city_code)
+                groups.append(OriginGroup(
+                    search_code=origin.city_code,
+                    airports=tuple(members[origin.city_code]),
+                ))
+        elif origin.iata_code not in planned:
+            planned.add(origin.iata_code)
+            groups.append(OriginGroup(search_code=origin.iata_code, airports=(origin.iata_code,)))
+    
+    return OriginPlan(groups)
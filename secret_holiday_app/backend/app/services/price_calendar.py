@@ -0,0 +1,212 @@
+"""
+Route Price Calendar
+
+Cheapest fare per departure day for one origin -> destination route over
+a range of months, for the "cheapest day to fly" view.
+
+Each month is one Flight Inspiration search with viewBy=DATE over the
+whole month (the same call a date-grid suggestion search makes, so it is
+often already in the Amadeus response cache), filtered to the requested
+destination. The per-route result is kept in its own cache, one entry
+per route and month, holding just the route's columns - a repeat view
+of the calendar needs no Amadeus call and no filtering.
+
+Months with no fares for the route are not cached here: the Amadeus
+service returns an empty list for some upstream failures, which can't be
+told apart from a month with no flights. A genuinely empty month is
+still in the Amadeus response cache, so repeating it costs no call.
+
+The calendar is returned column-oriented (dates[], prices[]) so the
+client can render it without building an object per day.
+
+Usage:
+    calendar = PriceCalendarService(amadeus)
+    response = await calendar.get_calendar("LON", "BCN", "2026-11", "2027-01", duration=3)
+"""
+
+import logging
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+from app.models.suggestions import IncompleteSearch, PriceCalendarResponse
+from app.services.amadeus import AmadeusService
+from app.services.cache import TieredCache
+from app.services.flight_search import SearchFanout, SearchKey
+from app.services.suggestion_pipeline import INCOMPLETE_REASONS, month_date_range
+
+logger = logging.getLogger(__name__)
+
+
+def calendar_months(start_month: str, end_month: str) -> list[str]:
+    """
+    departureDate ranges for each month from start_month to end_month (YYYY-MM).
+    
+    Days up to today are left out.
+    
+    Raises:
+        ValueError: If a month is malformed, the range is reversed or longer
+            than PRICE_CALENDAR_MAX_MONTHS
+    """
+    start_year, start = (int(part) for part in start_month.split("-"))
+    end_year, end = (int(part) for part in end_month.split("-"))
+    first, last = start_year * 12 + start - 1, end_year * 12 + end - 1
+    if not 1 <= start <= 12 or not 1 <= end <= 12 or last < first:
+        raise ValueError(f"Invalid month range: {start_month} to {end_month}")
+    if last - first + 1 > settings.PRICE_CALENDAR_MAX_MONTHS:
+        raise ValueError(f"At most {settings.PRICE_CALENDAR_MAX_MONTHS} months per calendar")
+    
+    tomorrow = date.today() + timedelta(days=1)
+    ranges = []
+    for index in range(first, last + 1):
+        departure_date = month_date_range(index // 12, index % 12 + 1, tomorrow, date.max)
+        if departure_date:
+            ranges.append(departure_date)
+    return ranges
+
+
+def route_columns(results: list[dict], destination: str) -> dict[str, list]:
+    """
+    The cheapest fare per departure date to one destination.
+    
+    Args:
+        results: Flight Inspiration data items (viewBy=DATE)
+        destination: Destination IATA code
+    
+    Returns:
+        Dict of dates, prices and return_dates columns, by ascending date
+    """
+    cheapest: dict[str, tuple[float, Optional[str]]] = {}
+    for item in results:
+        departure_date = item.get("departureDate")
+        if item.get("destination") != destination or not departure_date:
+            continue
+        try:
+            price = float(item.get("price", {}).get("total"))
+        except (TypeError, ValueError):
+            continue
+        if departure_date not in cheapest or price < cheapest[departure_date][0]:
+            cheapest[departure_date] = (price, item.get("returnDate"))
+    
+    dates = sorted(cheapest)
+    return {
+        "dates": dates,
+        "prices": [cheapest[d][0] for d in dates],
+        "return_dates": [cheapest[d][1] for d in dates],
+    }
+
+
+@lru_cache
+def get_price_calendar_cache() -> TieredCache:
+    """Get the process-wide route calendar cache."""
+    return TieredCache(
+        memory_entries=settings.PRICE_CALENDAR_CACHE_MEMORY_ENTRIES,
+        db_path=settings.PRICE_CALENDAR_CACHE_DB_PATH or None,
+        db_max_entries=settings.PRICE_CALENDAR_CACHE_DB_MAX_ENTRIES,
+    )
+
+
+class PriceCalendarService:
+    """Builds route price calendars from cached months and Flight Inspiration searches."""
+    
+    def __init__(
+        self,
+        amadeus: AmadeusService,
+        cache: Optional[TieredCache] = None,
+        fanout: Optional[SearchFanout] = None,
+    ):
+        self.amadeus = amadeus
+        self.cache = cache or get_price_calendar_cache()
+        self.fanout = fanout or SearchFanout(amadeus)
+    
+    @staticmethod
+    def _cache_key(key: SearchKey, destination: str) -> str:
+        """Cache key for one route and month."""
+        return f"price-calendar|{key.origin}|{destination}|{key.departure_date}|{key.duration}"
+    
+    async def get_calendar(
+        self,
+        origin: str,
+        destination: str,
+        start_month: str,
+        end_month: str,
+        duration: int,
+    ) -> PriceCalendarResponse:
+        """
+        Get the cheapest fare per departure day for a route.
+        
+        Args:
+            origin: Origin IATA airport or city code
+            destination: Destination IATA code
+            start_month: First month (YYYY-MM)
+            end_month: Last month (YYYY-MM), inclusive
+            duration: Trip length in nights
+        
+        Returns:
+            PriceCalendarResponse; months that could not be searched are
+            listed in incomplete_searches. Neither they nor months without
+            fares are cached
+        
+        Raises:
+            ValueError: If the month range is invalid
+        """
+        origin, destination = origin.upper(), destination.upper()
+        keys = [
+            SearchKey(origin=origin, departure_date=departure_date, duration=str(duration))
+            for departure_date in calendar_months(start_month, end_month)
+        ]
+        
+        months: dict[SearchKey, dict] = {}
+        missing = []
+        for key in keys:
+            entry = await self.cache.get(self._cache_key(key, destination))
+            if entry is not None:
+                months[key] = entry.value
+            else:
+                missing.append(key)
+        
+        incomplete = []
+        async for outcome in self.fanout.iter_outcomes(missing, view_by="DATE"):
+            if not outcome.ok:
+                incomplete.append(IncompleteSearch(
+                    origin=outcome.key.origin,
+                    departure_date=outcome.key.departure_date,
+                    duration=outcome.key.duration,
+                    reason=outcome.error if outcome.error in INCOMPLETE_REASONS else "error",
+                ))
+                continue
+            
+            columns = route_columns(outcome.results, destination)
+            months[outcome.key] = columns
+            if not columns["dates"]:
+                continue
+            await self.cache.set(
+                self._cache_key(outcome.key, destination),
+                columns,
+                ttl=settings.PRICE_CALENDAR_CACHE_TTL_SECONDS,
+            )
+        
+        logger.info(
+            f"Price calendar {origin}->{destination}: {len(keys) - len(missing)} months cached, "
+            f"{len(missing)} searched, {len(incomplete)} incomplete"
+        )
+        
+        response = PriceCalendarResponse(
+            origin=origin,
+            destination=destination,
+            duration=duration,
+            partial=bool(incomplete),
+            incomplete_searches=incomplete,
+        )
+        for key in keys:
+            columns = months.get(key)
+            if columns:
+                response.dates.extend(columns["dates"])
+                response.prices.extend(columns["prices"])
+                response.return_dates.extend(columns["return_dates"])
+        
+        if response.prices:
+            cheapest = min(range(len(response.prices)), key=response.prices.__getitem__)
+            response.cheapest_date = response.dates[cheapest]
+        return response
@@ -0,0 +1,287 @@
+"""
+Price Observation Store
+
+Append-only record of every fare Flight Inspiration returns (origin,
+destination, dates, price, fetch time) in a local SQLite file, so price
+trends ("cheaper than usual"), offline ranking and outage fallbacks can
+run against local data instead of new API calls.
+
+Rows are indexed by route and fetch time, and by destination and
+departure date. Rows older than PRICE_HISTORY_RETENTION_DAYS are purged
+as new ones are written.
+
+Writes are batched per response and run in a worker thread in the
+background, so recording never delays the caller.
+
+Usage:
+    history = PriceHistoryStore("./cache/price_history.sqlite3")
+    history.record("LON", data, view_by="DESTINATION")
+    stats = await history.route_stats("LON", "BCN", since=time.time() - 30 * 86400)
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PriceObservation:
+    """One fare seen in a Flight Inspiration response."""
+    origin: str
+    destination: str
+    departure_date: Optional[str]
+    return_date: Optional[str]
+    price: float
+    fetched_at: float  # Epoch seconds
+    view_by: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class RouteStats:
+    """Summary of a route's observed prices over a time range."""
+    count: int
+    min_price: Optional[float]
+    avg_price: Optional[float]
+    max_price: Optional[float]
+    last_price: Optional[float]
+    last_fetched_at: Optional[float]
+
+
+def observations_from_results(
+    origin: str,
+    results: list[dict],
+    fetched_at: float,
+    view_by: Optional[str] = None,
+) -> list[PriceObservation]:
+    """Turn Flight Inspiration data items into observations (skipping unpriced ones)."""
+    observations = []
+    for item in results:
+        destination = item.get("destination")
+        try:
+            price = float(item.get("price", {}).get("total"))
+        except (TypeError, ValueError):
+            continue
+        if not destination:
+            continue
+        observations.append(PriceObservation(
+            origin=item.get("origin") or origin,
+            destination=destination,
+            departure_date=item.get("departureDate"),
+            return_date=item.get("returnDate"),
+            price=price,
+            fetched_at=fetched_at,
+            view_by=view_by,
+        ))
+    return observations
+
+
+class PriceHistoryStore:
+    """
+    SQLite-backed append-only store of price observations.
+    
+    The blocking database work runs in worker threads behind a lock;
+    record() schedules it in the background, queries await it.
+    """
+    
+    # Purge rows past retention every N inserted batches rather than on every write
+    PURGE_CHECK_INTERVAL = 200
+    
+    def __init__(self, path: str, retention_days: float = 180):
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._batches_since_purge = 0
+        self._pending: set[asyncio.Task] = set()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database and create the table on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS price_observations (
+                    id INTEGER PRIMARY KEY,
+                    origin TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    departure_date TEXT,
+                    return_date TEXT,
+                    price REAL NOT NULL,
+                    view_by TEXT,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_observations_route "
+                "ON price_observations (origin, destination, fetched_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_observations_departure "
+                "ON price_observations (destination, departure_date)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_observations_fetched "
+                "ON price_observations (fetched_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def insert(self, observations: list[PriceObservation]) -> None:
+        """Append observations (blocking - call from a worker thread)."""
+        if not observations:
+            return
+        
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO price_observations "
+                "(origin, destination, departure_date, return_date, price, view_by, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (o.origin, o.destination, o.departure_date, o.return_date, o.price, o.view_by, o.fetched_at)
+                    for o in observations
+                ],
+            )
+            
+            self._batches_since_purge += 1
+            if self._batches_since_purge >= self.PURGE_CHECK_INTERVAL:
+                self._batches_since_purge = 0
+                self._purge(conn)
+            
+            conn.commit()
+    
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        """Delete observations older than the retention period."""
+        cursor = conn.execute(
+            "DELETE FROM price_observations WHERE fetched_at < ?",
+            (time.time() - self.retention_seconds,),
+        )
+        if cursor.rowcount:
+            logger.info(f"Purged {cursor.rowcount} price observations from {self.path}")
+    
+    def record(
+        self,
+        origin: str,
+        results: list[dict],
+        view_by: Optional[str] = None,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """
+        Record a Flight Inspiration response in the background.
+        
+        Args:
+            origin: Origin code the search was made from
+            results: Raw flight-destinations data items
+            view_by: viewBy the search used
+            fetched_at: Fetch time (defaults to now)
+        """
+        observations = observations_from_results(origin, results, fetched_at or time.time(), view_by)
+        if not observations:
+            return
+        
+        task = asyncio.create_task(self._insert_in_background(observations))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _insert_in_background(self, observations: list[PriceObservation]) -> None:
+        """Insert in a worker thread, logging (not raising) failures."""
+        try:
+            await asyncio.to_thread(self.insert, observations)
+        except Exception as e:
+            logger.warning(f"Price history write failed: {e}")
+    
+    def _query(self, sql: str, params: tuple) -> list[tuple]:
+        """Run a read query (blocking - call from a worker thread)."""
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+    
+    async def route_history(
+        self,
+        origin: str,
+        destination: str,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        departure_date: Optional[str] = None,
+    ) -> list[PriceObservation]:
+        """
+        Observations for one route, oldest first.
+        
+        Args:
+            origin: Origin code
+            destination: Destination code
+            since: Earliest fetch time (epoch seconds)
+            until: Latest fetch time (epoch seconds)
+            departure_date: Only fares departing on this date
+        """
+        sql = (
+            "SELECT origin, destination, departure_date, return_date, price, fetched_at, view_by "
+            "FROM price_observations WHERE origin = ? AND destination = ? AND fetched_at >= ? AND fetched_at <= ?"
+        )
+        params: tuple = (origin, destination, since or 0, until or time.time())
+        if departure_date:
+            sql += " AND departure_date = ?"
+            params += (departure_date,)
+        rows = await asyncio.to_thread(self._query, sql + " ORDER BY fetched_at", params)
+        return [PriceObservation(*row) for row in rows]
+    
+    async def route_stats(
+        self,
+        origin: str,
+        destination: str,
+        since: Optional[float] = None,
+    ) -> RouteStats:
+        """Count, min/avg/max and most recent price for a route since a fetch time."""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT COUNT(*), MIN(price), AVG(price), MAX(price), MAX(fetched_at) "
+            "FROM price_observations WHERE origin = ? AND destination = ? AND fetched_at >= ?",
+            (origin, destination, since or 0),
+        )
+        count, min_price, avg_price, max_price, last_fetched_at = rows[0]
+        last_price = None
+        if count:
+            last = await asyncio.to_thread(
+                self._query,
+                "SELECT MIN(price) FROM price_observations "
+                "WHERE origin = ? AND destination = ? AND fetched_at = ?",
+                (origin, destination, last_fetched_at),
+            )
+            last_price = last[0][0]
+        return RouteStats(count, min_price, avg_price, max_price, last_price, last_fetched_at)
+    
+    async def latest_prices(self, origin: str, max_age: float) -> dict[str, PriceObservation]:
+        """
+        The cheapest fare per destination from an origin seen in the last max_age seconds.
+        
+        Useful as a fallback when Amadeus is unavailable.
+        """
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT origin, destination, departure_date, return_date, MIN(price), fetched_at, view_by "
+            "FROM price_observations WHERE origin = ? AND fetched_at >= ? GROUP BY destination",
+            (origin, time.time() - max_age),
+        )
+        return {row[1]: PriceObservation(*row) for row in rows}
+    
+    async def close(self) -> None:
+        """Finish background writes and close the database connection."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
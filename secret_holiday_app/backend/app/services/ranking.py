@@ -0,0 +1,229 @@
+"""
+Suggestion Ranking Engine
+
+Scores every candidate destination in one vectorized NumPy pass over
+four criteria:
+- price               - price per person (cheaper is better)
+- distance            - great-circle distance from the user to the destination
+                        (shorter is better)
+- population          - population of the destination's population centre,
+                        on a log scale (bigger is better)
+- origin_distance     - distance from the user to the departure airport
+                        (closer is better)
+
+Each criterion is min-max normalised across the candidates to 0-1 and
+combined as a weighted mean, so scores are comparable within one
+request. Candidates missing a value (e.g. a destination not in the
+destination index) get a neutral 0.5 for that criterion.
+
+Only the top k are sorted: np.argpartition selects them in O(n), then
+just those k are ordered. Ranking a few thousand candidates takes well
+under a millisecond.
+
+Usage:
+    weights = resolve_weights(request.ranking)
+    order, scores = rank_candidates(codes, prices, origin_distances, lat, lon, weights, k=30)
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.models.suggestions import RankingWeights
+from app.services.destination_index import COORDINATE_SCALE, DestinationIndex, get_destination_index
+
+EARTH_RADIUS_KM = 6371.0
+
+
+@dataclass(frozen=True)
+class Weights:
+    """Resolved ranking weights."""
+    price: float
+    distance: float
+    population: float
+    origin_distance: float
+    
+    @property
+    def total(self) -> float:
+        """Sum of the weights."""
+        return self.price + self.distance + self.population + self.origin_distance
+    
+    @property
+    def price_only(self) -> bool:
+        """True if destinations are ranked on price alone."""
+        return self.price > 0 and not (self.distance or self.population or self.origin_distance)
+
+
+def resolve_weights(overrides: Optional[RankingWeights] = None) -> Weights:
+    """Merge per-request weight overrides onto the configured defaults."""
+    weights = Weights(
+        price=settings.RANKING_WEIGHT_PRICE,
+        distance=settings.RANKING_WEIGHT_DISTANCE,
+        population=settings.RANKING_WEIGHT_POPULATION,
+        origin_distance=settings.RANKING_WEIGHT_ORIGIN_DISTANCE,
+    )
+    if overrides is None:
+        return weights
+    
+    return Weights(**{
+        name: value if value is not None else getattr(weights, name)
+        for name, value in overrides.model_dump().items()
+    })
+
+
+@lru_cache(maxsize=4)
+def _index_columns(index: DestinationIndex) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Latitude/longitude (radians), cos(latitude) and log population for
+    every index row.
+    
+    Rows without a population centre (outside the places dataset) get a
+    NaN population, so they score neutral rather than as tiny places.
+    """
+    columns = index.columns
+    lat = np.radians(np.frombuffer(columns["lat"], dtype=columns["lat"].typecode) / COORDINATE_SCALE)
+    lon = np.radians(np.frombuffer(columns["lon"], dtype=columns["lon"].typecode) / COORDINATE_SCALE)
+    population = np.frombuffer(columns["population"], dtype=columns["population"].typecode).astype(float)
+    log_population = np.where(population > 0, np.log1p(population), np.nan)
+    return lat, lon, np.cos(lat), log_population
+
+
+def haversine_km(
+    lat1: float,
+    lon1: float,
+    lat2: np.ndarray,
+    lon2: np.ndarray,
+    cos_lat2: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Great-circle distance (km) from one point to many; all angles in radians.
+    
+    cos_lat2 can be passed precomputed to save a trig pass.
+    """
+    if cos_lat2 is None:
+        cos_lat2 = np.cos(lat2)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * cos_lat2 * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def normalise(values: np.ndarray, higher_is_better: bool = False) -> np.ndarray:
+    """
+    Min-max scale to 0-1 where 1 is best; NaN (missing) becomes 0.5.
+    
+    If every candidate has the same value the criterion scores 0.5 for all.
+    """
+    result = np.full(values.shape, 0.5)
+    known = ~np.isnan(values)
+    if not known.any():
+        return result
+    
+    low, high = values[known].min(), values[known].max()
+    if high > low:
+        scaled = (values[known] - low) / (high - low)
+        result[known] = scaled if higher_is_better else 1.0 - scaled
+    return result
+
+
+def score_candidates(
+    codes: list[str],
+    prices: np.ndarray,
+    origin_distances: np.ndarray,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    weights: Weights,
+    index: Optional[DestinationIndex] = None,
+) -> np.ndarray:
+    """
+    Score candidate destinations (0-1, higher is better).
+    
+    Args:
+        codes: Destination IATA codes
+        prices: Price per person for each candidate
+        origin_distances: Distance (km) from the user to each candidate's
+            departure airport (NaN if unknown)
+        latitude: User latitude (None to skip the distance criterion)
+        longitude: User longitude
+        weights: Ranking weights
+        index: Destination index (defaults to the shared one)
+    
+    Returns:
+        Array of scores, one per candidate
+    """
+    index = index or get_destination_index()
+    n = len(codes)
+    if n == 0:
+        return np.empty(0)
+    if weights.total <= 0:
+        return np.full(n, 0.5)
+    
+    index_lat, index_lon, index_cos_lat, index_log_population = _index_columns(index)
+    rows = np.fromiter(index.rows(codes), dtype=np.intp, count=n)
+    known = rows >= 0
+    
+    score = weights.price * normalise(np.asarray(prices, dtype=float))
+    
+    if weights.distance and latitude is not None and longitude is not None:
+        known_rows = rows[known]
+        distance = np.full(n, np.nan)
+        distance[known] = haversine_km(
+            np.radians(latitude),
+            np.radians(longitude),
+            index_lat[known_rows],
+            index_lon[known_rows],
+            index_cos_lat[known_rows],
+        )
+        score += weights.distance * normalise(distance)
+    else:
+        score += weights.distance * 0.5
+    
+    if weights.population:
+        population = np.full(n, np.nan)
+        population[known] = index_log_population[rows[known]]
+        score += weights.population * normalise(population, higher_is_better=True)
+    
+    if weights.origin_distance:
+        score += weights.origin_distance * normalise(np.asarray(origin_distances, dtype=float))
+    
+    return score / weights.total
+
+
+def top_k(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first.
+    
+    Uses argpartition so only the selected k are sorted.
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    selected = np.argpartition(-scores, k - 1)[:k]
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+def rank_candidates(
+    codes: list[str],
+    prices: np.ndarray,
+    origin_distances: np.ndarray,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    weights: Weights,
+    k: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score all candidates and select the top k.
+    
+    Returns:
+        Tuple of (candidate indices best first, their scores)
+    """
+    scores = score_candidates(codes, prices, origin_distances, latitude, longitude, weights)
+    order = top_k(scores, k)
+    return order, scores[order]
@@ -0,0 +1,246 @@
+"""
+Client-side Rate Limiting
+
+Token buckets and a priority scheduler that keep our calls to a rate
+limited upstream API (Amadeus) inside its per-second quota.
+
+Requests are grouped into endpoint classes, each with its own bucket, on
+top of a global bucket for the whole API. When the buckets are empty,
+requests queue and are released highest priority first (interactive
+searches before prefetches before background cache warming). Queues have
+a maximum depth and wait time so that overload surfaces as an error
+instead of piling up forever.
+
+Usage:
+    scheduler = RequestScheduler(global_rate=10, global_burst=10)
+    await scheduler.acquire("flight-destinations", Priority.INTERACTIVE)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Scheduling priority (lower value is served first)."""
+    INTERACTIVE = 0  # A user is waiting on the result
+    PREFETCH = 1     # Speculative work for a user session
+    BACKGROUND = 2   # Cache warming and other maintenance
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request can't be scheduled (queue full or waited too long)."""
+    pass
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holding at most `capacity`.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+    
+    def _refill(self, now: float) -> None:
+        """Add tokens for the time elapsed since the last update."""
+        if now > self._updated_at:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+    
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic() if now is None else now
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+    
+    def take(self, now: Optional[float] = None) -> None:
+        """Consume one token (call only after wait_time() returned 0)."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self._tokens -= 1
+    
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for a while (e.g. after an upstream 429)."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated_at = max(self._updated_at, self._paused_until)
+
+
+class RequestScheduler:
+    """
+    Priority scheduler over per-endpoint and global token buckets.
+    
+    Args:
+        global_rate: Requests per second across all endpoints
+        global_burst: Global bucket capacity
+        endpoint_limits: Endpoint class -> (rate, burst). Classes not
+            listed are limited by the global bucket only.
+        max_queue: Maximum waiting requests per endpoint class
+        max_wait: Maximum seconds a request may wait for a slot
+    """
+    
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: float,
+        endpoint_limits: Optional[dict[str, tuple[float, float]]] = None,
+        max_queue: int = 100,
+        max_wait: float = 10.0,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.buckets = {
+            name: TokenBucket(rate, burst)
+            for name, (rate, burst) in (endpoint_limits or {}).items()
+        }
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        
+        # Per endpoint class: heap of (priority, sequence, future)
+        self._queues: dict[str, list[tuple[int, int, asyncio.Future]]] = {}
+        # Per endpoint class: waiters still waiting. Entries of waiters that
+        # gave up stay in the heap until the dispatcher reaches them.
+        self._waiting: dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+    
+    def _wait_time(self, endpoint_class: str, now: float) -> float:
+        """Seconds until both the global and endpoint buckets have a token."""
+        wait = self.global_bucket.wait_time(now)
+        bucket = self.buckets.get(endpoint_class)
+        if bucket is not None:
+            wait = max(wait, bucket.wait_time(now))
+        return wait
+    
+    def _take(self, endpoint_class: str, now: float) -> None:
+        """Consume a token from the global and endpoint buckets."""
+        self.global_bucket.take(now)
+        bucket = self.buckets.get(endpoint_class)
+        if bucket is not None:
+            bucket.take(now)
+    
+    def queue_depth(self, endpoint_class: Optional[str] = None) -> int:
+        """Number of requests waiting (for one class, or in total)."""
+        if endpoint_class is not None:
+            return self._waiting.get(endpoint_class, 0)
+        return sum(self._waiting.values())
+    
+    async def acquire(
+        self,
+        endpoint_class: str,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> None:
+        """
+        Wait for permission to send one request.
+        
+        Args:
+            endpoint_class: Bucket to charge (e.g. "flight-destinations")
+            priority: Scheduling priority for this request
+            
+        Raises:
+            RateLimitExceeded: If the queue is full or the wait exceeds max_wait
+        """
+        now = time.monotonic()
+        queue = self._queues.setdefault(endpoint_class, [])
+        
+        # Fast path: nobody waiting ahead of us and tokens available
+        if not self.queue_depth() and self._wait_time(endpoint_class, now) == 0:
+            self._take(endpoint_class, now)
+            return
+        
+        if self.queue_depth(endpoint_class) >= self.max_queue:
+            raise RateLimitExceeded(
+                f"Rate limit queue for {endpoint_class} is full ({self.max_queue} waiting)"
+            )
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue, (int(priority), next(self._sequence), future))
+        self._waiting[endpoint_class] = self._waiting.get(endpoint_class, 0) + 1
+        self._ensure_dispatcher()
+        
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise RateLimitExceeded(
+                f"Waited over {self.max_wait}s for a {endpoint_class} rate limit slot"
+            )
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            self._waiting[endpoint_class] -= 1
+    
+    def pause(self, seconds: float, endpoint_class: Optional[str] = None) -> None:
+        """
+        Stop handing out slots for a while after the upstream throttled us.
+        
+        Args:
+            seconds: How long to pause
+            endpoint_class: Pause only this class (None pauses everything)
+        """
+        bucket = self.buckets.get(endpoint_class) if endpoint_class else self.global_bucket
+        (bucket or self.global_bucket).pause(seconds)
+        logger.warning(f"Rate limiter paused {endpoint_class or 'all endpoints'} for {seconds:.1f}s")
+    
+    def _ensure_dispatcher(self) -> None:
+        """Start the dispatcher task if it isn't running, or wake it up."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        elif self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def _dispatch(self) -> None:
+        """Release queued requests in priority order as tokens become available."""
+        while True:
+            now = time.monotonic()
+            best: Optional[tuple[int, int, str]] = None
+            next_wait: Optional[float] = None
+            
+            for endpoint_class, queue in self._queues.items():
+                # Drop waiters that gave up
+                while queue and queue[0][2].done():
+                    heapq.heappop(queue)
+                if not queue:
+                    continue
+                
+                wait = self._wait_time(endpoint_class, now)
+                if wait > 0:
+                    next_wait = wait if next_wait is None else min(next_wait, wait)
+                    continue
+                
+                priority, sequence, _ = queue[0]
+                if best is None or (priority, sequence) < best[:2]:
+                    best = (priority, sequence, endpoint_class)
+            
+            if best is not None:
+                endpoint_class = best[2]
+                _, _, future = heapq.heappop(self._queues[endpoint_class])
+                self._take(endpoint_class, now)
+                future.set_result(None)
+                continue
+            
+            if next_wait is None:
+                return  # Nothing left waiting
+            
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=next_wait)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,215 @@
+"""
+Upstream Resilience
+
+Circuit breakers and retry backoff for calls to external APIs.
+
+- CircuitBreaker: one per upstream host. Opens when the recent error
+  rate crosses a threshold, failing calls fast instead of letting them
+  wait out the HTTP timeout. After a cool-down it lets a few half-open
+  probes through and closes again once they succeed. A probe that ends
+  without a verdict (cancelled, or failed before reaching the upstream)
+  must hand its slot back with release_probe(); probes that never report
+  are dropped after probe_timeout_seconds.
+- backoff_delay: exponential backoff with full jitter for retrying
+  transient errors (5xx, 429, connection failures).
+
+Usage:
+    breaker = get_circuit_breaker("api.postcodes.io")
+    probe = breaker.before_call()  # raises CircuitOpenError when open
+    try:
+    ...
+    except asyncio.CancelledError:
+        if probe:
+            breaker.release_probe()  # no verdict on the upstream
+        raise
+    breaker.record_success()     # or record_failure()
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from enum import Enum
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the upstream's circuit is open."""
+    pass
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker state."""
+    CLOSED = "closed"        # Calls flow normally
+    OPEN = "open"            # Calls fail fast
+    HALF_OPEN = "half_open"  # A few probe calls test recovery
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for one upstream host.
+    
+    Args:
+        name: Upstream name (for logging)
+        failure_rate: Fraction of failed calls that opens the circuit
+        min_calls: Minimum calls in the window before the rate is judged
+        window_seconds: Length of the rolling window of call results
+        open_seconds: How long the circuit stays open before probing
+        half_open_probes: Successful probes needed to close the circuit
+        probe_timeout_seconds: How long a half-open probe may hold its
+            slot without reporting before the slot is reclaimed
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window_seconds: float = 30.0,
+        open_seconds: float = 15.0,
+        half_open_probes: int = 2,
+        probe_timeout_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.probe_timeout_seconds = probe_timeout_seconds
+        
+        self.state = CircuitState.CLOSED
+        self._results: deque[tuple[float, bool]] = deque()  # (timestamp, ok)
+        self._opened_at = 0.0
+        self._probe_starts: deque[float] = deque()  # Start times of probes in flight
+        self._probe_successes = 0
+    
+    def before_call(self) -> bool:
+        """
+        Check whether a call may proceed.
+        
+        Returns:
+            True if the call is a half-open probe, which must end in
+            record_success(), record_failure() or release_probe()
+        
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with
+                enough probes already in flight
+        """
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._transition(CircuitState.HALF_OPEN)
+        
+        if self.state == CircuitState.HALF_OPEN:
+            now = time.monotonic()
+            while self._probe_starts and now - self._probe_starts[0] > self.probe_timeout_seconds:
+                self._probe_starts.popleft()
+                logger.warning(f"Circuit for {self.name}: probe never reported, reclaiming its slot")
+            if len(self._probe_starts) >= self.half_open_probes:
+                raise CircuitOpenError(f"{self.name} circuit is half-open, probe in progress")
+            self._probe_starts.append(now)
+            return True
+        return False
+    
+    def release_probe(self) -> None:
+        """Give back a probe slot for a call that ended without a verdict."""
+        if self.state == CircuitState.HALF_OPEN and self._probe_starts:
+            self._probe_starts.popleft()
+    
+    def record_success(self) -> None:
+        """Record a call that reached a healthy upstream."""
+        if self.state == CircuitState.HALF_OPEN:
+            self.release_probe()
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._transition(CircuitState.CLOSED)
+            return
+        self._record(True)
+    
+    def record_failure(self) -> None:
+        """Record a failed call (5xx, timeout, connection error)."""
+        if self.state == CircuitState.HALF_OPEN:
+            self._transition(CircuitState.OPEN)
+            return
+        self._record(False)
+        
+        if self.state == CircuitState.CLOSED and self._should_open():
+            self._transition(CircuitState.OPEN)
+    
+    def _record(self, ok: bool) -> None:
+        """Add a result to the window and drop results that fell out of it."""
+        now = time.monotonic()
+        self._results.append((now, ok))
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+    
+    def _should_open(self) -> bool:
+        """Check whether the error rate in the window crosses the threshold."""
+        if len(self._results) < self.min_calls:
+            return False
+        failures = sum(1 for _, ok in self._results if not ok)
+        return failures / len(self._results) >= self.failure_rate
+    
+    def _transition(self, state: CircuitState) -> None:
+        """Move to a new state and reset the relevant counters."""
+        if state == self.state:
+            return
+        logger.warning(f"Circuit for {self.name}: {self.state.value} -> {state.value}")
+        self.state = state
+        self._probe_starts.clear()
+        self._probe_successes = 0
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CircuitState.CLOSED:
+            self._results.clear()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(host: str) -> CircuitBreaker:
+    """Get the shared circuit breaker for an upstream host."""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            host,
+            failure_rate=settings.CIRCUIT_FAILURE_RATE,
+            min_calls=settings.CIRCUIT_MIN_CALLS,
+            window_seconds=settings.CIRCUIT_WINDOW_SECONDS,
+            open_seconds=settings.CIRCUIT_OPEN_SECONDS,
+            half_open_probes=settings.CIRCUIT_HALF_OPEN_PROBES,
+            probe_timeout_seconds=settings.CIRCUIT_PROBE_TIMEOUT_SECONDS,
+        )
+        _breakers[host] = breaker
+    return breaker
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """Transient HTTP statuses worth retrying."""
+    return status_code == 429 or status_code >= 500
+
+
+def backoff_delay(
+    attempt: int,
+    base: Optional[float] = None,
+    cap: Optional[float] = None,
+) -> float:
+    """
+    Exponential backoff with full jitter.
+    
+    Args:
+        attempt: Retry number, starting at 0
+        base: Delay for the first retry (seconds)
+        cap: Maximum delay (seconds)
+        
+    Returns:
+        Random delay between 0 and min(cap, base * 2^attempt)
+    """
+    base = settings.UPSTREAM_RETRY_BASE_DELAY_SECONDS if base is None else base
+    cap = settings.UPSTREAM_RETRY_MAX_DELAY_SECONDS if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,173 @@
+"""
+Search Sessions
+
+Keeps the merged results of a suggestion search in memory so follow-up
+requests that only change budget_per_person, travelers, max_results or
+ranking weights can be answered by re-filtering and re-ranking the
+stored prices, without repeating any upstream calls.
+
+The ranked list is kept in the session too, so results can be paged
+with opaque cursors (encode_cursor/decode_cursor) and each page only
+builds the suggestions it returns. Bookable flight offers fetched for
+the session's destinations are kept with it too.
+
+Sessions live in a per-process LRU with a sliding TTL. With several
+workers, a session is only found on the worker that created it; callers
+fall back to a fresh search when it is gone. When a session expires or
+is evicted, its unfinished flight offer searches are cancelled.
+
+Usage:
+    store = get_session_store()
+    session = store.create(owner=user.uid, request=request, ...)
+    session = store.get(session_id, owner=user.uid)
+"""
+
+import asyncio
+import base64
+import binascii
+import logging
+import secrets
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+from app.models.suggestions import IncompleteSearch, OriginAirport, SuggestionRequest
+from app.services.cache import CacheEntry, LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchSession:
+    """Everything needed to re-rank a finished search."""
+    session_id: str
+    owner: Optional[str]
+    request: SuggestionRequest
+    origins_used: list[OriginAirport]
+    origin_distances: dict[str, float]
+    destination_prices: dict[str, dict]  # PriceTable.prices at the end of the search
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    incomplete_searches: list[IncompleteSearch] = field(default_factory=list)
+    # max_results a date-grid search was price-pruned for (None if nothing was pruned)
+    pruned_for: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    # Current ranking (best first), rebuilt by each re-rank
+    ranked_codes: list[str] = field(default_factory=list)
+    ranked_scores: list[float] = field(default_factory=list)
+    ranked_request: Optional[SuggestionRequest] = None  # Request the ranking was built for
+    ranking_version: int = 0  # Bumped on re-rank so old cursors are rejected
+    # Flight offer searches per (destination, adults), see flight_offers
+    offers: dict[tuple[str, int], asyncio.Task] = field(default_factory=dict, repr=False)
+    
+    def set_ranking(
+        self,
+        codes: list[str],
+        scores: list[float],
+        request: SuggestionRequest,
+    ) -> None:
+        """Replace the ranked list (invalidates cursors into the old one)."""
+        self.ranked_codes = codes
+        self.ranked_scores = scores
+        self.ranked_request = request
+        self.ranking_version += 1
+    
+    def cancel_offers(self) -> None:
+        """Cancel flight offer searches that are still running."""
+        for task in self.offers.values():
+            task.cancel()
+
+
+def encode_cursor(session: SearchSession, offset: int) -> str:
+    """Opaque cursor pointing at an offset in the session's current ranking."""
+    raw = f"{session.ranking_version}:{offset}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """
+    Decode a cursor.
+    
+    Returns:
+        Tuple of (ranking version, offset)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        version, offset = (int(part) for part in raw.split(":"))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return version, offset
+
+
+class SearchSessionStore:
+    """In-memory store of search sessions, least recently used evicted first."""
+    
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.ttl = ttl or settings.SEARCH_SESSION_TTL_SECONDS
+        self._sessions = LRUCache(
+            max_entries=max_sessions or settings.SEARCH_SESSION_MAX_ENTRIES,
+            on_remove=self._on_remove,
+        )
+    
+    @staticmethod
+    def _on_remove(session_id: str, entry: CacheEntry) -> None:
+        """Stop a dropped session's background work."""
+        entry.value.cancel_offers()
+    
+    def create(self, owner: Optional[str], **fields) -> SearchSession:
+        """
+        Store a new session.
+        
+        Args:
+            owner: User the session belongs to (None for unauthenticated callers)
+            **fields: Remaining SearchSession fields
+        
+        Returns:
+            The stored session, with a new random session_id
+        """
+        session = SearchSession(session_id=secrets.token_urlsafe(16), owner=owner, **fields)
+        self._sessions.set(session.session_id, CacheEntry(session, time.time() + self.ttl))
+        logger.info(
+            f"Created search session {session.session_id} with "
+            f"{len(session.destination_prices)} destinations"
+        )
+        return session
+    
+    def get(self, session_id: str, owner: Optional[str] = None) -> Optional[SearchSession]:
+        """
+        Get a live session and extend its expiry.
+        
+        Returns None if the session is missing, expired or belongs to
+        another user.
+        """
+        entry = self._sessions.get(session_id)
+        if entry is None or entry.value.owner != owner:
+            return None
+        
+        entry.expires_at = time.time() + self.ttl
+        return entry.value
+    
+    def delete(self, session_id: str) -> None:
+        """Remove a session if present."""
+        self._sessions.delete(session_id)
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+@lru_cache
+def get_session_store() -> SearchSessionStore:
+    """Get the process-wide search session store."""
+    return SearchSessionStore()
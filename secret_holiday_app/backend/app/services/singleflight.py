@@ -0,0 +1,70 @@
+"""
+Single-flight Request Coalescing
+
+Concurrent callers asking for the same key share one in-flight call and
+its result instead of each making their own upstream request.
+
+Usage:
+    flights = SingleFlight()
+    result = await flights.do(key, lambda: fetch(...))
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    """An in-flight call and the number of callers waiting on it."""
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key.
+    
+    The call runs in its own task so that one caller being cancelled does
+    not cancel it for the others. If every waiting caller goes away, the
+    call is cancelled too. Results are shared between callers, so they
+    must be treated as read-only.
+    """
+    
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn(), or join an identical call that is already in flight.
+        
+        Args:
+            key: Identity of the call (equal keys share one call)
+            fn: Zero-argument coroutine function that performs the call
+            
+        Returns:
+            The (shared) result of fn()
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is waiting for the result any more
+                self._forget(key, call)
+                call.task.cancel()
+    
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        """Remove a call from the in-flight table if it is still registered."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+    
+    def __len__(self) -> int:
+        return len(self._calls)
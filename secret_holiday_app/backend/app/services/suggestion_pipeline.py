@@ -0,0 +1,879 @@
+"""
+Destination Suggestion Pipeline
+
+The suggestion flow shared by every suggestion endpoint, split into
+explicit stages:
+1. geocode  - resolve the starting location (postcode/city)
+2. airports - find nearby origin airports (offline index, Amadeus fallback)
+3. dates    - turn the travel dates into Amadeus date parameters (first-
+              of-month probes, or whole-month ranges for a date_grid
+              search) and, when the request opts in with metro_origins, group
+              origins sharing a metro code (LHR+LGW -> LON)
+4. search   - fan out flight-destination searches and merge prices,
+              splitting metro searches back into airports when needed
+5. rank     - score every destination (price, distance, city size,
+              origin distance) and build the top suggestions
+
+The request has a latency budget (deadline_ms or SUGGEST_DEADLINE_MS).
+When it runs out, outstanding searches are cancelled and the response is
+built from whatever has been merged, flagged as partial.
+
+Each stage records its wall time and the number of upstream calls it
+made, returned in SuggestionResponse.debug when requested.
+
+A finished search is stored as a search session (see search_sessions),
+so rerank_session() can answer budget/travelers/max_results changes
+from memory, and session_page() can serve the ranking a page at a time.
+
+Usage:
+    pipeline = SuggestionPipeline(request, amadeus, owner=user.uid)
+    response = await pipeline.run()
+    response = rerank_session(session, RerankRequest(travelers=2))
+"""
+
+import asyncio
+import calendar
+import logging
+import math
+import time
+from contextlib import aclosing, contextmanager
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterator, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.config import settings
+from app.models.suggestions import (
+    BatchSuggestionResponse,
+    BatchSuggestionResult,
+    DateGrid,
+    DestinationSuggestion,
+    IncompleteSearch,
+    OriginAirport,
+    PipelineStageTiming,
+    RerankRequest,
+    StreamFrameType,
+    SuggestionDebug,
+    SuggestionError,
+    SuggestionRequest,
+    SuggestionResponse,
+    SuggestionStreamFrame,
+    TravelDateType,
+)
+from app.services.airports import get_airport_index
+from app.services.amadeus import AmadeusService
+from app.services.destination_index import get_destination_index
+from app.services.flight_search import (
+    PriceTable,
+    SearchFanout,
+    SearchKey,
+    SearchOutcome,
+    SharedSearchFanout,
+)
+from app.services.geocoding import GeoLocation, geocode_uk_location
+from app.services.origin_planner import OriginPlan, plan_origins
+from app.services.ranking import rank_candidates, resolve_weights
+from app.services.search_sessions import SearchSession, encode_cursor, get_session_store
+from app.services.upstream_metrics import UpstreamCallCounter, active_counter, track_upstream_calls
+
+logger = logging.getLogger(__name__)
+
+# Fan-out errors reported as-is in IncompleteSearch.reason (others become "error")
+INCOMPLETE_REASONS = ("deadline", "timeout", "rate_limited", "unavailable")
+
+
+def upcoming_months(count: int) -> list[tuple[int, int]]:
+    """(year, month) for the next `count` months, starting with next month."""
+    today = date.today()
+    return [
+        (today.year + (today.month + i - 1) // 12, (today.month + i - 1) % 12 + 1)
+        for i in range(1, count + 1)
+    ]
+
+
+def parse_month(value: str) -> tuple[int, int]:
+    """
+    Parse a YYYY-MM month.
+    
+    Raises:
+        HTTPException: 400 if the month is malformed
+    """
+    try:
+        year, month = (int(part) for part in value.split("-"))
+        date(year, month, 1)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid month: {value!r} (expected YYYY-MM)") from e
+    return year, month
+
+
+def months_between(start: date, end: date, limit: int) -> list[tuple[int, int]]:
+    """(year, month) from start's month to end's month, at most `limit` of them."""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month) and len(months) < limit:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def month_date_range(year: int, month: int, start: date, end: date) -> Optional[str]:
+    """Amadeus departureDate range for one month, clipped to start..end (None if empty)."""
+    first = max(date(year, month, 1), start)
+    last = min(date(year, month, calendar.monthrange(year, month)[1]), end)
+    if first > last:
+        return None
+    return f"{first.isoformat()},{last.isoformat()}"
+
+
+def build_grid_date_params(request: SuggestionRequest) -> list[dict]:
+    """
+    Date-grid parameters: one departureDate range per month of the window.
+    
+    Each search returns the cheapest fare per destination for every day
+    (or week) of its month, and is cached per origin and month. At most
+    3 months are searched and past dates are skipped; if every requested
+    month is past, the next 3 months are searched instead.
+    
+    Raises:
+        HTTPException: 400 if a month is malformed, or a specific date
+            range is entirely in the past
+    """
+    travel = request.travel_dates
+    duration = str(request.trip_length_nights)
+    start, end = date.today() + timedelta(days=1), date.max
+    
+    if travel.type == TravelDateType.SPECIFIC and travel.start_date and travel.end_date:
+        start, end = max(start, travel.start_date), travel.end_date
+        if end < start:
+            raise HTTPException(status_code=400, detail="Travel dates are in the past")
+        months = months_between(start, end, limit=3)
+    elif travel.type == TravelDateType.MONTH and travel.month:
+        months = [parse_month(travel.month)]
+    elif travel.type == TravelDateType.FLEXIBLE and travel.preferred_months:
+        months = [parse_month(m) for m in travel.preferred_months[:3]]
+    else:
+        # Default: next 3 months
+        months = upcoming_months(3)
+    
+    params_list = []
+    for year, month in months:
+        departure_date = month_date_range(year, month, start, end)
+        if departure_date:
+            params_list.append({"departureDate": departure_date, "duration": duration})
+    
+    if not params_list and travel.type != TravelDateType.SPECIFIC:
+        return [
+            {"departureDate": month_date_range(year, month, start, end), "duration": duration}
+            for year, month in upcoming_months(3)
+        ]
+    return params_list
+
+
+def build_date_params(request: SuggestionRequest) -> list[dict]:
+    """
+    Convert travel date specification into Amadeus API parameters.
+    
+    Returns a list of date parameter dicts to search.
+    """
+    if request.date_grid:
+        return build_grid_date_params(request)
+    
+    params_list = []
+    travel = request.travel_dates
+    duration = str(request.trip_length_nights)
+    
+    if travel.type == TravelDateType.SPECIFIC:
+        # Specific date range
+        if travel.start_date and travel.end_date:
+            params_list.append({
+                "departureDate": travel.start_date.isoformat(),
+                "duration": duration,
+            })
+    
+    elif travel.type == TravelDateType.MONTH:
+        # Whole month - Amadeus needs yyyy-MM-dd format, use first day of month
+        if travel.month:
+            # Convert "2026-03" to "2026-03-01"
+            departure_date = f"{travel.month}-01"
+            params_list.append({
+                "departureDate": departure_date,
+                "duration": duration,
+            })
+    
+    elif travel.type == TravelDateType.FLEXIBLE:
+        # Multiple months - use first day of each month
+        if travel.preferred_months:
+            for month in travel.preferred_months[:3]:  # Limit to 3 months
+                departure_date = f"{month}-01"
+                params_list.append({
+                    "departureDate": departure_date,
+                    "duration": duration,
+                })
+    
+    # Default: next 3 months if nothing specified
+    if not params_list:
+        for year, month in upcoming_months(3):
+            params_list.append({
+                "departureDate": f"{year}-{month:02d}-01",
+                "duration": duration,
+            })
+    
+    return params_list
+
+
+def build_search_keys(
+    origin_codes: list[str],
+    date_params_list: list[dict],
+) -> list[SearchKey]:
+    """Build one search per origin code × date parameter set."""
+    return [
+        SearchKey(
+            origin=origin_code,
+            departure_date=date_params.get("departureDate"),
+            duration=date_params.get("duration"),
+        )
+        for origin_code in origin_codes
+        for date_params in date_params_list
+    ]
+
+
+def build_suggestion(
+    dest_code: str,
+    data: dict,
+    request: SuggestionRequest,
+    score: Optional[float] = None,
+) -> DestinationSuggestion:
+    """Build an enriched suggestion from a price table entry."""
+    info = get_destination_index().get(dest_code)
+    
+    # Build reasons
+    reasons = []
+    if data["price"] <= request.budget_per_person * 0.5:
+        reasons.append("Great value - well under budget")
+    elif data["price"] <= request.budget_per_person * 0.75:
+        reasons.append("Good value")
+    else:
+        reasons.append("Within budget")
+    
+    return DestinationSuggestion(
+        destination_code=dest_code,
+        destination_name=info.city if info else None,
+        country=info.country if info else None,
+        country_code=info.country_code if info else None,
+        best_origin=data["origin"],
+        price_per_person=data["price"],
+        total_price=data["price"] * request.travelers,
+        departure_date=data["departure_date"],
+        return_date=data["return_date"],
+        reasons=reasons,
+        latitude=info.latitude if info else None,
+        longitude=info.longitude if info else None,
+        score=round(score, 4) if score is not None else None,
+    )
+
+
+def rank_destinations(
+    destination_prices: dict[str, dict],
+    request: SuggestionRequest,
+    origin_distances: dict[str, float],
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+) -> tuple[list[str], list[float], int]:
+    """
+    Score price table entries within budget and rank the top ones.
+    
+    Args:
+        destination_prices: PriceTable.prices (destination code -> best entry)
+        request: Supplies budget_per_person, travelers, max_results and ranking
+        origin_distances: Distance (km) from the user to each origin code
+        latitude: User latitude
+        longitude: User longitude
+    
+    Returns:
+        Tuple of (top max_results destination codes best first, their
+        scores, destinations within budget)
+    """
+    codes = [
+        code for code, entry in destination_prices.items()
+        if entry["price"] <= request.budget_per_person
+    ]
+    entries = [destination_prices[code] for code in codes]
+    
+    order, scores = rank_candidates(
+        codes,
+        prices=np.fromiter((e["price"] for e in entries), dtype=float, count=len(entries)),
+        origin_distances=np.fromiter(
+            (origin_distances.get(e["origin"], np.nan) for e in entries),
+            dtype=float,
+            count=len(entries),
+        ),
+        latitude=latitude,
+        longitude=longitude,
+        weights=resolve_weights(request.ranking),
+        k=request.max_results,
+    )
+    return [codes[i] for i in order], scores.tolist(), len(codes)
+
+
+def session_page(
+    session: SearchSession,
+    offset: int,
+    limit: int,
+) -> tuple[list[DestinationSuggestion], Optional[str]]:
+    """
+    Build one page of a session's current ranking.
+    
+    Only the suggestions on the page are built.
+    
+    Returns:
+        Tuple of (suggestions, cursor for the next page or None)
+    """
+    end = offset + limit
+    suggestions = [
+        build_suggestion(
+            code,
+            session.destination_prices[code],
+            session.ranked_request,
+            score=score,
+        )
+        for code, score in zip(session.ranked_codes[offset:end], session.ranked_scores[offset:end])
+    ]
+    next_cursor = encode_cursor(session, end) if end < len(session.ranked_codes) else None
+    return suggestions, next_cursor
+
+
+def rerank_session(session: SearchSession, changes: RerankRequest) -> SuggestionResponse:
+    """
+    Re-filter, re-price and re-rank a stored search under new parameters.
+    
+    Changes are applied to the session's original request, so each call
+    is independent of earlier re-ranks. The new ranking replaces the
+    session's, and the first page is returned.
+    
+    Raises:
+        HTTPException: 409 if the budget is above the original search's,
+            since destinations over that budget were never fetched, or
+            if a price-pruned search is reranked for more results or by
+            more than price
+    """
+    original = session.request
+    if changes.budget_per_person and changes.budget_per_person > original.budget_per_person:
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                f"Budget above the original search (£{original.budget_per_person}); "
+                f"run a new search to see more expensive destinations"
+            ),
+        )
+    
+    request = original.model_copy(update=changes.model_dump(exclude_none=True))
+    if session.pruned_for is not None and (
+        request.max_results > session.pruned_for
+        or not resolve_weights(request.ranking).price_only
+    ):
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                f"This search only fetched fares that could make the {session.pruned_for} cheapest "
+                f"destinations; run a new search to rank more of them or by other criteria"
+            ),
+        )
+    
+    codes, scores, total_found = rank_destinations(
+        session.destination_prices,
+        request,
+        session.origin_distances,
+        session.latitude,
+        session.longitude,
+    )
+    session.set_ranking(codes, scores, request)
+    suggestions, next_cursor = session_page(session, 0, request.effective_page_size)
+    
+    return SuggestionResponse(
+        origins_used=session.origins_used,
+        search_criteria=build_search_criteria(request),
+        destinations=suggestions,
+        total_found=total_found,
+        partial=bool(session.incomplete_searches),
+        incomplete_searches=session.incomplete_searches,
+        session_id=session.session_id,
+        next_cursor=next_cursor,
+    )
+
+
+def build_search_criteria(request: SuggestionRequest) -> dict:
+    """Summarise the search parameters for the response."""
+    return {
+        "starting_location": request.starting_location,
+        "budget_per_person": request.budget_per_person,
+        "travelers": request.travelers,
+        "trip_length_nights": request.trip_length_nights,
+        "travel_dates": request.travel_dates.model_dump(),
+    }
+
+
+class OriginLookups:
+    """
+    Geocoding and nearest-airport lookups, remembered for the lifetime of
+    the object.
+    
+    Each pipeline gets its own by default; a batch shares one across its
+    pipelines so every distinct location and airport query runs once.
+    """
+    
+    def __init__(self, amadeus: AmadeusService):
+        self.amadeus = amadeus
+        self._lookups: dict[Hashable, asyncio.Task] = {}
+    
+    async def _once(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() the first time key is looked up; later callers share the result."""
+        task = self._lookups.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._lookups[key] = task
+        return await asyncio.shield(task)
+    
+    async def geocode(self, starting_location: str) -> Optional[GeoLocation]:
+        """Geocode a UK postcode or city name."""
+        key = ("geocode", " ".join(starting_location.upper().split()))
+        return await self._once(key, lambda: geocode_uk_location(starting_location))
+    
+    async def nearest_airports(self, location: GeoLocation, max_results: int) -> list[dict]:
+        """Nearby airports from the offline index, falling back to Amadeus."""
+        key = ("airports", location.latitude, location.longitude, max_results)
+        return await self._once(key, lambda: self._find_airports(location, max_results))
+    
+    async def _find_airports(self, location: GeoLocation, max_results: int) -> list[dict]:
+        """Look up nearby airports (uncached)."""
+        airports = []
+        if settings.AIRPORTS_SOURCE == "local":
+            airports = get_airport_index().nearest(
+                location.latitude,
+                location.longitude,
+                radius_km=150,  # 150km radius
+                max_results=max_results,
+            )
+        if not airports:
+            airports = await self.amadeus.get_nearest_airports(
+                latitude=location.latitude,
+                longitude=location.longitude,
+                radius=150,
+                max_results=max_results,
+            )
+        return airports
+
+
+class SuggestionPipeline:
+    """
+    Runs the suggestion flow for one request, timing each stage.
+    
+    Stages can be run individually (resolve_origins, plan_searches,
+    search, rank) or all at once via run() / stream().
+    """
+    
+    def __init__(
+        self,
+        request: SuggestionRequest,
+        amadeus: AmadeusService,
+        fanout: Optional[SearchFanout] = None,
+        owner: Optional[str] = None,
+        lookups: Optional[OriginLookups] = None,
+    ):
+        self.request = request
+        self.amadeus = amadeus
+        self.fanout = fanout or SearchFanout(amadeus)
+        self.lookups = lookups or OriginLookups(amadeus)
+        self.owner = owner  # User the search session belongs to
+        
+        self.location: Optional[GeoLocation] = None
+        self.origins_used: list[OriginAirport] = []
+        self.origin_plan: Optional[OriginPlan] = None
+        self.search_keys: list[SearchKey] = []
+        self.price_table = PriceTable()
+        self.outcomes: list[SearchOutcome] = []
+        self.session: Optional[SearchSession] = None
+        self.pruned_for: Optional[int] = None  # Set once a search is capped below the budget
+        
+        self.timings: list[PipelineStageTiming] = []
+        self._calls = UpstreamCallCounter(parent=active_counter())
+        self._started_at = time.perf_counter()
+    
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        """Time a stage and count the upstream calls made inside it."""
+        calls_before = self._calls.total
+        start = time.perf_counter()
+        try:
+            with track_upstream_calls(self._calls):
+                yield
+        finally:
+            timing = PipelineStageTiming(
+                name=name,
+                wall_ms=round((time.perf_counter() - start) * 1000, 1),
+                upstream_calls=self._calls.total - calls_before,
+            )
+            self.timings.append(timing)
+            logger.info(
+                f"Stage {name}: {timing.wall_ms}ms, {timing.upstream_calls} upstream calls"
+            )
+    
+    async def resolve_origins(self) -> list[OriginAirport]:
+        """
+        Geocode the starting location and find nearby origin airports.
+        
+        Raises:
+            HTTPException: 400 if the location can't be geocoded,
+                404 if no airports are found nearby
+        """
+        request = self.request
+        
+        with self._stage("geocode"):
+            location = await self.lookups.geocode(request.starting_location)
+        
+        if not location:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Could not find location: {request.starting_location}. Please enter a valid UK postcode or city name."
+            )
+        
+        logger.info(f"Geocoded {request.starting_location} to {location.latitude}, {location.longitude}")
+        self.location = location
+        
+        with self._stage("airports"):
+            airports = await self.lookups.nearest_airports(location, request.max_origins)
+        
+        if not airports:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No airports found near {request.starting_location}"
+            )
+        
+        self.origins_used = [
+            OriginAirport(
+                iata_code=a["iataCode"],
+                name=a.get("name", a["iataCode"]),
+                distance_km=a.get("distance", {}).get("value"),
+                city_code=a.get("address", {}).get("cityCode"),
+            )
+            for a in airports
+        ]
+        
+        logger.info(f"Found {len(self.origins_used)} airports: {[o.iata_code for o in self.origins_used]}")
+        return self.origins_used
+    
+    def plan_searches(self) -> list[SearchKey]:
+        """Build the origin × date searches to run, one per metro with metro_origins."""
+        with self._stage("dates"):
+            self.origin_plan = plan_origins(
+                self.origins_used,
+                use_metro=settings.SUGGEST_METRO_SEARCH and self.request.metro_origins,
+            )
+            self.search_keys = build_search_keys(
+                self.origin_plan.search_codes,
+                build_date_params(self.request),
+            )
+        return self.search_keys
+    
+    def _metro_splits(self, outcome: SearchOutcome) -> list[SearchKey]:
+        """
+        Airport-level searches to run after a metro search.
+        
+        A metro is split when the request wants an exact best_origin, or
+        when the provider returned nothing for the city code (not every
+        metro code is supported by Flight Inspiration).
+        """
+        key = outcome.key
+        if not outcome.ok or not self.origin_plan.is_metro(key.origin):
+            return []
+        if outcome.results and not self.request.split_metro_origins:
+            return []
+        return [
+            SearchKey(origin=airport, departure_date=key.departure_date, duration=key.duration)
+            for airport in self.origin_plan.airports_for(key.origin)
+        ]
+    
+    @property
+    def view_by(self) -> str:
+        """Amadeus viewBy for this request's searches."""
+        return {DateGrid.DAY: "DATE", DateGrid.WEEK: "WEEK"}.get(self.request.date_grid, "DESTINATION")
+    
+    def _search_max_price(self) -> int:
+        """
+        maxPrice for the next search to start.
+        
+        Date-grid searches ranked on price alone are pruned: once
+        max_results destinations are known, later searches only ask for
+        fares up to the k-th best price plus SUGGEST_GRID_PRUNE_SLACK,
+        since dearer fares can't make the top results. Other rankings
+        weigh more than price, so they search the whole budget.
+        
+        The session records the max_results it was pruned for, so reranks
+        that would need the dropped fares are refused.
+        """
+        budget = self.request.budget_per_person
+        if not self.request.date_grid or not resolve_weights(self.request.ranking).price_only:
+            return budget
+        
+        kth = self.price_table.kth_price(self.request.max_results)
+        if kth is None:
+            return budget
+        cap = math.ceil(kth * (1 + settings.SUGGEST_GRID_PRUNE_SLACK))
+        if cap >= budget:
+            return budget
+        self.pruned_for = self.request.max_results
+        return cap
+    
+    async def iter_search(self) -> AsyncIterator[tuple[SearchOutcome, list[str]]]:
+        """
+        Run the search stage, yielding each outcome as it is merged.
+        
+        Metro searches that need splitting are followed by a second
+        fan-out over their airports, within the same deadline.
+        
+        Yields:
+            Tuple of (search outcome, destination codes whose price improved)
+        """
+        if self.origin_plan is None:
+            self.plan_searches()
+        
+        with self._stage("search"):
+            keys = self.search_keys
+            split_from: dict[SearchKey, str] = {}
+            
+            while keys:
+                splits = []
+                async with aclosing(
+                    self.fanout.iter_outcomes(
+                        keys,
+                        max_price=self._search_max_price,
+                        view_by=self.view_by,
+                        deadline=self.remaining_budget(),
+                        budget=self.request.budget_per_person,
+                    )
+                ) as outcomes:
+                    async for outcome in outcomes:
+                        improved = self.price_table.merge(
+                            outcome.key.origin,
+                            outcome.results,
+                            refines=split_from.get(outcome.key),
+                        )
+                        self.outcomes.append(outcome)
+                        if outcome.key not in split_from:
+                            for split_key in self._metro_splits(outcome):
+                                split_from[split_key] = outcome.key.origin
+                                splits.append(split_key)
+                        yield outcome, improved
+                
+                if splits:
+                    logger.info(f"Splitting metro searches into {len(splits)} airport searches")
+                self.search_keys = self.search_keys + splits
+                keys = splits
+    
+    async def search(self) -> PriceTable:
+        """Run the search stage to completion."""
+        async for _ in self.iter_search():
+            pass
+        return self.price_table
+    
+    def origin_distances(self) -> dict[str, float]:
+        """Distance (km) from the user to each searched origin code."""
+        distances = {
+            origin.iata_code: origin.distance_km
+            for origin in self.origins_used
+            if origin.distance_km is not None
+        }
+        if self.origin_plan:
+            for group in self.origin_plan.groups:
+                members = [distances[a] for a in group.airports if a in distances]
+                if group.is_metro and members:
+                    distances[group.search_code] = min(members)
+        return distances
+    
+    def rank(self) -> tuple[list[str], list[float], int]:
+        """
+        Score every destination in the price table and rank the top ones.
+        
+        Returns:
+            Tuple of (top max_results destination codes best first, their
+            scores, total destinations found)
+        """
+        with self._stage("rank"):
+            return rank_destinations(
+                self.price_table.prices,
+                self.request,
+                self.origin_distances(),
+                latitude=self.location.latitude if self.location else None,
+                longitude=self.location.longitude if self.location else None,
+            )
+    
+    def save_session(self, ranked_codes: list[str], ranked_scores: list[float]) -> SearchSession:
+        """Store the merged prices and ranking as a search session."""
+        self.session = get_session_store().create(
+            owner=self.owner,
+            request=self.request,
+            origins_used=self.origins_used,
+            origin_distances=self.origin_distances(),
+            destination_prices=dict(self.price_table.prices),
+            latitude=self.location.latitude if self.location else None,
+            longitude=self.location.longitude if self.location else None,
+            incomplete_searches=self.incomplete_searches(),
+            pruned_for=self.pruned_for,
+        )
+        self.session.set_ranking(ranked_codes, ranked_scores, self.request)
+        return self.session
+    
+    def remaining_budget(self) -> Optional[float]:
+        """Seconds left in the request's latency budget (None if unlimited)."""
+        deadline_ms = self.request.deadline_ms or settings.SUGGEST_DEADLINE_MS
+        if not deadline_ms:
+            return None
+        elapsed = time.perf_counter() - self._started_at
+        return max(0.0, deadline_ms / 1000 - elapsed)
+    
+    def incomplete_searches(self) -> list[IncompleteSearch]:
+        """Searches that hit the deadline, timed out, were throttled or failed."""
+        incomplete = []
+        for outcome in self.outcomes:
+            if outcome.ok:
+                continue
+            reason = outcome.error if outcome.error in INCOMPLETE_REASONS else "error"
+            incomplete.append(IncompleteSearch(
+                origin=outcome.key.origin,
+                departure_date=outcome.key.departure_date,
+                duration=outcome.key.duration,
+                reason=reason,
+            ))
+        return incomplete
+    
+    def debug_info(self) -> SuggestionDebug:
+        """Per-stage timings and upstream call counts so far."""
+        return SuggestionDebug(
+            stages=self.timings,
+            total_ms=round((time.perf_counter() - self._started_at) * 1000, 1),
+            upstream_calls=self._calls.total,
+            upstream_calls_by_service=dict(self._calls.by_service),
+            searches=len(self.search_keys),
+        )
+    
+    async def run(self) -> SuggestionResponse:
+        """Run every stage and build the response."""
+        if not self.origins_used:
+            await self.resolve_origins()
+        self.plan_searches()
+        await self.search()
+        ranked_codes, ranked_scores, total_found = self.rank()
+        incomplete = self.incomplete_searches()
+        session = self.save_session(ranked_codes, ranked_scores)
+        suggestions, next_cursor = session_page(
+            session, 0, self.request.effective_page_size
+        )
+        
+        logger.info(
+            f"Found {total_found} destinations, returning top {len(suggestions)}"
+            f"{f' ({len(incomplete)} searches incomplete)' if incomplete else ''}"
+        )
+        
+        return SuggestionResponse(
+            origins_used=self.origins_used,
+            search_criteria=build_search_criteria(self.request),
+            destinations=suggestions,
+            total_found=total_found,
+            partial=bool(incomplete),
+            incomplete_searches=incomplete,
+            session_id=session.session_id,
+            next_cursor=next_cursor,
+            debug=self.debug_info() if self.request.include_debug else None,
+        )
+    
+    async def stream(self) -> AsyncIterator[SuggestionStreamFrame]:
+        """
+        Run every stage, yielding frames as results arrive.
+        
+        Call resolve_origins() first if location errors should be raised
+        before the stream starts.
+        """
+        if not self.origins_used:
+            await self.resolve_origins()
+        
+        yield SuggestionStreamFrame(
+            type=StreamFrameType.ORIGINS,
+            origins_used=self.origins_used,
+            search_criteria=build_search_criteria(self.request),
+        )
+        
+        self.plan_searches()
+        async with aclosing(self.iter_search()) as results:
+            async for _, improved in results:
+                for dest_code in improved:
+                    yield SuggestionStreamFrame(
+                        type=StreamFrameType.DESTINATION,
+                        destination=build_suggestion(
+                            dest_code, self.price_table.prices[dest_code], self.request
+                        ),
+                    )
+        
+        ranked_codes, ranked_scores, total_found = self.rank()
+        incomplete = self.incomplete_searches()
+        session = self.save_session(ranked_codes, ranked_scores)
+        logger.info(f"Streamed {total_found} destinations")
+        
+        yield SuggestionStreamFrame(
+            type=StreamFrameType.SUMMARY,
+            total_found=total_found,
+            ranking=ranked_codes,
+            partial=bool(incomplete),
+            incomplete_searches=incomplete,
+            session_id=session.session_id,
+            debug=self.debug_info() if self.request.include_debug else None,
+        )
+
+
+async def run_batch(
+    requests: list[SuggestionRequest],
+    amadeus: AmadeusService,
+    owner: Optional[str] = None,
+) -> BatchSuggestionResponse:
+    """
+    Run several suggestion requests, sharing their upstream work.
+    
+    Geocoding, nearest-airport lookups and identical (origin, date,
+    duration) searches are made once for the whole batch. Searches use
+    the highest budget in the batch and each request keeps only the
+    destinations within its own budget. A request that fails (e.g. an
+    unknown location) gets an error result without failing the others.
+    
+    Returns:
+        BatchSuggestionResponse with one result per request, in order
+    """
+    counter = UpstreamCallCounter()
+    lookups = OriginLookups(amadeus)
+    fanout = SharedSearchFanout(amadeus, max_price=max(r.budget_per_person for r in requests))
+    
+    async def run_one(request: SuggestionRequest) -> BatchSuggestionResult:
+        pipeline = SuggestionPipeline(request, amadeus, fanout=fanout, owner=owner, lookups=lookups)
+        try:
+            return BatchSuggestionResult(status_code=200, response=await pipeline.run())
+        except HTTPException as e:
+            return BatchSuggestionResult(
+                status_code=e.status_code,
+                error=SuggestionError(error="request_failed", detail=str(e.detail)),
+            )
+    
+    try:
+        with track_upstream_calls(counter):
+            results = await asyncio.gather(*(run_one(request) for request in requests))
+    finally:
+        await fanout.close()
+    
+    logger.info(
+        f"Batch of {len(requests)}: {fanout.searches_run} searches for "
+        f"{fanout.requested} requested, {counter.total} upstream calls"
+    )
+    
+    return BatchSuggestionResponse(
+        results=results,
+        searches_requested=fanout.requested,
+        searches_run=fanout.searches_run,
+        upstream_calls=counter.total,
+    )
@@ -0,0 +1,69 @@
+"""
+Upstream Call Tracking
+
+Counts calls to external APIs (Amadeus, Postcodes.io) made on behalf of
+the current request. Uses a context variable, so tasks spawned while
+tracking is active (e.g. a search fan-out) are counted too.
+
+Usage:
+    counter = UpstreamCallCounter()
+    with track_upstream_calls(counter):
+        await amadeus.get_flight_destinations(...)
+    print(counter.total)
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class UpstreamCallCounter:
+    """
+    Number of upstream calls made, in total and per service.
+    
+    Calls recorded here are also recorded in the parent counter, if any
+    (e.g. a batch request's total across its pipelines).
+    """
+    
+    def __init__(self, parent: Optional["UpstreamCallCounter"] = None):
+        self.by_service: Counter[str] = Counter()
+        self.parent = parent
+    
+    @property
+    def total(self) -> int:
+        """Total calls across all services."""
+        return sum(self.by_service.values())
+    
+    def record(self, service: str) -> None:
+        """Count one call to a service."""
+        self.by_service[service] += 1
+        if self.parent is not None:
+            self.parent.record(service)
+
+
+_current_counter: ContextVar[Optional[UpstreamCallCounter]] = ContextVar(
+    "upstream_call_counter", default=None
+)
+
+
+@contextmanager
+def track_upstream_calls(counter: UpstreamCallCounter) -> Iterator[UpstreamCallCounter]:
+    """Count upstream calls made inside this block into counter."""
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def active_counter() -> Optional[UpstreamCallCounter]:
+    """The counter upstream calls are currently recorded in, if any."""
+    return _current_counter.get()
+
+
+def record_upstream_call(service: str) -> None:
+    """Record an upstream call against the active counter, if any."""
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.record(service)
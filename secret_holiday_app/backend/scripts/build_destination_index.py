@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Build the destination enrichment index
+
+Joins a reference airports file with the app's European places dataset
+(assets/data/europe_destinations_ext.json.gz) and writes a compact,
+column-oriented index to app/data/destination_index.json.gz:
+- IATA code, city, country and country code for every airport with an
+  IATA code, plus common metropolitan city codes (LON, PAR, ROM, ...)
+- City names as users know them: the curated names the app has always
+  shown (CITY_NAMES) win, and the rest are cleaned up from the reference
+  file ("Toulouse/Blagnac" -> "Toulouse", "Kos Island" -> "Kos",
+  "Napoli" -> "Naples")
+- Airport coordinates
+- Nearest population centre from the places dataset (largest place
+  within 30 km, otherwise the nearest within 75 km) with its population
+
+The reference airports file is a CSV with iata, city, country (ISO code),
+lat and lon columns, e.g. the airports.csv shipped with the airportsdata
+package (https://github.com/mborsetti/airportsdata), which is used by
+default when installed.
+
+Usage:
+    python scripts/build_destination_index.py
+    python scripts/build_destination_index.py --airports path/to/airports.csv
+
+Requirements:
+    - Run from the backend/ directory
+"""
+
+import csv
+import gzip
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.airports import haversine_km  # noqa: E402
+from app.services.destination_index import DEFAULT_INDEX_PATH, INDEX_VERSION  # noqa: E402
+
+ASSETS_DIR = Path(__file__).resolve().parent.parent.parent / "assets" / "data"
+PLACES_PATH = ASSETS_DIR / "europe_destinations_ext.json.gz"
+COUNTRY_CODES_PATH = ASSETS_DIR / "europe_country_name_to_code.json.gz"
+
+CENTRE_RADIUS_KM = 30  # Prefer the largest place this close to the airport
+FALLBACK_RADIUS_KM = 75  # Otherwise take the nearest place within this distance
+
+# Country names outside the places dataset (flights from the UK regularly reach these)
+EXTRA_COUNTRY_NAMES = {
+    "AE": "United Arab Emirates", "AW": "Aruba", "BB": "Barbados", "BH": "Bahrain",
+    "BS": "Bahamas", "CA": "Canada", "CU": "Cuba", "CV": "Cape Verde",
+    "DO": "Dominican Republic", "DZ": "Algeria", "EG": "Egypt", "GE": "Georgia",
+    "GM": "Gambia", "IL": "Israel", "IN": "India", "JM": "Jamaica", "JO": "Jordan",
+    "KE": "Kenya", "LB": "Lebanon", "LC": "Saint Lucia", "LK": "Sri Lanka",
+    "MA": "Morocco", "MU": "Mauritius", "MV": "Maldives", "MX": "Mexico",
+    "OM": "Oman", "QA": "Qatar", "SA": "Saudi Arabia", "SC": "Seychelles",
+    "SN": "Senegal", "TH": "Thailand", "TN": "Tunisia", "US": "United States",
+    "ZA": "South Africa", "AM": "Armenia", "AZ": "Azerbaijan",
+}
+
+# Metropolitan city codes Flight Inspiration may return, mapped to their main airport
+METRO_CODES = {
+    "BUH": "OTP", "CHI": "ORD", "EAP": "BSL", "LON": "LHR", "MIL": "MXP",
+    "MOW": "SVO", "NYC": "JFK", "PAR": "CDG", "REK": "KEF", "ROM": "FCO",
+    "STO": "ARN", "TCI": "TFS", "TYO": "HND", "WAS": "IAD", "YMQ": "YUL",
+    "YTO": "YYZ",
+}
+
+# Curated display names; these override the reference file
+CITY_NAMES = {
+    # Spain
+    "BCN": "Barcelona", "MAD": "Madrid", "AGP": "Malaga", "ALC": "Alicante",
+    "PMI": "Palma de Mallorca", "IBZ": "Ibiza", "VLC": "Valencia", "SVQ": "Seville",
+    "BIO": "Bilbao", "TFS": "Tenerife South", "LPA": "Gran Canaria", "ACE": "Lanzarote",
+    "FUE": "Fuerteventura",
+    # France
+    "CDG": "Paris", "ORY": "Paris Orly", "NCE": "Nice", "LYS": "Lyon", "MRS": "Marseille",
+    "TLS": "Toulouse", "BOD": "Bordeaux",
+    # Italy
+    "FCO": "Rome", "MXP": "Milan Malpensa", "LIN": "Milan Linate", "VCE": "Venice",
+    "NAP": "Naples", "FLR": "Florence", "PSA": "Pisa", "BLQ": "Bologna", "CTA": "Catania",
+    "PMO": "Palermo",
+    # Germany
+    "FRA": "Frankfurt", "MUC": "Munich", "BER": "Berlin", "DUS": "Dusseldorf",
+    "HAM": "Hamburg", "CGN": "Cologne", "STR": "Stuttgart",
+    # Netherlands
+    "AMS": "Amsterdam", "RTM": "Rotterdam", "EIN": "Eindhoven",
+    # Belgium
+    "BRU": "Brussels", "CRL": "Brussels Charleroi",
+    # Portugal
+    "LIS": "Lisbon", "OPO": "Porto", "FAO": "Faro", "FNC": "Funchal",
+    # Greece
+    "ATH": "Athens", "SKG": "Thessaloniki", "HER": "Heraklion", "RHO": "Rhodes",
+    "CFU": "Corfu", "JTR": "Santorini", "JMK": "Mykonos",
+    # Croatia
+    "DBV": "Dubrovnik", "SPU": "Split", "ZAG": "Zagreb",
+    # Czech Republic
+    "PRG": "Prague",
+    # Poland
+    "WAW": "Warsaw", "KRK": "Krakow", "GDN": "Gdansk",
+    # Hungary
+    "BUD": "Budapest",
+    # Austria
+    "VIE": "Vienna", "SZG": "Salzburg",
+    # Switzerland
+    "ZRH": "Zurich", "GVA": "Geneva",
+    # Ireland
+    "DUB": "Dublin", "SNN": "Shannon", "ORK": "Cork",
+    # Scandinavia
+    "CPH": "Copenhagen", "OSL": "Oslo", "ARN": "Stockholm", "HEL": "Helsinki",
+    "KEF": "Reykjavik",
+    # Baltic
+    "TLL": "Tallinn", "RIX": "Riga", "VNO": "Vilnius",
+    # Turkey
+    "IST": "Istanbul", "SAW": "Istanbul Sabiha", "AYT": "Antalya", "DLM": "Dalaman",
+    "BJV": "Bodrum",
+    # Cyprus
+    "LCA": "Larnaca", "PFO": "Paphos",
+    # Malta
+    "MLA": "Malta",
+    # Morocco
+    "RAK": "Marrakech", "CMN": "Casablanca",
+    # Other
+    "GIB": "Gibraltar", "TGD": "Podgorica", "TIV": "Tivat",
+}
+
+# English names for reference-file city names (after normalize_city)
+CITY_NAME_FIXES = {
+    "Bale": "Basel", "Belgrad": "Belgrade", "Culleredo": "A Coruna", "Firenze": "Florence",
+    "Frankfurt am Main": "Frankfurt", "Genova": "Genoa", "Jerez de la Forntera": "Jerez de la Frontera",
+    "Kefallinia": "Kefalonia", "Kerkyra": "Corfu", "Klagenfurt am Worthersee": "Klagenfurt",
+    "Luqa": "Malta", "Napoli": "Naples", "Palma De Mallorca": "Palma de Mallorca",
+    "Rodes": "Rhodes", "Roma": "Rome", "Sevilla": "Seville", "Skiros": "Skyros",
+    "Torino": "Turin", "Venezia": "Venice",
+}
+
+# Countries whose island airports are filed as "Kos Island", "Tenerife Island"
+# (elsewhere the suffix is part of the name: Christmas Island, Hilton Head Island)
+ISLAND_SUFFIX_COUNTRIES = {"ES", "GB", "GR", "HR", "IT", "PT"}
+
+
+def normalize_city(name: str, country_code: str) -> str:
+    """
+    Clean a reference-file city name for display.
+    
+    Keeps the first of several names ("Toulouse/Blagnac", "Kemi / Tornio",
+    "Pekanbaru, Sumatra Island"), drops the " Island" suffix in
+    ISLAND_SUFFIX_COUNTRIES and maps local names to their English form.
+    """
+    name = name.split("/")[0].split(",")[0].strip()
+    if name.endswith(" Island") and country_code in ISLAND_SUFFIX_COUNTRIES:
+        name = name[:-len(" Island")]
+    return CITY_NAME_FIXES.get(name, name)
+
+
+def default_airports_path() -> Path | None:
+    """The airportsdata package's airports.csv, if installed."""
+    try:
+        import airportsdata
+    except ImportError:
+        return None
+    return Path(airportsdata.__file__).resolve().parent / "airports.csv"
+
+
+def load_airports(path: Path) -> dict[str, dict]:
+    """Load airports with an IATA code from the reference CSV."""
+    airports = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            code = (row.get("iata") or "").strip().upper()
+            if len(code) != 3:
+                continue
+            try:
+                lat, lon = float(row["lat"]), float(row["lon"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            country_code = (row.get("country") or "").strip().upper()
+            airports[code] = {
+                "city": normalize_city(row.get("city") or "", country_code) or code,
+                "country_code": country_code,
+                "lat": lat,
+                "lon": lon,
+            }
+    return airports
+
+
+class PlaceGrid:
+    """1-degree grid over the places dataset for radius queries."""
+    
+    def __init__(self, places: list[list]):
+        self.places = places
+        self.cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for i, place in enumerate(places):
+            self.cells[(math.floor(place[3]), math.floor(place[4]))].append(i)
+    
+    def within(self, lat: float, lon: float, radius_km: float) -> list[tuple[float, list]]:
+        """(distance_km, place) for places within the radius."""
+        lat_span = math.ceil(radius_km / 111)
+        lon_span = math.ceil(radius_km / (111 * max(math.cos(math.radians(lat)), 0.1)))
+        matches = []
+        for lat_cell in range(math.floor(lat) - lat_span, math.floor(lat) + lat_span + 1):
+            for lon_cell in range(math.floor(lon) - lon_span, math.floor(lon) + lon_span + 1):
+                for i in self.cells.get((lat_cell, lon_cell), ()):
+                    place = self.places[i]
+                    distance = haversine_km(lat, lon, place[3], place[4])
+                    if distance <= radius_km:
+                        matches.append((distance, place))
+        return matches
+
+
+def population_centre(
+    grid: PlaceGrid,
+    lat: float,
+    lon: float,
+    country_code: str,
+) -> tuple[str, int, float] | None:
+    """
+    Largest place within CENTRE_RADIUS_KM, else nearest within FALLBACK_RADIUS_KM.
+    
+    Only places in the airport's own country count (Dubrovnik, not Trebinje).
+    """
+    nearby = [
+        (d, p) for d, p in grid.within(lat, lon, FALLBACK_RADIUS_KM)
+        if p[2] == country_code
+    ]
+    if not nearby:
+        return None
+    
+    close = [(d, p) for d, p in nearby if d <= CENTRE_RADIUS_KM]
+    if close:
+        distance, place = max(close, key=lambda item: item[1][9] or 0)
+    else:
+        distance, place = min(nearby, key=lambda item: item[0])
+    return place[0], int(place[9] or 0), distance
+
+
+def main():
+    if "--airports" in sys.argv:
+        airports_path = Path(sys.argv[sys.argv.index("--airports") + 1])
+    else:
+        airports_path = default_airports_path()
+    
+    if not airports_path or not airports_path.exists():
+        print("❌ No reference airports file. Pass --airports or pip install airportsdata.")
+        sys.exit(1)
+    
+    print(f"📂 Airports: {airports_path}")
+    airports = load_airports(airports_path)
+    
+    with gzip.open(PLACES_PATH, "rt", encoding="utf-8") as f:
+        places = json.load(f)
+    with gzip.open(COUNTRY_CODES_PATH, "rt", encoding="utf-8") as f:
+        country_names = {code: name for name, code in json.load(f).items()}
+    country_names.update({code: name for code, name in EXTRA_COUNTRY_NAMES.items() if code not in country_names})
+    print(f"📂 Places: {len(places)} from {PLACES_PATH.name}")
+    
+    for metro_code, airport_code in METRO_CODES.items():
+        if metro_code not in airports and airport_code in airports:
+            airports[metro_code] = dict(airports[airport_code])
+    
+    for code, city in CITY_NAMES.items():
+        if code in airports:
+            airports[code]["city"] = city
+    
+    grid = PlaceGrid(places)
+    covered = {place[2] for place in places}
+    
+    countries: list[str] = []
+    country_index: dict[str, int] = {}
+    columns = {
+        "codes": [], "city": [], "country": [], "lat": [], "lon": [],
+        "centre": [], "centre_population": [], "centre_distance_km": [],
+    }
+    
+    with_centre = 0
+    for code in sorted(airports):
+        airport = airports[code]
+        cc = airport["country_code"]
+        if cc not in country_index:
+            country_index[cc] = len(countries)
+            countries.append(cc)
+        
+        centre = None
+        if cc in covered:
+            centre = population_centre(grid, airport["lat"], airport["lon"], cc)
+        if centre:
+            with_centre += 1
+        
+        columns["codes"].append(code)
+        columns["city"].append(airport["city"])
+        columns["country"].append(country_index[cc])
+        columns["lat"].append(round(airport["lat"] * 1e5))
+        columns["lon"].append(round(airport["lon"] * 1e5))
+        columns["centre"].append(centre[0] if centre else "")
+        columns["centre_population"].append(centre[1] if centre else 0)
+        columns["centre_distance_km"].append(round(centre[2]) if centre else 0)
+    
+    index = {
+        "version": INDEX_VERSION,
+        "countries": countries,
+        "country_names": [country_names.get(cc, "") for cc in countries],
+        **columns,
+        "codes": "".join(columns["codes"]),
+    }
+    
+    DEFAULT_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(DEFAULT_INDEX_PATH, "wt", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    
+    print(f"✅ Wrote {len(airports)} codes ({with_centre} with a population centre) to {DEFAULT_INDEX_PATH}")
+    print(f"   Size: {DEFAULT_INDEX_PATH.stat().st_size / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Refresh the offline airport dataset from Amadeus
+
+Queries the Amadeus Airport Nearest Relevant API on a grid of points
+covering the UK and Ireland and merges the results into
+app/data/airports.csv:
+- Coordinates of known airports are updated
+- Airports Amadeus returns that we don't have yet are added
+  (with passengers_m left at 0 - fill it in by hand for sensible ranking)
+
+Usage:
+    python scripts/refresh_airports.py            # Show what would change
+    python scripts/refresh_airports.py --write    # Update the CSV
+
+Requirements:
+    - Run from the backend/ directory
+    - AMADEUS_API_KEY / AMADEUS_API_SECRET set in .env
+"""
+
+import asyncio
+import csv
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.airports import DEFAULT_AIRPORTS_PATH  # noqa: E402
+from app.services.amadeus import AmadeusService  # noqa: E402
+
+# Grid covering Great Britain, Ireland and the Channel Islands
+LATITUDES = [49.5, 50.5, 51.5, 52.5, 53.5, 54.5, 55.5, 56.5, 57.5, 58.5, 59.5]
+LONGITUDES = [-9.5, -8.0, -6.5, -5.0, -3.5, -2.0, -0.5, 1.0]
+
+FIELDS = ["iata", "name", "city", "city_code", "country_code", "latitude", "longitude", "passengers_m"]
+
+
+async def fetch_airports() -> dict[str, dict]:
+    """Query Amadeus across the grid and collect airports by IATA code."""
+    amadeus = AmadeusService()
+    await amadeus.start()
+    
+    found: dict[str, dict] = {}
+    try:
+        for lat in LATITUDES:
+            for lon in LONGITUDES:
+                results = await amadeus.get_nearest_airports(lat, lon, radius=150, max_results=20)
+                for airport in results:
+                    found[airport["iataCode"]] = airport
+                print(f"   {lat:5.1f}, {lon:5.1f}: {len(results)} airports")
+    finally:
+        await amadeus.close()
+    
+    return found
+
+
+def main():
+    write = "--write" in sys.argv
+    
+    with open(DEFAULT_AIRPORTS_PATH, newline="", encoding="utf-8") as f:
+        rows = {row["iata"]: row for row in csv.DictReader(f)}
+    
+    print(f"📋 {len(rows)} airports in {DEFAULT_AIRPORTS_PATH}")
+    print("🔄 Querying Amadeus...")
+    found = asyncio.run(fetch_airports())
+    print(f"   Amadeus returned {len(found)} airports")
+    
+    added = updated = 0
+    for iata, airport in found.items():
+        geo = airport.get("geoCode", {})
+        address = airport.get("address", {})
+        if "latitude" not in geo or "longitude" not in geo:
+            continue
+        
+        row = rows.get(iata)
+        if row is None:
+            rows[iata] = {
+                "iata": iata,
+                "name": airport.get("name", iata).title(),
+                "city": address.get("cityName", "").title(),
+                "city_code": address.get("cityCode", iata),
+                "country_code": address.get("countryCode", ""),
+                "latitude": f"{geo['latitude']:.5f}",
+                "longitude": f"{geo['longitude']:.5f}",
+                "passengers_m": "0",
+            }
+            added += 1
+            print(f"   + {iata} {airport.get('name')}")
+        elif (float(row["latitude"]), float(row["longitude"])) != (geo["latitude"], geo["longitude"]):
+            row["latitude"] = f"{geo['latitude']:.5f}"
+            row["longitude"] = f"{geo['longitude']:.5f}"
+            updated += 1
+    
+    print(f"✅ {added} added, {updated} coordinates updated")
+    
+    if not write:
+        print("   (dry run - pass --write to update the CSV)")
+        return
+    
+    ordered = sorted(
+        rows.values(),
+        key=lambda r: (r["country_code"] != "GB", -float(r["passengers_m"] or 0)),
+    )
+    with open(DEFAULT_AIRPORTS_PATH, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(ordered)
+    print(f"💾 Wrote {len(ordered)} airports to {DEFAULT_AIRPORTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()